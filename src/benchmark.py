@@ -0,0 +1,146 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""The audit rule syscall-overhead benchmark module."""
+
+import logging
+import os
+import statistics
+import subprocess
+import time
+import typing
+from dataclasses import dataclass
+
+from constants import BENCHMARK_EXECVE_BINARY, BENCHMARK_PROBE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+def _probe_open() -> None:
+    """Open and close the probe file."""
+    os.close(os.open(BENCHMARK_PROBE_PATH, os.O_RDONLY))
+
+
+def _probe_stat() -> None:
+    """Stat the probe file."""
+    os.stat(BENCHMARK_PROBE_PATH)
+
+
+def _probe_execve() -> None:
+    """Fork and execute a no-op binary."""
+    subprocess.run([BENCHMARK_EXECVE_BINARY], check=True)
+
+
+# The execve probe also pays for a fork, so it runs fewer iterations.
+SYSCALL_PROBES: dict[str, tuple[typing.Callable[[], None], int]] = {
+    "open": (_probe_open, 1),
+    "stat": (_probe_stat, 1),
+    "execve": (_probe_execve, 10),
+}
+
+
+@dataclass
+class SyscallOverhead:
+    """Latency overhead of a syscall class against the empty-filter baseline.
+
+    Attributes:
+        p50: The median overhead in microseconds.
+        p99: The 99th percentile overhead in microseconds.
+        percent: The median overhead relative to the baseline median, in percent.
+
+    """
+
+    p50: float
+    p99: float
+    percent: float
+
+
+def percentiles(samples: list[int]) -> tuple[float, float]:
+    """Compute the p50 and p99 of latency samples.
+
+    Args:
+        samples: The latency samples in nanoseconds.
+
+    Returns:
+        The (p50, p99) tuple in microseconds.
+
+    """
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+    return quantiles[49] / 1000, quantiles[98] / 1000
+
+
+def measure_latencies(iterations: int) -> dict[str, tuple[float, float]]:
+    """Time tight loops of each probed syscall class.
+
+    Args:
+        iterations: The number of calls to time for each syscall class.
+
+    Returns:
+        A mapping of syscall class to its (p50, p99) latency in microseconds.
+
+    """
+    latencies = {}
+    for name, (probe, divisor) in SYSCALL_PROBES.items():
+        samples = []
+        for _ in range(max(iterations // divisor, 2)):
+            start = time.perf_counter_ns()
+            probe()
+            samples.append(time.perf_counter_ns() - start)
+        latencies[name] = percentiles(samples)
+        logger.debug("Measured %s latency p50/p99: %.2f/%.2f us", name, *latencies[name])
+    return latencies
+
+
+def compute_overhead(
+    baseline: dict[str, tuple[float, float]], loaded: dict[str, tuple[float, float]]
+) -> dict[str, SyscallOverhead]:
+    """Compute per-syscall overhead of a loaded rule set against the baseline.
+
+    Args:
+        baseline: The latencies measured with an empty filter.
+        loaded: The latencies measured with the rule set loaded.
+
+    Returns:
+        A mapping of syscall class to its overhead.
+
+    """
+    overhead = {}
+    for name, (base_p50, base_p99) in baseline.items():
+        p50, p99 = loaded[name]
+        percent = (p50 - base_p50) / base_p50 * 100 if base_p50 else 0.0
+        overhead[name] = SyscallOverhead(p50=p50 - base_p50, p99=p99 - base_p99, percent=percent)
+    return overhead
+
+
+def exceeds_budget(overhead: dict[str, SyscallOverhead], budget: int) -> list[str]:
+    """List the syscall classes whose median overhead exceeds the budget.
+
+    Args:
+        overhead: The per-syscall overhead of a rule set.
+        budget: The maximum allowed median overhead in percent.
+
+    Returns:
+        The names of the syscall classes above the budget.
+
+    """
+    return [name for name, value in overhead.items() if value.percent > budget]
+
+
+def format_overhead(overhead: dict[str, SyscallOverhead]) -> dict[str, dict[str, str]]:
+    """Format the overhead as action results.
+
+    Args:
+        overhead: The per-syscall overhead of a rule set.
+
+    Returns:
+        The overhead formatted for `event.set_results`.
+
+    """
+    return {
+        name: {
+            "p50-us": f"{value.p50:.2f}",
+            "p99-us": f"{value.p99:.2f}",
+            "p50-percent": f"{value.percent:.1f}",
+        }
+        for name, value in overhead.items()
+    }
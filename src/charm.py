@@ -5,14 +5,47 @@
 """The entrypoint for auditd operator."""
 
 import logging
+import time
 import typing
+from pathlib import Path
 
 import ops
 import pydantic
 from charms.grafana_agent.v0.cos_agent import COSAgentProvider
-
-from utils import get_machine_virt_type, read_file
-from workloads import AuditdConfig, AuditdService, AuditdServiceRestartError
+from charms.operator_libs_linux.v1 import systemd
+
+import tracing
+from benchmark import exceeds_budget, format_overhead
+from constants import (
+    AUDIT_LOG_FILE,
+    AUDITD_MAX_RESTARTS,
+    AUDITD_SPACE_LEFT,
+    DRIFT_EVENT,
+    EXPORTER_PORT,
+    FORWARDER_LOG_FILE,
+    LOG_GROWTH_SAMPLES,
+    METRICS_DIR,
+    RESTART_BACKOFF_BASE,
+    RESTART_BACKOFF_MAX,
+    RULE_PROFILE_PATH,
+    RULE_PROFILES,
+)
+from forecast import forecast, growth_rate, measure_growth
+from metrics import write_metrics
+from rules import read_profile
+from service_control import ServiceControlError
+from simulator import format_simulation
+from utils import backoff_delay, get_machine_virt_type, read_file
+from workloads import (
+    AuditdConfig,
+    AuditdService,
+    AuditdServiceRestartError,
+    AuditRuleReloadError,
+    HelperService,
+    InvalidAuditRulesError,
+    JournaldAuditSocket,
+    RotationTimer,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -21,9 +54,22 @@ class PlatformUnsupportedError(Exception):
     """Error when the platform is not supported."""
 
 
+class DriftDetectedEvent(ops.EventBase):
+    """Event dispatched by the drift watcher when a managed file changed."""
+
+
+class AuditdCharmEvents(ops.CharmEvents):
+    """The auditd charm events."""
+
+    drift_detected = ops.EventSource(DriftDetectedEvent)
+
+
 class AuditdOperatorCharm(ops.CharmBase):
     """Auditd service."""
 
+    on = AuditdCharmEvents()
+    _stored = ops.StoredState()
+
     def __init__(self, *args: typing.Any) -> None:
         """Initialize the instance.
 
@@ -32,12 +78,64 @@ class AuditdOperatorCharm(ops.CharmBase):
 
         """
         super().__init__(*args)
+        tracing.reset()
+        self._stored.set_default(
+            restart_attempts=[],
+            last_restart_failure="",
+            journald_audit_masked=False,
+            journald_audit_volume=0,
+            log_inode=0,
+            log_size=0,
+            log_growth=[],
+            pending_restart=False,
+            pending_daemon_reload=False,
+        )
+        self._blocked_reason = ""
 
         self.auditd = AuditdService()
+        self.journald_audit = JournaldAuditSocket()
+        self.rotation_timer = RotationTimer()
+        self.exporter = HelperService(
+            "auditd-exporter",
+            "exporter.py",
+            "Metrics exporter for the auditd charm",
+            ["--metrics-dir", str(METRICS_DIR), "--port", str(EXPORTER_PORT)],
+        )
+        self.forwarder = HelperService(
+            "auditd-forwarder",
+            "forwarder.py",
+            "Audit multicast forwarder for the auditd charm",
+            [
+                "--output",
+                str(FORWARDER_LOG_FILE),
+                "--metrics-file",
+                str(METRICS_DIR / "forwarder.prom"),
+            ],
+            METRICS_DIR / "forwarder.prom",
+            ("syscalls.py",),
+        )
+        self.drift_watcher = HelperService(
+            "auditd-drift-watcher",
+            "watcher.py",
+            "Drift watcher for the auditd charm",
+            [
+                "--unit",
+                self.unit.name,
+                "--charm-dir",
+                str(self.charm_dir.absolute()),
+                "--event",
+                DRIFT_EVENT,
+                "--path",
+                str(AuditdService.config_file),
+                "--path",
+                str(AuditdService.rule_path),
+            ],
+        )
 
-        # Forward auditd logs
+        # Forward auditd logs and metrics
         self.cos_agent_provider = COSAgentProvider(
             self,
+            metrics_endpoints=[{"path": "/metrics", "port": EXPORTER_PORT}],
             refresh_events=[self.on.install, self.on.upgrade_charm],
         )
 
@@ -46,6 +144,17 @@ class AuditdOperatorCharm(ops.CharmBase):
         self.framework.observe(self.on.update_status, self._configure_charm)
         self.framework.observe(self.on.upgrade_charm, self._configure_charm)
         self.framework.observe(self.on.config_changed, self._configure_charm)
+        self.framework.observe(self.on.drift_detected, self._on_drift_detected)
+        self.framework.observe(self.on.benchmark_rules_action, self._on_benchmark_rules_action)
+        self.framework.observe(
+            self.on.list_rule_profiles_action, self._on_list_rule_profiles_action
+        )
+        self.framework.observe(self.on.simulate_rules_action, self._on_simulate_rules_action)
+        self.framework.observe(self.framework.on.commit, self._on_commit)
+
+    def _on_commit(self, _: ops.CommitEvent) -> None:
+        """Log where the hook time went."""
+        logger.debug("Hook timing: %s", tracing.summary())
 
     def _on_remove(self, _: ops.RemoveEvent) -> None:
         """Handle remove charm event."""
@@ -54,6 +163,12 @@ class AuditdOperatorCharm(ops.CharmBase):
             return
 
         self.unit.status = ops.MaintenanceStatus("Removing auditd package.")
+        self.exporter.remove()
+        self.forwarder.remove()
+        self.drift_watcher.remove()
+        self.rotation_timer.remove()
+        if self._stored.journald_audit_masked:
+            self.journald_audit.unmask()
         self.auditd.remove()
 
     def _on_install_or_upgrade(self, _: tuple[ops.InstallEvent | ops.UpgradeCharmEvent]) -> None:
@@ -62,20 +177,269 @@ class AuditdOperatorCharm(ops.CharmBase):
             logger.error("Not installing package: auditd cannot be run on a linux container.")
             raise PlatformUnsupportedError("Auditd cannot be run on a linux container.")
 
+        config = self._get_validated_config() or AuditdConfig.model_validate({}).model_dump()
         self.unit.status = ops.MaintenanceStatus("Installing or upgrading auditd package.")
-        self.auditd.install()
+        try:
+            self.auditd.install(
+                config["min_auditd_version"],
+                config["apt_cache_max_age"],
+                self._get_debs_resource(),
+            )
+            self.auditd.apply_changes()
+        except InvalidAuditRulesError as e:
+            logger.error("Not loading the audit rules: %s", str(e))
+            self._defer_changes()
+            self.unit.status = ops.BlockedStatus(str(e))
+
+    def _on_drift_detected(self, event: DriftDetectedEvent) -> None:
+        """Restore the managed files changed outside of the charm.
 
-    def _configure_charm(self, _: ops.HookEvent) -> None:
+        Args:
+            event: The event dispatched by the drift watcher.
+
+        """
+        logger.info("Drift detected in the auditd config or rules, reconciling.")
+        try:
+            self.auditd.update_rules()
+        except InvalidAuditRulesError as e:
+            self.unit.status = ops.BlockedStatus(str(e))
+            return
+        self._configure_charm(event)
+
+    def _configure_charm(self, event: ops.EventBase) -> None:
         """Configure the charm idempotently."""
         if not (config := self._get_validated_config()):
             self.unit.status = ops.BlockedStatus("Invalid config. Please check `juju debug-log`.")
             return
 
+        if isinstance(event, ops.ConfigChangedEvent):
+            # A config change is an operator action, give auditd a fresh set of restarts.
+            self._stored.restart_attempts = []
+
         if not self._configure_auditd(config):
-            self.unit.status = ops.BlockedStatus("Failed to configure and restart auditd.")
+            self.unit.status = ops.BlockedStatus(
+                self._blocked_reason or "Failed to configure and restart auditd."
+            )
             return
 
-        self.unit.status = ops.ActiveStatus()
+        listen_port = config["tcp_listen_port"]
+        self.unit.set_ports(*([listen_port] if listen_port else []))
+        self._ensure_helper_services(config)
+        details = [
+            self._check_health(),
+            self._configure_journald_audit(config),
+            self._forecast_log_growth(config),
+            tracing.status_detail(),
+        ]
+        self.unit.status = ops.ActiveStatus(", ".join(detail for detail in details if detail))
+
+    def _ensure_helper_services(self, config: dict) -> None:
+        """Install or update the metrics exporter and, if enabled, the optional helper services.
+
+        The audit log rotation timer is managed alongside, when a `rotate_schedule` is set.
+
+        Args:
+            config (dict): The validated charm config.
+
+        """
+        for record_type in config["forward_record_types"]:
+            self.forwarder.args.extend(["--record-type", record_type])
+        for key in config["forward_keys"]:
+            self.forwarder.args.extend(["--key", key])
+        if config["forward_dedup_window"]:
+            self.forwarder.args.extend(["--dedup-window", str(config["forward_dedup_window"])])
+        try:
+            self.exporter.ensure()
+            for service, enabled in (
+                (self.forwarder, config["netlink_forwarder"]),
+                (self.drift_watcher, config["drift_watcher"]),
+            ):
+                if enabled:
+                    service.ensure()
+                else:
+                    service.remove()
+            if config["rotate_schedule"]:
+                self.rotation_timer.ensure(config["rotate_schedule"])
+            else:
+                self.rotation_timer.remove()
+        except systemd.SystemdError as e:
+            logger.error("Failed to install the helper services: %s", str(e))
+
+    def _configure_journald_audit(self, config: dict) -> str:
+        """Mask or restore the journald audit socket, which duplicates the auditd log.
+
+        The journal volume of the audit messages is measured before masking the socket, as the
+        journal write volume saved by masking it.
+
+        Args:
+            config (dict): The validated charm config.
+
+        Returns:
+            The saved journal volume for the unit status, or an empty string.
+
+        """
+        try:
+            if config["mask_journald_audit"] and not self._stored.journald_audit_masked:
+                self._stored.journald_audit_volume = self.journald_audit.audit_volume()
+                self.journald_audit.mask()
+                self._stored.journald_audit_masked = True
+            elif not config["mask_journald_audit"] and self._stored.journald_audit_masked:
+                self.journald_audit.unmask()
+                self._stored.journald_audit_masked = False
+        except systemd.SystemdError as e:
+            logger.error("Failed to configure the journald audit socket: %s", str(e))
+
+        if not self._stored.journald_audit_masked:
+            return ""
+        volume = self._stored.journald_audit_volume / 2**20
+        return f"journald audit masked, saving {volume:.1f} MiB/h"
+
+    def _check_health(self) -> str:
+        """Export the auditd health snapshot.
+
+        Returns:
+            The notable health issues for the unit status.
+
+        """
+        try:
+            health = self.auditd.health()
+        except ServiceControlError as e:
+            logger.warning("Failed to get the auditd health: %s", str(e))
+            return ""
+        logger.debug("Auditd health: %s", health)
+        write_metrics("auditd", health.metrics())
+        return health.status_detail()
+
+    def _forecast_log_growth(self, config: dict) -> str:
+        """Sample the audit log growth and export the retention forecast.
+
+        Args:
+            config: The validated charm config.
+
+        Returns:
+            The retention warning for the unit status, or an empty string.
+
+        """
+        try:
+            inode, size, growth = measure_growth(
+                AUDIT_LOG_FILE, self._stored.log_inode, self._stored.log_size
+            )
+        except FileNotFoundError:
+            return ""
+        samples = [list(sample) for sample in self._stored.log_growth]
+        written = samples[-1][1] + growth if samples else 0
+        samples = [*samples, [time.time(), written]][-LOG_GROWTH_SAMPLES:]
+        self._stored.log_inode, self._stored.log_size = inode, size
+        self._stored.log_growth = samples
+
+        if (rate := growth_rate(samples)) is None:
+            return ""
+        result = forecast(rate, AUDIT_LOG_FILE, config, AUDITD_SPACE_LEFT)
+        min_retention = config["min_retention_hours"]
+        write_metrics(
+            "auditd_log", {**result.metrics(), "min_retention_seconds": min_retention * 3600}
+        )
+        if (
+            result.retention_seconds is not None
+            and result.retention_seconds < min_retention * 3600
+        ):
+            logger.warning(
+                "Audit log retention %.1fh is below the %dh minimum, increase num_logs or "
+                "max_log_file.",
+                result.retention_seconds / 3600,
+                min_retention,
+            )
+        return result.status_detail(min_retention)
+
+    def _get_debs_resource(self) -> Path | None:
+        """Get the attached auditd debs resource.
+
+        Returns:
+            The path to the resource, or None if it is not attached or empty.
+
+        """
+        try:
+            path = self.model.resources.fetch("auditd-debs")
+        except (ops.ModelError, NameError):
+            return None
+        if not path.stat().st_size:
+            return None
+        logger.info("Using the attached auditd-debs resource.")
+        return path
+
+    def _on_benchmark_rules_action(self, event: ops.ActionEvent) -> None:
+        """Handle benchmark-rules action."""
+        if not (config := self._get_validated_config()):
+            event.fail("Invalid config. Please check `juju debug-log`.")
+            return
+
+        event.log("Measuring syscall latency of the loaded, empty and bundled rule sets.")
+        try:
+            current, proposed = self.auditd.benchmark_rules(
+                event.params["iterations"], config["rule_profile"]
+            )
+        except (AuditRuleReloadError, InvalidAuditRulesError) as e:
+            logger.error("Failed to benchmark audit rules: %s", str(e))
+            event.fail(f"Failed to benchmark audit rules: {e}")
+            return
+
+        over_budget = exceeds_budget(proposed, config["max_rule_overhead"])
+        event.set_results(
+            {
+                "current": format_overhead(current),
+                "proposed": format_overhead(proposed),
+                "applied": bool(event.params["apply"] and not over_budget),
+            }
+        )
+        if over_budget:
+            event.fail(
+                f"Bundled rules exceed the {config['max_rule_overhead']}% overhead budget for: "
+                f"{', '.join(over_budget)}."
+            )
+            return
+
+        if event.params["apply"]:
+            # Install the exact rule set which was measured: the bundled rules and the profile.
+            logger.info("Applying the benchmarked audit rules.")
+            try:
+                self.auditd.update_rules()
+                self.auditd.configure_profile(config["rule_profile"])
+                self.auditd.apply_changes()
+            except InvalidAuditRulesError as e:
+                event.fail(str(e))
+
+    def _on_list_rule_profiles_action(self, event: ops.ActionEvent) -> None:
+        """Handle list-rule-profiles action."""
+        results = {}
+        for name in RULE_PROFILES:
+            profile = read_profile(Path(RULE_PROFILE_PATH) / f"{name}.rules")
+            results[name] = {
+                "description": profile.description,
+                "events-per-second": str(profile.events_per_second),
+                "overhead": {
+                    syscall: f"{overhead}%" for syscall, overhead in profile.overhead.items()
+                },
+            }
+        event.set_results(results)
+
+    def _on_simulate_rules_action(self, event: ops.ActionEvent) -> None:
+        """Handle simulate-rules action."""
+        if not (config := self._get_validated_config()):
+            event.fail("Invalid config. Please check `juju debug-log`.")
+            return
+
+        profile = event.params.get("profile", config["rule_profile"])
+        if profile and profile not in RULE_PROFILES:
+            event.fail(f"'profile' must be empty or one of {', '.join(RULE_PROFILES)}.")
+            return
+
+        try:
+            simulation = self.auditd.simulate_rules(Path(event.params["trace"]), profile, config)
+        except (OSError, ValueError) as e:
+            event.fail(f"Failed to simulate the audit rules: {e}")
+            return
+
+        event.set_results(format_simulation(simulation))
 
     def _is_valid_platform(self) -> bool:
         """Check if the charm is supported in the current platform.
@@ -113,28 +477,119 @@ class AuditdOperatorCharm(ops.CharmBase):
             True if the auditd service is properly configured, otherwise False.
 
         """
+        if profile := config["rule_profile"]:
+            estimate = read_profile(Path(RULE_PROFILE_PATH) / f"{profile}.rules")
+            budget = config["max_rule_overhead"]
+            if over_budget := estimate.exceeds_budget(budget):
+                self._blocked_reason = (
+                    f"Rule profile '{profile}' is estimated to exceed the {budget}% overhead "
+                    f"budget for: {', '.join(over_budget)}."
+                )
+                return False
+
         new_content = self.auditd.render_config(config).strip()
         current_content = read_file(AuditdService.config_file).strip()
 
         if new_content != current_content:
             logging.info("Configuring auditd service.")
-            try:
-                self.auditd.configure(new_content)
-            except AuditdServiceRestartError as e:
-                logger.error("Failed to apply new config: %s", str(e))
-                return False
+            self.auditd.configure(new_content)
 
-        if not self.auditd.is_active():
-            logger.error("Auditd is not active.")
-            try:
-                logger.info("Trying to restart auditd.")
-                self.auditd.restart()
-            except AuditdServiceRestartError as e:
-                logger.error("Failed to restart auditd: %s", str(e))
+        self.auditd.configure_resources(config)
+        self.auditd.configure_remote(config)
+
+        try:
+            self.auditd.configure_profile(profile)
+            self._restore_deferred_changes()
+            if not self.auditd.plan.restart and not self._check_running():
                 return False
-            else:
-                logger.info("Auditd restart successfully.")
+            self.auditd.apply_changes()
+        except AuditdServiceRestartError as e:
+            logger.error("Failed to apply auditd changes: %s", str(e))
+            self._stored.last_restart_failure = str(e)
+            self._blocked_reason = f"Failed to configure and restart auditd: {e}"
+            return False
+        except InvalidAuditRulesError as e:
+            self._defer_changes()
+            self._blocked_reason = str(e)
+            return False
+
+        self._stored.pending_restart = False
+        self._stored.pending_daemon_reload = False
+        return True
+
+    def _check_running(self) -> bool:
+        """Reload drifted rules of the running auditd, or schedule a restart of the inactive one.
+
+        Returns:
+            True if auditd is running or a restart is scheduled, otherwise False with the blocked
+            reason set.
+
+        """
+        try:
+            if not self.auditd.is_active():
+                return self._schedule_recovery_restart()
+        except ServiceControlError as e:
+            logger.error("Failed to query the auditd service: %s", str(e))
+            self._blocked_reason = f"Failed to query the auditd service: {e}"
+            return False
+
+        self._stored.restart_attempts = []
+        self._stored.last_restart_failure = ""
+        if not self.auditd.plan.reload_rules and not self.auditd.rules_in_sync():
+            self.auditd.plan.schedule_rule_reload("loaded audit rules drifted")
+        return True
+
+    def _defer_changes(self) -> None:
+        """Keep the restart and systemd reload blocked by invalid rules for the next hook.
+
+        The config and drop-in files are already written, so the next hook would not find them
+        changed and schedule the restart again.
+        """
+        self._stored.pending_restart |= self.auditd.plan.restart
+        self._stored.pending_daemon_reload |= self.auditd.plan.daemon_reload
+
+    def _restore_deferred_changes(self) -> None:
+        """Schedule the restart and systemd reload deferred by invalid rules."""
+        if self._stored.pending_daemon_reload:
+            self.auditd.plan.schedule_daemon_reload("unit files changed before invalid rules")
+        if self._stored.pending_restart:
+            self.auditd.plan.schedule_restart("config changed before invalid rules")
+
+    def _schedule_recovery_restart(self) -> bool:
+        """Schedule a restart of the inactive auditd service, unless it is crash-looping.
+
+        Restarts are spaced by an exponential backoff over the persisted attempt history, and
+        stop once systemd or the charm restarted auditd `max_restarts` times without it staying
+        up, until the next config change.
+
+        Returns:
+            True if a restart is scheduled, otherwise False with the blocked reason set.
+
+        """
+        state = self.auditd.state()
+        logger.error("Auditd is not active: %s (%s).", state.active_state, state.sub_state)
+        if not self._stored.last_restart_failure:
+            self._stored.last_restart_failure = f"auditd is {state.active_state}"
+        reason = self._stored.last_restart_failure
+
+        # systemd only resets NRestarts on an explicit restart, so it only counts towards the
+        # crash loop once the charm restarted auditd itself.
+        attempts = list(self._stored.restart_attempts)
+        restarts = max(state.n_restarts, len(attempts)) if attempts else 0
+        if restarts >= AUDITD_MAX_RESTARTS:
+            logger.error("Auditd is crash-looping after %d restarts, not restarting.", restarts)
+            self._blocked_reason = f"auditd is crash-looping ({restarts} restarts): {reason}"
+            return False
+
+        delay = backoff_delay(len(attempts), RESTART_BACKOFF_BASE, RESTART_BACKOFF_MAX)
+        remaining = attempts[-1] + delay - time.time() if attempts else 0
+        if remaining > 0:
+            logger.warning("Backing off auditd restart for %.0fs.", remaining)
+            self._blocked_reason = f"auditd is down, next restart in {remaining:.0f}s: {reason}"
+            return False
 
+        self._stored.restart_attempts = [*attempts, time.time()]
+        self.auditd.plan.schedule_restart("auditd is not active")
         return True
 
 
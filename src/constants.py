@@ -3,13 +3,88 @@
 
 """Common of globals variables to the charm."""
 
+from pathlib import Path
+
 # Auditd rules
 AUDIT_RULE_PATH = "./src/audit_rules"
+RULE_PROFILE_PATH = "./src/audit_rules/profiles"
+RULE_PROFILES = ("cis", "stig", "pci-dss")
+RULE_PROFILE_PREFIX = "juju-profile-"
+COMPAT_ARCHES = {"x86_64": "i386", "aarch64": "arm", "ppc64le": "ppc", "s390x": "s390"}
 
 # Template files
 TEMPLATE_FILE_PATH = "./src/auditd_templates"
 AUDITD_CONFIG_TEMPLATE = "auditd.conf.j2"
+HELPER_SERVICE_TEMPLATE = "helper.service.j2"
+ROTATE_SERVICE_TEMPLATE = "auditd-rotate.service.j2"
+ROTATE_TIMER_TEMPLATE = "auditd-rotate.timer.j2"
+AUDITD_RESOURCES_TEMPLATE = "auditd-resources.conf.j2"
+AUDISP_REMOTE_TEMPLATE = "audisp-remote.conf.j2"
+AU_REMOTE_PLUGIN_TEMPLATE = "au-remote.conf.j2"
+
+# Helper services
+HELPER_SCRIPT_PATH = "./src"
+HELPER_LIB_DIR = Path("/usr/local/lib/juju-auditd")
+SYSTEMD_UNIT_DIR = Path("/etc/systemd/system")
+
+# Netlink forwarder
+FORWARDER_LOG_FILE = Path("/var/log/audit-forward/audit.log")
+
+# Drift watcher
+DRIFT_EVENT = "drift-detected"
 
 # Common constants
 AUDITD_MIN_NUM_LOGS = 0
 AUDITD_MAX_NUM_LOGS = 999
+
+# Package installation
+APT_CACHE_FILE = Path("/var/cache/apt/pkgcache.bin")
+APT_CACHE_MAX_AGE = 24
+DPKG_STATUS_FILE = Path("/var/lib/dpkg/status")
+
+# Remote logging
+AUDISP_PLUGINS_PKG = "audispd-plugins"
+NETWORK_FAILURE_ACTIONS = ("ignore", "syslog", "suspend", "single", "halt", "stop")
+OVERFLOW_ACTIONS = ("ignore", "syslog", "suspend", "single", "halt")
+REMOTE_FORMATS = ("managed", "ascii")
+AUDISP_REMOTE_QUEUE_FILE = Path("/var/spool/audit/remote.log")
+
+# Log format
+LOG_FORMATS = ("RAW", "ENRICHED")
+
+# Resource controls
+IO_SCHEDULING_CLASSES = ("realtime", "best-effort", "idle")
+
+# Rule benchmark
+BENCHMARK_PROBE_PATH = "/etc/passwd"
+BENCHMARK_EXECVE_BINARY = "/bin/true"
+
+# Hook tracing
+SLOW_HOOK_THRESHOLD = 10
+
+# Service control
+SERVICE_JOB_TIMEOUT = 90
+
+# Health and metrics
+METRICS_DIR = Path("/var/lib/juju-auditd/metrics")
+EXPORTER_PORT = 9842
+HEALTH_PROPERTIES = (
+    "ActiveState",
+    "SubState",
+    "MainPID",
+    "NRestarts",
+    "MemoryCurrent",
+    "CPUUsageNSec",
+    "IOReadBytes",
+    "IOWriteBytes",
+)
+
+# Log growth forecast
+AUDIT_LOG_FILE = Path("/var/log/audit/audit.log")
+AUDITD_SPACE_LEFT = 75
+LOG_GROWTH_SAMPLES = 288
+
+# Restart backoff
+AUDITD_MAX_RESTARTS = 10
+RESTART_BACKOFF_BASE = 300
+RESTART_BACKOFF_MAX = 6 * 3600
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Serve the metrics textfiles written by the auditd charm over HTTP.
+
+The charm and its helper services write `.prom` files in the metrics directory between hooks,
+and `auditd-exporter.service` concatenates them on each scrape of `/metrics` by the COS agent.
+"""
+
+import argparse
+import http.server
+import logging
+from pathlib import Path
+
+logger = logging.getLogger("auditd-exporter")
+
+
+def collect(metrics_dir: Path) -> bytes:
+    """Concatenate the metrics textfiles.
+
+    Args:
+        metrics_dir: The directory holding the '*.prom' textfiles.
+
+    Returns:
+        The metrics in the Prometheus text exposition format.
+
+    """
+    content = []
+    for textfile in sorted(metrics_dir.glob("*.prom")):
+        try:
+            content.append(textfile.read_bytes())
+        except FileNotFoundError:
+            continue
+    return b"".join(content)
+
+
+def make_handler(metrics_dir: Path) -> type[http.server.BaseHTTPRequestHandler]:
+    """Make a request handler serving the metrics textfiles on /metrics.
+
+    Args:
+        metrics_dir: The directory holding the '*.prom' textfiles.
+
+    Returns:
+        The request handler class.
+
+    """
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        """Serve /metrics."""
+
+        def do_GET(self) -> None:  # noqa: N802
+            """Handle GET requests."""
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = collect(metrics_dir)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+            """Log requests at debug level only."""
+            logger.debug(format, *args)
+
+    return MetricsHandler
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the exporter.
+
+    Args:
+        argv: The command line arguments.
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--metrics-dir", type=Path, required=True)
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = http.server.ThreadingHTTPServer(
+        (args.address, args.port), make_handler(args.metrics_dir)
+    )
+    logger.info("Serving %s on %s:%d", args.metrics_dir, args.address, args.port)
+    server.serve_forever()
+
+
+if __name__ == "__main__":  # pragma: nocover
+    main()
@@ -0,0 +1,162 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""The audit log growth forecast module.
+
+The growth of audit.log is sampled on every hook and kept in a small ring buffer, from which the
+retention horizon of the `num_logs` rotated files and the time until auditd's `space_left`
+threshold triggers are forecast.
+"""
+
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+MIB = 1024 * 1024
+
+
+def measure_growth(log_file: Path, inode: int, size: int) -> tuple[int, int, int]:
+    """Measure how much the audit log grew since the previous sample.
+
+    When the log was rotated since the previous sample, the rest of the previous file is read
+    from 'audit.log.1'.
+
+    Args:
+        log_file: The audit log file.
+        inode: The inode of the log file at the previous sample.
+        size: The size of the log file at the previous sample.
+
+    Returns:
+        The (inode, size) of the log file and the bytes written since the previous sample.
+
+    Raises:
+        FileNotFoundError: When the log file does not exist.
+
+    """
+    stat = log_file.stat()
+    if stat.st_ino == inode and stat.st_size >= size:
+        return stat.st_ino, stat.st_size, stat.st_size - size
+    growth = stat.st_size
+    try:
+        rotated = log_file.with_name(f"{log_file.name}.1").stat()
+    except FileNotFoundError:
+        return stat.st_ino, stat.st_size, growth
+    if rotated.st_ino == inode:
+        growth += max(rotated.st_size - size, 0)
+    return stat.st_ino, stat.st_size, growth
+
+
+def logs_size(log_file: Path) -> int:
+    """Get the size of the audit log and of its rotated files.
+
+    Args:
+        log_file: The audit log file.
+
+    Returns:
+        The total size in bytes.
+
+    """
+    total = 0
+    for path in log_file.parent.glob(f"{log_file.name}*"):
+        try:
+            total += path.stat().st_size
+        except FileNotFoundError:
+            continue
+    return total
+
+
+def growth_rate(samples: list[list[float]]) -> float | None:
+    """Compute the growth rate over the ring buffer.
+
+    Args:
+        samples: The (timestamp, cumulative bytes written) samples, oldest first.
+
+    Returns:
+        The growth rate in bytes per second, or None if the samples do not span any time.
+
+    """
+    if len(samples) < 2:  # noqa: PLR2004
+        return None
+    (start, start_bytes), (end, end_bytes) = samples[0], samples[-1]
+    if end <= start:
+        return None
+    return (end_bytes - start_bytes) / (end - start)
+
+
+@dataclass
+class LogForecast:
+    """The audit log retention forecast.
+
+    Attributes:
+        bytes_per_second: The growth rate of the audit log.
+        retention_seconds: The time covered by the `num_logs` files, None if the log does not
+            grow.
+        space_left_seconds: The time until the free disk space reaches `space_left`, None if
+            the rotated logs never fill the disk that far.
+
+    """
+
+    bytes_per_second: float
+    retention_seconds: float | None
+    space_left_seconds: float | None
+
+    def metrics(self) -> dict[str, float | None]:
+        """Get the forecast as gauges.
+
+        Returns:
+            The gauge values keyed by metric name.
+
+        """
+        return {
+            "growth_bytes_per_second": round(self.bytes_per_second, 3),
+            "retention_seconds": self.retention_seconds,
+            "space_left_seconds": self.space_left_seconds,
+        }
+
+    def status_detail(self, min_retention_hours: int) -> str:
+        """Summarize the forecast for the unit status.
+
+        The forecast figures change on every sample, so they are only exported as metrics and
+        the status only reports a retention below the minimum, in stable terms.
+
+        Args:
+            min_retention_hours: The minimum retention, 0 to disable the warning.
+
+        Returns:
+            The retention warning, or an empty string.
+
+        """
+        if self.retention_seconds is None or self.retention_seconds >= min_retention_hours * 3600:
+            return ""
+        return f"audit log retention below the {min_retention_hours}h minimum"
+
+
+def forecast(
+    bytes_per_second: float,
+    log_file: Path,
+    config: dict,
+    space_left: int,
+) -> LogForecast:
+    """Forecast the retention horizon and the time until `space_left` triggers.
+
+    Args:
+        bytes_per_second: The growth rate of the audit log.
+        log_file: The audit log file.
+        config: The charm config, for `max_log_file` and `num_logs`.
+        space_left: The `space_left` threshold of auditd, in MiB.
+
+    Returns:
+        The forecast.
+
+    """
+    capacity = config["max_log_file"] * MIB * max(config["num_logs"], 1)
+    if bytes_per_second <= 0:
+        return LogForecast(bytes_per_second, None, None)
+
+    # auditd deletes the oldest file once `num_logs` files are full, so the logs only reach
+    # `space_left` when the disk fills up before they reach their capacity.
+    headroom = shutil.disk_usage(log_file.parent).free - space_left * MIB
+    space_left_seconds = None
+    if capacity - logs_size(log_file) > headroom:
+        space_left_seconds = max(headroom, 0) / bytes_per_second
+    return LogForecast(bytes_per_second, capacity / bytes_per_second, space_left_seconds)
@@ -0,0 +1,681 @@
+#!/usr/bin/env python3
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Read the audit events from the kernel multicast socket and write them for forwarding.
+
+Like journald, the forwarder subscribes to the NETLINK_AUDIT read-only multicast group, so that
+the events can be forwarded without auditd writing them to /var/log/audit first. The records
+are enriched, filtered and deduplicated before being written to a rotated log file, with their
+counters written as a metrics textfile.
+
+The module is run as `auditd-forwarder.service` with the system python, so it only imports the
+standard library and the syscalls module installed alongside it.
+"""
+
+import argparse
+import errno
+import functools
+import grp
+import logging
+import logging.handlers
+import os
+import pwd
+import re
+import socket
+import struct
+import time
+import typing
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from syscalls import ARCHITECTURES, syscall_table
+
+logger = logging.getLogger("auditd-forwarder")
+
+NETLINK_AUDIT = 9
+AUDIT_NLGRP_READLOG = 1
+NLMSG_HEADER = struct.Struct("=IHHII")
+RECV_SIZE = 64 * 1024
+RESOLVER_CACHE_SIZE = 4096
+EVENT_KEY_CACHE_SIZE = 1024
+DEDUP_CACHE_SIZE = 4096
+MAX_PENDING_EVENTS = 256
+# The end_of_event_timeout of auditd.conf, after which an event without EOE is complete.
+END_OF_EVENT_TIMEOUT = 2.0
+AUDIT_SYSCALL = 1300
+AUDIT_EOE = 1320
+AUDIT_DEDUP = 2999
+
+# See linux/audit.h and libaudit.h, unknown types are written as auditd does.
+RECORD_TYPES = {
+    1006: "LOGIN",
+    1100: "USER_AUTH",
+    1101: "USER_ACCT",
+    1102: "USER_MGMT",
+    1103: "CRED_ACQ",
+    1104: "CRED_DISP",
+    1105: "USER_START",
+    1106: "USER_END",
+    1110: "CRED_REFR",
+    1112: "USER_LOGIN",
+    1113: "USER_LOGOUT",
+    1130: "SERVICE_START",
+    1131: "SERVICE_STOP",
+    1300: "SYSCALL",
+    1302: "PATH",
+    1303: "IPC",
+    1305: "CONFIG_CHANGE",
+    1306: "SOCKADDR",
+    1307: "CWD",
+    1309: "EXECVE",
+    1320: "EOE",
+    1326: "SECCOMP",
+    1327: "PROCTITLE",
+    1400: "AVC",
+    1701: "ANOM_ABEND",
+    # Written by the forwarder for the repeats of a collapsed event, in the user message range.
+    AUDIT_DEDUP: "DEDUP",
+}
+
+USER_FIELDS = ("auid", "uid", "euid", "suid", "fsuid", "ouid", "oauid", "inode_uid")
+GROUP_FIELDS = ("gid", "egid", "sgid", "fsgid", "ogid", "inode_gid")
+INTERPRETED_FIELD_PATTERN = re.compile(
+    rf"(?<= )({'|'.join((*USER_FIELDS, *GROUP_FIELDS, 'arch', 'syscall'))})=(\w+)"
+)
+UNSET_ID = "4294967295"
+ENRICHED_SEPARATOR = "\x1d"
+EVENT_ID_PATTERN = re.compile(r"^audit\((\d+\.\d+:\d+)\)")
+KEY_PATTERN = re.compile(r' key=("[^"]*"|\S+)')
+KEY_SEPARATOR = "\x01"
+SIGNATURE_FIELD_PATTERN = re.compile(r'(?<= )(exe|syscall|key|name)=("[^"]*"|\S+)')
+
+
+@functools.lru_cache(maxsize=RESOLVER_CACHE_SIZE)
+def resolve_user(uid: str) -> str:
+    """Resolve a user id to its name, e.g. '0' to 'root'.
+
+    Args:
+        uid: The user id.
+
+    Returns:
+        The user name, 'unset', or 'unknown(<uid>)'.
+
+    """
+    if uid in (UNSET_ID, "-1"):
+        return "unset"
+    try:
+        return pwd.getpwuid(int(uid)).pw_name
+    except (KeyError, ValueError):
+        return f"unknown({uid})"
+
+
+@functools.lru_cache(maxsize=RESOLVER_CACHE_SIZE)
+def resolve_group(gid: str) -> str:
+    """Resolve a group id to its name, e.g. '0' to 'root'.
+
+    Args:
+        gid: The group id.
+
+    Returns:
+        The group name, 'unset', or 'unknown(<gid>)'.
+
+    """
+    if gid in (UNSET_ID, "-1"):
+        return "unset"
+    try:
+        return grp.getgrgid(int(gid)).gr_name
+    except (KeyError, ValueError):
+        return f"unknown({gid})"
+
+
+def enrich(text: str) -> str:
+    """Resolve the ids of a record the way auditd does with the ENRICHED log format.
+
+    Args:
+        text: The record body.
+
+    Returns:
+        The interpreted fields to append to the record after the enriched separator, e.g.
+        'ARCH=x86_64 SYSCALL=execve AUID="ubuntu" UID="root"', or an empty string.
+
+    """
+    fields = dict(INTERPRETED_FIELD_PATTERN.findall(text))
+    arch = ARCHITECTURES.get(fields.pop("arch", ""), "")
+    enriched = []
+    if arch:
+        enriched.append(f"ARCH={arch}")
+    syscall = fields.pop("syscall", None)
+    if arch and syscall and (name := syscall_table(arch).get(syscall)):
+        enriched.append(f"SYSCALL={name}")
+    for name, value in fields.items():
+        resolved = resolve_user(value) if name in USER_FIELDS else resolve_group(value)
+        enriched.append(f'{name.upper()}="{resolved}"')
+    return " ".join(enriched)
+
+
+def resolver_cache_stats() -> dict[str, int]:
+    """Get the resolver cache counters.
+
+    Returns:
+        The number of cache hits and misses of the user and group resolvers.
+
+    """
+    infos = (resolve_user.cache_info(), resolve_group.cache_info())
+    return {"hits": sum(i.hits for i in infos), "misses": sum(i.misses for i in infos)}
+
+
+@dataclass(frozen=True)
+class Record:
+    """An audit record.
+
+    Attributes:
+        type: The numeric record type, e.g. 1300.
+        text: The record body, e.g. 'audit(1700000000.123:42): arch=c000003e ...'.
+
+    """
+
+    type: int
+    text: str
+
+    @property
+    def type_name(self) -> str:
+        """The name of the record type, e.g. 'SYSCALL'."""
+        return RECORD_TYPES.get(self.type, f"UNKNOWN[{self.type}]")
+
+    def format(self, enriched: bool = False) -> str:
+        """Format the record the way auditd writes it.
+
+        Args:
+            enriched: Append the resolved names as with the ENRICHED log format.
+
+        Returns:
+            The log line, without the trailing newline.
+
+        """
+        line = f"type={self.type_name} msg={self.text}"
+        if enriched and (names := enrich(self.text)):
+            return f"{line}{ENRICHED_SEPARATOR}{names}"
+        return line
+
+
+def record_keys(text: str) -> tuple[str, ...] | None:
+    """Get the rule keys of a record.
+
+    The kernel hex-encodes the key field when a rule has several keys, separated by 0x01 bytes.
+
+    Args:
+        text: The record body.
+
+    Returns:
+        The keys, empty for 'key=(null)', or None if the record has no key field.
+
+    """
+    if not (match := KEY_PATTERN.search(text)):
+        return None
+    value = match.group(1)
+    if value.startswith('"'):
+        return (value.strip('"'),)
+    try:
+        return tuple(bytes.fromhex(value).decode(errors="replace").split(KEY_SEPARATOR))
+    except ValueError:
+        return ()
+
+
+def event_id(text: str) -> str | None:
+    """Get the id of the event of a record.
+
+    Args:
+        text: The record body.
+
+    Returns:
+        The event id, e.g. '1700000000.123:42', or None for a record without one.
+
+    """
+    return match.group(1) if (match := EVENT_ID_PATTERN.match(text)) else None
+
+
+@dataclass
+class RecordFilter:
+    """Select the records to forward by record type and rule key.
+
+    Only the first record of an event (e.g. SYSCALL) carries the key, so the keys are remembered
+    per event, in a bounded cache, for its following records (e.g. PATH, PROCTITLE).
+
+    Attributes:
+        types: The record type names to forward, all if empty.
+        keys: The rule keys of the events to forward, all if empty.
+        event_keys: The keys of the recent events by event id.
+
+    """
+
+    types: frozenset[str] = frozenset()
+    keys: frozenset[str] = frozenset()
+    event_keys: OrderedDict[str, tuple[str, ...]] = field(default_factory=OrderedDict)
+
+    def accepts(self, record: Record) -> bool:
+        """Check if a record is forwarded.
+
+        Args:
+            record: The audit record.
+
+        Returns:
+            True if the record is selected by both its type and the keys of its event.
+
+        """
+        # The keys are learnt before the type is checked, as the record carrying them may be of
+        # a type which is not forwarded.
+        keys = self._event_keys(record.text) if self.keys else ()
+        if self.types and record.type_name not in self.types and record.type != AUDIT_DEDUP:
+            return False
+        return not self.keys or not self.keys.isdisjoint(keys)
+
+    def _event_keys(self, text: str) -> tuple[str, ...]:
+        """Get the keys of the event of a record.
+
+        Args:
+            text: The record body.
+
+        Returns:
+            The keys of the event, empty if unknown.
+
+        """
+        if not (current := event_id(text)):
+            return ()
+        keys = record_keys(text)
+        if keys is None:
+            return self.event_keys.get(current, ())
+        self.event_keys[current] = keys
+        self.event_keys.move_to_end(current)
+        if len(self.event_keys) > EVENT_KEY_CACHE_SIZE:
+            self.event_keys.popitem(last=False)
+        return keys
+
+
+def event_signature(records: list[Record]) -> tuple[str, ...]:
+    """Get the signature identifying the repeats of a syscall event.
+
+    Args:
+        records: The records of the event.
+
+    Returns:
+        The exe, syscall and key of the event followed by its path names.
+
+    """
+    fields: dict[str, str] = {}
+    names = []
+    for record in records:
+        for name, value in SIGNATURE_FIELD_PATTERN.findall(record.text):
+            if name == "name":
+                names.append(value)
+            else:
+                fields.setdefault(name, value)
+    return (fields.get("exe", ""), fields.get("syscall", ""), fields.get("key", ""), *names)
+
+
+@dataclass
+class Repeats:
+    """The repeats of a syscall event within the dedup window.
+
+    Attributes:
+        event_id: The id of the first event, which was written.
+        start: The timestamp of the first event.
+        key: The key field of the event, e.g. 'key="exec"'.
+        count: The number of repeats collapsed into the first event.
+        last_id: The id of the last repeat.
+
+    """
+
+    event_id: str
+    start: float
+    key: str
+    count: int = 0
+    last_id: str = ""
+
+    def summary(self) -> list[Record]:
+        """Get the record summarizing the collapsed repeats.
+
+        Returns:
+            The DEDUP record, or no record when the event was not repeated.
+
+        """
+        if not self.count:
+            return []
+        text = f"audit({self.event_id}): repeats={self.count} last={self.last_id} {self.key}"
+        return [Record(AUDIT_DEDUP, text.rstrip())]
+
+
+class Deduplicator:
+    """Collapse the repeated syscall events within a time window.
+
+    The records of a syscall event are held until its EOE record. The first event of a
+    signature is written and its repeats within the window are only counted, then written as a
+    DEDUP record when the window closes. The signatures are kept in an LRU cache, so that the
+    memory stays bounded during bursts of distinct events.
+    """
+
+    def __init__(self, window: float, size: int = DEDUP_CACHE_SIZE) -> None:
+        """Initialize the instance.
+
+        Args:
+            window: The number of seconds during which the repeats of an event are collapsed.
+            size: The maximum number of signatures kept.
+
+        """
+        self.window = window
+        self.size = size
+        self.pending: OrderedDict[str, list[Record]] = OrderedDict()
+        self.recent: OrderedDict[tuple[str, ...], Repeats] = OrderedDict()
+        self.collapsed = 0
+
+    def feed(self, record: Record) -> list[Record]:
+        """Add a record to its event.
+
+        Args:
+            record: The audit record.
+
+        Returns:
+            The records to write, in order.
+
+        """
+        current = event_id(record.text)
+        if current and record.type == AUDIT_SYSCALL:
+            self.pending[current] = [record]
+            if len(self.pending) > MAX_PENDING_EVENTS:
+                return self.pending.popitem(last=False)[1]
+            return []
+        if current is None or current not in self.pending:
+            return [record]
+        if record.type != AUDIT_EOE:
+            self.pending[current].append(record)
+            return []
+        return self._collapse(current, [*self.pending.pop(current), record])
+
+    def _collapse(self, current: str, records: list[Record]) -> list[Record]:
+        """Write or count a complete syscall event.
+
+        Args:
+            current: The event id.
+            records: The records of the event.
+
+        Returns:
+            The records to write.
+
+        """
+        signature = event_signature(records)
+        timestamp = float(current.split(":", 1)[0])
+        output = []
+        if repeats := self.recent.get(signature):
+            self.recent.move_to_end(signature)
+            if timestamp - repeats.start < self.window:
+                repeats.count += 1
+                repeats.last_id = current
+                self.collapsed += 1
+                return []
+            output.extend(repeats.summary())
+        key = f"key={signature[2]}" if signature[2] else ""
+        self.recent[signature] = Repeats(current, timestamp, key)
+        if len(self.recent) > self.size:
+            output.extend(self.recent.popitem(last=False)[1].summary())
+        return [*output, *records]
+
+    def expire(self, now: float) -> list[Record]:
+        """Close the windows which ended and the events which never got their EOE record.
+
+        Args:
+            now: The current time.
+
+        Returns:
+            The records to write.
+
+        """
+        output = []
+        while self.pending:
+            current, records = next(iter(self.pending.items()))
+            if now - float(current.split(":", 1)[0]) < END_OF_EVENT_TIMEOUT:
+                break
+            output.extend(records)
+            del self.pending[current]
+        for signature, repeats in list(self.recent.items()):
+            if now - repeats.start >= self.window:
+                output.extend(repeats.summary())
+                del self.recent[signature]
+        return output
+
+
+@dataclass
+class Stats:
+    """Counters of the forwarder.
+
+    Attributes:
+        records: The number of records written.
+        bytes: The number of bytes written.
+        overruns: The number of times the socket buffer overflowed and records were lost.
+        filtered: The number of records not forwarded by the record filter.
+        deduplicated: The number of repeated events collapsed by the deduplicator.
+        types: The number of records written per record type.
+
+    """
+
+    records: int = 0
+    bytes: int = 0
+    overruns: int = 0
+    filtered: int = 0
+    deduplicated: int = 0
+    types: dict[str, int] = field(default_factory=dict)
+
+
+def parse_messages(buffer: bytes) -> list[Record]:
+    """Parse the netlink messages read from the audit socket.
+
+    Args:
+        buffer: The bytes of one datagram.
+
+    Returns:
+        The audit records of the messages.
+
+    """
+    records = []
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(buffer):
+        length, msg_type, _, _, _ = NLMSG_HEADER.unpack_from(buffer, offset)
+        if length < NLMSG_HEADER.size:
+            break
+        payload = buffer[offset + NLMSG_HEADER.size : offset + length]
+        records.append(Record(msg_type, payload.rstrip(b"\0\n").decode(errors="replace")))
+        offset += (length + 3) & ~3
+    return records
+
+
+def open_socket(receive_buffer: int) -> socket.socket:
+    """Subscribe to the audit multicast group.
+
+    Args:
+        receive_buffer: The size of the socket receive buffer, in bytes.
+
+    Returns:
+        The bound netlink socket.
+
+    """
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_AUDIT)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+    sock.bind((0, 1 << (AUDIT_NLGRP_READLOG - 1)))
+    return sock
+
+
+def render_metrics(stats: Stats) -> str:
+    """Render the forwarder counters in the Prometheus text exposition format.
+
+    Args:
+        stats: The forwarder counters.
+
+    Returns:
+        The metrics.
+
+    """
+    lines = []
+    for name, value in (
+        ("records_total", stats.records),
+        ("bytes_total", stats.bytes),
+        ("overruns_total", stats.overruns),
+        ("filtered_total", stats.filtered),
+        ("deduplicated_total", stats.deduplicated),
+    ):
+        lines.extend(
+            [f"# TYPE auditd_forwarder_{name} counter", f"auditd_forwarder_{name} {value}"]
+        )
+    lines.append("# TYPE auditd_forwarder_records_by_type_total counter")
+    lines.extend(
+        f'auditd_forwarder_records_by_type_total{{type="{name}"}} {value}'
+        for name, value in sorted(stats.types.items())
+    )
+    for name, value in resolver_cache_stats().items():
+        lines.extend(
+            [
+                f"# TYPE auditd_forwarder_resolver_cache_{name}_total counter",
+                f"auditd_forwarder_resolver_cache_{name}_total {value}",
+            ]
+        )
+    lines.append(f"auditd_forwarder_timestamp_seconds {time.time():.0f}")
+    return "\n".join(lines) + "\n"
+
+
+class Forwarder:
+    """Write the audit records to a rotated log file and count them."""
+
+    def __init__(
+        self,
+        output: logging.Handler,
+        metrics_file: Path,
+        enriched: bool = False,
+        record_filter: RecordFilter | None = None,
+        deduplicator: Deduplicator | None = None,
+    ) -> None:
+        """Initialize the instance.
+
+        Args:
+            output: The handler writing the log lines.
+            metrics_file: The metrics textfile of the forwarder.
+            enriched: Resolve the ids of the records as with the ENRICHED log format.
+            record_filter: Select the records to forward, all if None.
+            deduplicator: Collapse the repeated events before they are filtered, if set.
+
+        """
+        self.enriched = enriched
+        self.record_filter = record_filter
+        self.deduplicator = deduplicator
+        self.output = output
+        self.output.setFormatter(logging.Formatter("%(message)s"))
+        self.metrics_file = metrics_file
+        self.stats = Stats()
+
+    def handle(self, buffer: bytes) -> None:
+        """Write the records of a datagram.
+
+        Args:
+            buffer: The bytes of one datagram.
+
+        """
+        for record in parse_messages(buffer):
+            if self.deduplicator:
+                self.write(self.deduplicator.feed(record))
+                self.stats.deduplicated = self.deduplicator.collapsed
+            else:
+                self.write([record])
+
+    def write(self, records: list[Record]) -> None:
+        """Write the records selected by the record filter.
+
+        Args:
+            records: The audit records.
+
+        """
+        for record in records:
+            if self.record_filter and not self.record_filter.accepts(record):
+                self.stats.filtered += 1
+                continue
+            line = record.format(self.enriched)
+            self.output.handle(logging.makeLogRecord({"msg": line, "levelno": logging.INFO}))
+            self.stats.records += 1
+            self.stats.bytes += len(line) + 1
+            self.stats.types[record.type_name] = self.stats.types.get(record.type_name, 0) + 1
+
+    def write_metrics(self) -> None:
+        """Atomically write the metrics textfile."""
+        self.metrics_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.metrics_file.with_name(f".{self.metrics_file.name}.tmp")
+        tmp_file.write_text(render_metrics(self.stats), encoding="utf-8")
+        os.replace(tmp_file, self.metrics_file)
+
+    def run(self, sock: socket.socket, interval: float) -> typing.NoReturn:
+        """Forward the records until the service is stopped.
+
+        Args:
+            sock: The bound netlink socket.
+            interval: The number of seconds between two metrics updates.
+
+        """
+        sock.settimeout(interval)
+        next_metrics = time.monotonic() + interval
+        while True:
+            try:
+                self.handle(sock.recv(RECV_SIZE))
+            except TimeoutError:
+                pass
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+                self.stats.overruns += 1
+                logger.warning("Socket buffer overrun, audit records were lost.")
+            if time.monotonic() >= next_metrics:
+                if self.deduplicator:
+                    self.write(self.deduplicator.expire(time.time()))
+                self.output.flush()
+                self.write_metrics()
+                next_metrics = time.monotonic() + interval
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the forwarder.
+
+    Args:
+        argv: The command line arguments.
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--metrics-file", type=Path, required=True)
+    parser.add_argument("--max-bytes", type=int, default=100 * 1024 * 1024)
+    parser.add_argument("--backups", type=int, default=5)
+    parser.add_argument("--receive-buffer", type=int, default=8 * 1024 * 1024)
+    parser.add_argument("--interval", type=float, default=15.0)
+    parser.add_argument("--log-format", choices=("RAW", "ENRICHED"), default="ENRICHED")
+    parser.add_argument("--record-type", action="append", default=[])
+    parser.add_argument("--key", action="append", default=[])
+    parser.add_argument("--dedup-window", type=float, default=0.0)
+    parser.add_argument("--dedup-cache-size", type=int, default=DEDUP_CACHE_SIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    args.output.parent.mkdir(mode=0o750, parents=True, exist_ok=True)
+    output = logging.handlers.RotatingFileHandler(
+        args.output, maxBytes=args.max_bytes, backupCount=args.backups
+    )
+    record_filter = None
+    if args.record_type or args.key:
+        record_filter = RecordFilter(frozenset(args.record_type), frozenset(args.key))
+        logger.info("Forwarding the record types %s with the keys %s", args.record_type, args.key)
+    deduplicator = None
+    if args.dedup_window > 0:
+        deduplicator = Deduplicator(args.dedup_window, args.dedup_cache_size)
+        logger.info("Collapsing the repeated events within %ss", args.dedup_window)
+    forwarder = Forwarder(
+        output, args.metrics_file, args.log_format == "ENRICHED", record_filter, deduplicator
+    )
+    logger.info("Forwarding the audit multicast group to %s", args.output)
+    forwarder.run(open_socket(args.receive_buffer), args.interval)
+
+
+if __name__ == "__main__":  # pragma: nocover
+    main()
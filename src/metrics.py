@@ -0,0 +1,56 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""The metrics textfile module."""
+
+import logging
+import os
+import time
+from pathlib import Path
+
+from constants import METRICS_DIR
+
+logger = logging.getLogger(__name__)
+
+
+def render_metrics(metrics: dict[str, float | None], prefix: str) -> str:
+    """Render metrics in the Prometheus text exposition format.
+
+    Following the Prometheus naming conventions, the metrics named `*_total` are declared as
+    counters and the other ones as gauges.
+
+    Args:
+        metrics: The metric values keyed by metric name; None values are skipped.
+        prefix: The prefix prepended to every metric name.
+
+    Returns:
+        The rendered metrics.
+
+    """
+    lines = []
+    for name, value in sorted(metrics.items()):
+        if value is None:
+            continue
+        metric_type = "counter" if name.endswith("_total") else "gauge"
+        lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+        lines.append(f"{prefix}_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(
+    name: str, metrics: dict[str, float | None], metrics_dir: Path = METRICS_DIR
+) -> None:
+    """Atomically write metrics to a textfile served by the metrics exporter.
+
+    Args:
+        name: The name of the textfile, without the '.prom' suffix.
+        metrics: The metric values keyed by metric name; None values are skipped.
+        metrics_dir: The directory served by the metrics exporter.
+
+    """
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    content = render_metrics({**metrics, "timestamp_seconds": int(time.time())}, name)
+    tmp_path = metrics_dir / f".{name}.prom.tmp"
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, metrics_dir / f"{name}.prom")
+    logger.debug("Wrote %d metrics to %s", len(metrics), metrics_dir / f"{name}.prom")
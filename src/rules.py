@@ -0,0 +1,647 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""The audit rule canonicalization module.
+
+`auditctl -l` does not print the loaded rules the way they are written in the rule files:
+syscalls are merged, keys become fields, unset ids are printed as -1, ... The rules are
+canonicalized so that both sides can be compared by hash.
+
+The module also lints the rule files before they are loaded, as `augenrules --load` stops at
+the first invalid rule and leaves the kernel with a partial rule set, and reads the rule
+profiles shipped with the charm, whose headers annotate the estimated cost of the profile.
+"""
+
+import collections
+import errno
+import hashlib
+import logging
+import re
+import shlex
+import typing
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FIELD_PATTERN = re.compile(r"^(\w+)(!=|>=|<=|&=|=|>|<|&)(.*)$")
+PERMISSIONS = "rwxa"
+UNSET_IDS = ("4294967295", "-1")
+ID_FIELDS = ("auid", "uid", "euid", "suid", "fsuid", "gid", "egid", "sgid", "fsgid", "obj_uid")
+ARCH_ALIASES = {"x86_64": "b64", "aarch64": "b64", "ppc64le": "b64", "s390x": "b64", "i386": "b32"}
+PROFILE_HEADER_PATTERN = re.compile(r"^## ([\w-]+): (.*)$")
+
+# auditctl(8) rule syntax.
+FILTER_LISTS = ("task", "exit", "user", "exclude", "filesystem", "io_uring")
+FILTER_ACTIONS = ("never", "always")
+CONTROL_OPTIONS = (
+    "-D",
+    "-b",
+    "-c",
+    "-d",
+    "-e",
+    "-f",
+    "-i",
+    "-r",
+    "-W",
+    "--backlog_wait_time",
+    "--loginuid-immutable",
+    "--reset-lost",
+    "--reset_backlog_wait_time_actual",
+)
+OPERATORS = ("=", "!=", "<", ">", "<=", ">=", "&", "&=")
+STRING_FIELDS = (
+    "path",
+    "dir",
+    "exe",
+    "key",
+    "filetype",
+    "fstype",
+    "obj_user",
+    "obj_role",
+    "obj_type",
+    "obj_lev_low",
+    "obj_lev_high",
+    "subj_user",
+    "subj_role",
+    "subj_type",
+    "subj_sen",
+    "subj_clr",
+)
+NUMERIC_FIELDS = (
+    "a0",
+    "a1",
+    "a2",
+    "a3",
+    "devmajor",
+    "devminor",
+    "inode",
+    "pid",
+    "ppid",
+    "pers",
+    "saddr_fam",
+    "sessionid",
+    "success",
+)
+USER_FIELDS = (*ID_FIELDS, "loginuid", "obj_gid")
+EXIT_FIELDS = ("arch", "dir", "exit", "path", "perm", "success")
+FILE_TYPES = ("file", "dir", "socket", "link", "character", "block", "fifo")
+ID_PATTERN = re.compile(r"^(-?\d+|unset|[a-z_][\w.-]*\$?)$")
+COMPARE_PATTERN = re.compile(r"^(\w+)(!=|=)(\w+)$")
+
+
+class RuleSyntaxError(ValueError):
+    """Error when an audit rule is malformed."""
+
+
+@dataclass
+class Rule:
+    """A filter or watch rule of a rule file.
+
+    Attributes:
+        filter: The filter list, e.g. 'exit', or 'watch' for a file watch.
+        action: The action of the rule, 'always' or 'never'.
+        arch: The value of the arch field, None for the native architecture.
+        syscalls: The syscalls of the rule.
+        fields: The (name, operator, value) of the `-F` fields, except the keys.
+        comparisons: The `-C` field comparisons.
+        path: The watched path of a file watch.
+        permissions: The permissions of a file watch.
+        keys: The keys of the rule.
+
+    """
+
+    filter: str
+    action: str = "always"
+    arch: str | None = None
+    syscalls: list[str] = field(default_factory=list)
+    fields: list[tuple[str, str, str]] = field(default_factory=list)
+    comparisons: list[str] = field(default_factory=list)
+    path: str = ""
+    permissions: str = PERMISSIONS
+    keys: list[str] = field(default_factory=list)
+
+    def match_key(self) -> tuple:
+        """Get what the rule matches, regardless of its action and keys.
+
+        Returns:
+            A hashable key equal for the rules matching the same events.
+
+        """
+        return (
+            self.filter,
+            self.path,
+            self.permissions,
+            tuple(sorted(set(self.syscalls))),
+            tuple(sorted(_field(f"{name}{op}{value}") for name, op, value in self.fields)),
+            tuple(sorted(self.comparisons)),
+        )
+
+
+def _permissions(value: str) -> str:
+    """Sort file permissions, e.g. 'aw' to 'wa'.
+
+    Args:
+        value: The permissions of a watch or a perm field.
+
+    Returns:
+        The permissions in the 'rwxa' order.
+
+    """
+    return "".join(perm for perm in PERMISSIONS if perm in value)
+
+
+def _filter_rule(target: str, fields: list[str], syscalls: set[str]) -> list[str]:
+    """Canonicalize the parts of a filter rule.
+
+    Args:
+        target: The filter list and action, e.g. 'exit,always'.
+        fields: The canonical field and comparison options.
+        syscalls: The syscalls of the `-S` options.
+
+    Returns:
+        The canonical rule parts, without the keys.
+
+    """
+    lists = target.split(",")
+    if not syscalls and ("exit" in lists or "io_uring" in lists):
+        # auditctl lists the syscall rules without -S as '-S all'.
+        syscalls = {"all"}
+    rule = [f"-a {','.join(sorted(lists))}", *sorted(fields)]
+    if syscalls:
+        rule.append(f"-S {','.join(sorted(syscalls))}")
+    return rule
+
+
+def _option(option: str, value: str) -> str:
+    """Canonicalize a field or comparison option of a filter rule.
+
+    Args:
+        option: The option, e.g. '-F'.
+        value: The value of the option.
+
+    Returns:
+        The canonical option and value.
+
+    """
+    if option == "-F":
+        return f"-F {_field(value)}"
+    if option == "-C":
+        return f"-C {_comparison(value)}"
+    return f"{option} {value}"
+
+
+def _comparison(expression: str) -> str:
+    """Canonicalize a field comparison, e.g. 'uid!=euid' to 'euid!=uid'.
+
+    auditctl lists the compared fields in its own order, so they are sorted.
+
+    Args:
+        expression: The comparison of a `-C` option.
+
+    Returns:
+        The canonical comparison.
+
+    """
+    if not (match := COMPARE_PATTERN.match(expression)):
+        return expression
+    left, operator, right = match.groups()
+    return operator.join(sorted((left, right)))
+
+
+def _field(expression: str) -> str:
+    """Canonicalize a rule field, e.g. 'auid!=4294967295' to 'auid!=unset'.
+
+    Args:
+        expression: The field expression of a `-F` option.
+
+    Returns:
+        The canonical field expression.
+
+    """
+    if not (match := FIELD_PATTERN.match(expression)):
+        return expression
+    name, operator, value = match.groups()
+    if name in ID_FIELDS and value in UNSET_IDS:
+        value = "unset"
+    elif name == "arch":
+        value = ARCH_ALIASES.get(value, value)
+    elif name == "perm":
+        value = _permissions(value)
+    elif name in ("path", "dir") and len(value) > 1:
+        value = value.rstrip("/")
+    return f"{name}{operator}{value}"
+
+
+def _check_field(rule: Rule, name: str, operator: str) -> None:
+    """Validate the name and operator of a `-F` field.
+
+    Args:
+        rule: The rule being parsed.
+        name: The field name.
+        operator: The field operator.
+
+    Raises:
+        RuleSyntaxError: When the field is not valid.
+
+    """
+    if name not in (*STRING_FIELDS, *NUMERIC_FIELDS, *USER_FIELDS, *EXIT_FIELDS, "msgtype"):
+        raise RuleSyntaxError(f"unknown field '{name}'")
+    if name in EXIT_FIELDS and rule.filter != "exit":
+        raise RuleSyntaxError(f"field '{name}' is only valid on the exit list")
+    if name in (*STRING_FIELDS, "arch") and operator not in ("=", "!="):
+        raise RuleSyntaxError(f"field '{name}' only supports the = and != operators")
+    if name == "arch" and rule.syscalls:
+        raise RuleSyntaxError("the arch field must be set before the syscalls")
+
+
+def parse_number(value: str) -> int:
+    """Parse a number the way auditctl does with strtoul, e.g. '0x41', '0100' (octal) or '12'.
+
+    Args:
+        value: The number.
+
+    Returns:
+        The parsed number.
+
+    Raises:
+        ValueError: When the value is not a number.
+
+    """
+    digits = value.lstrip("+-")
+    if len(digits) > 1 and digits[0] == "0" and digits[1] not in "xX":
+        return int(value, 8)
+    return int(value, 0)
+
+
+def _check_field_value(name: str, value: str) -> None:
+    """Validate the value of a `-F` field.
+
+    Args:
+        name: The field name.
+        value: The field value.
+
+    Raises:
+        RuleSyntaxError: When the value is not valid for the field.
+
+    """
+    if name in ("path", "dir", "exe") and not value.startswith("/"):
+        raise RuleSyntaxError(f"field '{name}' must be an absolute path, got '{value}'")
+    if name == "perm" and (not value or set(value) - set(PERMISSIONS)):
+        raise RuleSyntaxError(f"permissions must be a combination of '{PERMISSIONS}'")
+    if name == "arch" and value not in ("b32", "b64", *ARCH_ALIASES):
+        raise RuleSyntaxError(f"unknown arch '{value}'")
+    if name == "filetype" and value not in FILE_TYPES:
+        raise RuleSyntaxError(f"unknown file type '{value}'")
+    if name == "exit" and not (
+        value.lstrip("-").isdigit() or value.lstrip("-") in errno.errorcode.values()
+    ):
+        raise RuleSyntaxError(f"exit must be a number or an errno name, got '{value}'")
+    if name in USER_FIELDS and not ID_PATTERN.match(value):
+        raise RuleSyntaxError(f"field '{name}' must be an id or a name, got '{value}'")
+    if name in NUMERIC_FIELDS:
+        try:
+            parse_number(value)
+        except ValueError:
+            raise RuleSyntaxError(f"field '{name}' must be a number, got '{value}'") from None
+
+
+def _parse_field(rule: Rule, expression: str) -> None:
+    """Parse a `-F` field into a filter rule.
+
+    Args:
+        rule: The rule being parsed.
+        expression: The field expression, e.g. 'auid>=1000'.
+
+    Raises:
+        RuleSyntaxError: When the field is not valid.
+
+    """
+    if not (match := FIELD_PATTERN.match(expression)) or not match.group(3):
+        raise RuleSyntaxError(f"invalid field '{expression}'")
+    name, operator, value = match.groups()
+    if name == "key":
+        rule.keys.append(value)
+        return
+    _check_field(rule, name, operator)
+    _check_field_value(name, value)
+    if name == "arch":
+        rule.arch = value
+    rule.fields.append((name, operator, value))
+
+
+def _parse_watch(target: str, options: list[tuple[str, str]]) -> Rule:
+    """Parse a file watch.
+
+    Args:
+        target: The watched path.
+        options: The (option, value) pairs following the path.
+
+    Returns:
+        The watch rule.
+
+    Raises:
+        RuleSyntaxError: When the watch is malformed.
+
+    """
+    if not target.startswith("/"):
+        raise RuleSyntaxError(f"watch path must be absolute, got '{target}'")
+    rule = Rule(filter="watch", path=target.rstrip("/") if len(target) > 1 else target)
+    for option, value in options:
+        if option == "-p":
+            if not value or set(value) - set(PERMISSIONS):
+                raise RuleSyntaxError(f"permissions must be a combination of '{PERMISSIONS}'")
+            rule.permissions = _permissions(value)
+        elif option == "-k":
+            rule.keys.append(value)
+        else:
+            raise RuleSyntaxError(f"option '{option}' is not valid in a file watch")
+    return rule
+
+
+def _parse_filter(target: str, options: list[tuple[str, str]]) -> Rule:
+    """Parse a filter rule.
+
+    Args:
+        target: The filter list and action, e.g. 'always,exit'.
+        options: The (option, value) pairs following the list and action.
+
+    Returns:
+        The filter rule.
+
+    Raises:
+        RuleSyntaxError: When the rule is malformed.
+
+    """
+    parts = target.split(",")
+    lists = [part for part in parts if part in FILTER_LISTS]
+    actions = [part for part in parts if part in FILTER_ACTIONS]
+    if len(parts) != 2 or len(lists) != 1 or len(actions) != 1:  # noqa: PLR2004
+        raise RuleSyntaxError(f"'{target}' must be a filter list and an action, e.g. always,exit")
+
+    rule = Rule(filter=lists[0], action=actions[0])
+    for option, value in options:
+        if option == "-S":
+            if rule.filter not in ("exit", "io_uring"):
+                raise RuleSyntaxError(f"syscalls are not valid on the {rule.filter} list")
+            rule.syscalls.extend(value.split(","))
+        elif option == "-k":
+            rule.keys.append(value)
+        elif option == "-C":
+            if not COMPARE_PATTERN.match(value):
+                raise RuleSyntaxError(f"invalid field comparison '{value}'")
+            rule.comparisons.append(value)
+        elif option == "-F":
+            _parse_field(rule, value)
+        else:
+            raise RuleSyntaxError(f"unknown option '{option}'")
+    return rule
+
+
+def parse_rule(line: str) -> Rule | None:
+    """Parse a line of a rule file with the auditctl syntax.
+
+    Args:
+        line: A line of a rule file.
+
+    Returns:
+        The rule, or None if the line is empty, a comment or a control option like '-b 8192'.
+
+    Raises:
+        RuleSyntaxError: When the rule is malformed.
+
+    """
+    try:
+        tokens = shlex.split(line, comments=True)
+    except ValueError as e:
+        raise RuleSyntaxError(f"cannot be tokenized: {e}") from e
+    if not tokens or tokens[0] in CONTROL_OPTIONS:
+        return None
+    if tokens[0] not in ("-a", "-A", "-w"):
+        raise RuleSyntaxError(f"unknown option '{tokens[0]}'")
+    if len(tokens) % 2:
+        raise RuleSyntaxError(f"option '{tokens[-1]}' requires a value")
+
+    options = list(zip(tokens[2::2], tokens[3::2], strict=True))
+    if tokens[0] == "-w":
+        return _parse_watch(tokens[1], options)
+    return _parse_filter(tokens[1], options)
+
+
+def lint_rules(
+    sources: typing.Iterable[tuple[str, list[str]]],
+    syscall_names: typing.Callable[[str | None], typing.Collection[str] | None] | None = None,
+) -> list[str]:
+    """Lint rule files before they are loaded.
+
+    Args:
+        sources: The (name, lines) of each rule file, in the order they are loaded.
+        syscall_names: Get the syscall names of an arch field value, None for the native
+            architecture. The syscalls are not checked when it is unset or returns None.
+
+    Returns:
+        The errors, formatted as 'file:line: message'.
+
+    """
+    errors = []
+    locations: dict[str, str] = {}
+    actions: dict[tuple, tuple[str, str]] = {}
+    for source, lines in sources:
+        for number, line in enumerate(lines, start=1):
+            location = f"{source}:{number}"
+            try:
+                rule = parse_rule(line)
+            except RuleSyntaxError as e:
+                errors.append(f"{location}: {e}")
+                continue
+            if rule is None:
+                continue
+
+            known = syscall_names(rule.arch) if syscall_names and rule.filter == "exit" else None
+            if known is not None and (
+                unknown := [
+                    name
+                    for name in rule.syscalls
+                    if name != "all" and not name.isdigit() and name not in known
+                ]
+            ):
+                errors.append(
+                    f"{location}: unknown syscall {', '.join(unknown)} for arch "
+                    f"{rule.arch or 'native'}"
+                )
+
+            canonical = typing.cast(str, canonicalize_rule(line))
+            if canonical in locations:
+                errors.append(f"{location}: duplicate of {locations[canonical]}")
+                continue
+            locations[canonical] = location
+            action, first = actions.setdefault(rule.match_key(), (rule.action, location))
+            if action != rule.action:
+                errors.append(f"{location}: '{rule.action}' conflicts with '{action}' at {first}")
+    return errors
+
+
+def canonicalize_rule(line: str) -> str | None:
+    """Canonicalize an audit rule.
+
+    Args:
+        line: A line of a rule file or of the `auditctl -l` output.
+
+    Returns:
+        The canonical rule, or None if the line is not a filter or watch rule, e.g. a comment
+        or a control option like '-b 8192'.
+
+    """
+    try:
+        tokens = shlex.split(line, comments=True)
+    except ValueError:
+        logger.warning("Cannot parse audit rule: %s", line)
+        return None
+    if len(tokens) < 2 or tokens[0] not in ("-a", "-A", "-w"):  # noqa: PLR2004
+        return None
+
+    head, target, options = tokens[0], tokens[1], tokens[2:]
+    syscalls: set[str] = set()
+    fields: list[str] = []
+    keys: list[str] = []
+    permissions = ""
+    for option, value in zip(options[::2], options[1::2], strict=False):
+        if option == "-S":
+            syscalls.update(value.split(","))
+        elif option == "-k":
+            keys.append(value)
+        elif option == "-p":
+            permissions = _permissions(value)
+        elif option == "-F" and value.startswith("key="):
+            keys.append(value.removeprefix("key="))
+        else:
+            fields.append(_option(option, value))
+
+    if head == "-w":
+        path = target.rstrip("/") if len(target) > 1 else target
+        rule = [f"-w {path}", f"-p {permissions or PERMISSIONS}", *sorted(fields)]
+    else:
+        rule = _filter_rule(target, fields, syscalls)
+    rule.extend(f"-F key={key}" for key in sorted(keys))
+    return " ".join(rule)
+
+
+def canonicalize(lines: typing.Iterable[str]) -> list[str]:
+    """Canonicalize a rule set.
+
+    The order of the rules is not kept, as `auditctl -l` lists them grouped by filter list.
+
+    Args:
+        lines: The lines of the rule files or of the `auditctl -l` output.
+
+    Returns:
+        The sorted canonical rules.
+
+    """
+    return sorted(rule for line in lines if (rule := canonicalize_rule(line)))
+
+
+def read_rule_files(directory: Path) -> list[str]:
+    """Read the rule files loaded by augenrules.
+
+    Args:
+        directory: The rules.d directory.
+
+    Returns:
+        The lines of the '*.rules' files, in the order augenrules concatenates them.
+
+    """
+    lines = []
+    for rule_file in sorted(directory.glob("*.rules")):
+        lines.extend(rule_file.read_text(encoding="utf-8").splitlines())
+    return lines
+
+
+def rules_hash(rules: list[str]) -> str:
+    """Hash a canonical rule set.
+
+    Args:
+        rules: The canonical rules.
+
+    Returns:
+        The SHA-256 hex digest of the rule set.
+
+    """
+    return hashlib.sha256("\n".join(rules).encode()).hexdigest()
+
+
+def diff_rules(desired: list[str], loaded: list[str]) -> tuple[list[str], list[str]]:
+    """Compare two canonical rule sets.
+
+    Args:
+        desired: The canonical rules of the rule files.
+        loaded: The canonical rules loaded in the kernel.
+
+    Returns:
+        The (missing, unexpected) rules: desired but not loaded, and loaded but not desired.
+
+    """
+    desired_count, loaded_count = collections.Counter(desired), collections.Counter(loaded)
+    return (
+        sorted((desired_count - loaded_count).elements()),
+        sorted((loaded_count - desired_count).elements()),
+    )
+
+
+@dataclass
+class RuleProfile:
+    """A rule profile and its estimated cost.
+
+    Attributes:
+        name: The name of the profile, e.g. 'cis'.
+        description: The compliance standard covered by the profile.
+        events_per_second: The estimated number of audit events per second.
+        overhead: The estimated median overhead per probed syscall class, in percent.
+
+    """
+
+    name: str
+    description: str = ""
+    events_per_second: float = 0.0
+    overhead: dict[str, int] = field(default_factory=dict)
+
+    def exceeds_budget(self, budget: int) -> list[str]:
+        """List the syscall classes whose estimated overhead exceeds the budget.
+
+        Args:
+            budget: The maximum overhead in percent.
+
+        Returns:
+            The sorted syscall classes over budget.
+
+        """
+        return sorted(name for name, overhead in self.overhead.items() if overhead > budget)
+
+
+def read_profile(path: Path) -> RuleProfile:
+    """Read the annotations of a rule profile.
+
+    The annotations are '## key: value' comments at the top of the profile, e.g.
+    '## overhead: open=6 stat=2 execve=8'.
+
+    Args:
+        path: The rule file of the profile.
+
+    Returns:
+        The profile.
+
+    """
+    profile = RuleProfile(name=path.stem)
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not (match := PROFILE_HEADER_PATTERN.match(line)):
+            continue
+        key, value = match.groups()
+        if key == "description":
+            profile.description = value
+        elif key == "events-per-second":
+            profile.events_per_second = float(value)
+        elif key == "overhead":
+            for item in value.split():
+                name, _, overhead = item.partition("=")
+                profile.overhead[name] = int(overhead)
+    return profile
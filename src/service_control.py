@@ -0,0 +1,358 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""The systemd service controller module."""
+
+import abc
+import contextlib
+import logging
+import subprocess
+import typing
+from dataclasses import dataclass
+
+from jeepney import DBusAddress, MatchRule, new_method_call
+from jeepney.bus_messages import message_bus
+from jeepney.io.blocking import DBusConnection, Proxy, open_dbus_connection
+from jeepney.low_level import HeaderFields
+from jeepney.wrappers import DBusErrorResponse, unwrap_msg
+
+from constants import SERVICE_JOB_TIMEOUT
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+SYSTEMD_BUS_NAME = "org.freedesktop.systemd1"
+SYSTEMD_PATH = "/org/freedesktop/systemd1"
+SYSTEMD_MANAGER_INTERFACE = "org.freedesktop.systemd1.Manager"
+SYSTEMD_UNIT_INTERFACE = "org.freedesktop.systemd1.Unit"
+SYSTEMD_SERVICE_INTERFACE = "org.freedesktop.systemd1.Service"
+PROPERTIES_INTERFACE = "org.freedesktop.DBus.Properties"
+
+
+class ServiceControlError(Exception):
+    """Error when a systemd job or query fails."""
+
+
+@dataclass(frozen=True)
+class UnitState:
+    """The state of a systemd unit.
+
+    Attributes:
+        active_state: The ActiveState of the unit, e.g. 'active' or 'failed'.
+        sub_state: The SubState of the unit, e.g. 'running'.
+        n_restarts: The number of automatic restarts systemd did for the unit.
+
+    """
+
+    active_state: str
+    sub_state: str
+    n_restarts: int
+
+    @property
+    def is_active(self) -> bool:
+        """Indicate if the unit is active."""
+        return self.active_state == "active"
+
+
+class ServiceController(abc.ABC):
+    """Query and control systemd services."""
+
+    @abc.abstractmethod
+    def properties(self, unit: str, names: typing.Sequence[str]) -> dict[str, typing.Any]:
+        """Get properties of a unit.
+
+        Args:
+            unit: The name of the unit, e.g. 'auditd.service'.
+            names: The names of the properties.
+
+        Returns:
+            The requested properties that the unit has.
+
+        """
+
+    @abc.abstractmethod
+    def restart(self, unit: str) -> None:
+        """Restart a unit and wait for the job to complete.
+
+        Args:
+            unit: The name of the unit.
+
+        """
+
+    @abc.abstractmethod
+    def reload(self, unit: str) -> None:
+        """Reload a unit and wait for the job to complete.
+
+        Args:
+            unit: The name of the unit.
+
+        """
+
+    def state(self, unit: str) -> UnitState:
+        """Get the state of a unit.
+
+        Args:
+            unit: The name of the unit.
+
+        Returns:
+            The ActiveState, SubState and NRestarts of the unit.
+
+        """
+        props = self.properties(unit, ("ActiveState", "SubState", "NRestarts"))
+        return UnitState(
+            active_state=str(props.get("ActiveState", "")),
+            sub_state=str(props.get("SubState", "")),
+            n_restarts=int(props.get("NRestarts", 0)),
+        )
+
+
+class SystemctlController(ServiceController):
+    """Service controller forking systemctl."""
+
+    def properties(self, unit: str, names: typing.Sequence[str]) -> dict[str, typing.Any]:
+        """Get properties of a unit with `systemctl show`.
+
+        Args:
+            unit: The name of the unit, e.g. 'auditd.service'.
+            names: The names of the properties.
+
+        Returns:
+            The requested properties, as strings.
+
+        Raises:
+            ServiceControlError: When systemctl fails.
+
+        """
+        cmd = ["systemctl", "show", unit, f"--property={','.join(names)}"]
+        try:
+            with span("systemctl show", unit=unit):
+                output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        except subprocess.CalledProcessError as e:
+            raise ServiceControlError(f"Failed to query {unit}: {e.stderr}") from e
+        return dict(line.split("=", 1) for line in output.splitlines() if "=" in line)
+
+    def restart(self, unit: str) -> None:
+        """Restart a unit with `systemctl restart`.
+
+        Args:
+            unit: The name of the unit.
+
+        """
+        self._run_job("restart", unit)
+
+    def reload(self, unit: str) -> None:
+        """Reload a unit with `systemctl reload`.
+
+        Args:
+            unit: The name of the unit.
+
+        """
+        self._run_job("reload", unit)
+
+    def _run_job(self, verb: str, unit: str) -> None:
+        """Run a systemctl job command, which waits for the job to complete.
+
+        Args:
+            verb: The systemctl verb, e.g. 'restart'.
+            unit: The name of the unit.
+
+        Raises:
+            ServiceControlError: When the job fails.
+
+        """
+        try:
+            with span(f"systemctl {verb}", unit=unit):
+                subprocess.run(["systemctl", verb, unit], check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            raise ServiceControlError(f"Failed to {verb} {unit}: {e.stderr}") from e
+
+
+class DBusController(ServiceController):
+    """Service controller talking to systemd over the system D-Bus."""
+
+    def __init__(self, connection: DBusConnection) -> None:
+        """Initialize the instance.
+
+        Args:
+            connection: An open connection to the system bus.
+
+        """
+        self._conn = connection
+        self._manager = DBusAddress(
+            SYSTEMD_PATH, bus_name=SYSTEMD_BUS_NAME, interface=SYSTEMD_MANAGER_INTERFACE
+        )
+        self._subscribed = False
+
+    @classmethod
+    def connect(cls) -> "DBusController":
+        """Connect to the system bus.
+
+        Returns:
+            The controller using the new connection.
+
+        """
+        return cls(open_dbus_connection(bus="SYSTEM"))
+
+    def properties(self, unit: str, names: typing.Sequence[str]) -> dict[str, typing.Any]:
+        """Get properties of a unit in a single round-trip.
+
+        The GetAll calls for the Unit and the Service interfaces are sent back to back before
+        waiting for their replies.
+
+        Args:
+            unit: The name of the unit, e.g. 'auditd.service'.
+            names: The names of the properties.
+
+        Returns:
+            The requested properties that the unit has.
+
+        Raises:
+            ServiceControlError: When systemd returns an error or the bus fails.
+
+        """
+        address = DBusAddress(
+            unit_object_path(unit), bus_name=SYSTEMD_BUS_NAME, interface=PROPERTIES_INTERFACE
+        )
+        pending = {}
+        props: dict[str, typing.Any] = {}
+        with span("dbus GetAll", unit=unit), _bus_errors(f"query {unit}"):
+            for interface in (SYSTEMD_UNIT_INTERFACE, SYSTEMD_SERVICE_INTERFACE):
+                serial = next(self._conn.outgoing_serial)
+                self._conn.send(new_method_call(address, "GetAll", "s", (interface,)), serial)
+                pending[serial] = interface
+
+            while pending:
+                reply = self._conn.receive(timeout=SERVICE_JOB_TIMEOUT)
+                if pending.pop(reply.header.fields.get(HeaderFields.reply_serial), None):
+                    try:
+                        (values,) = unwrap_msg(reply)
+                    except DBusErrorResponse as e:
+                        raise ServiceControlError(f"Failed to query {unit}: {e}") from e
+                    props.update({key: value for key, (_, value) in values.items()})
+        return {name: props[name] for name in names if name in props}
+
+    def restart(self, unit: str) -> None:
+        """Restart a unit and wait for the JobRemoved signal.
+
+        Args:
+            unit: The name of the unit.
+
+        """
+        self._run_job("RestartUnit", unit)
+
+    def reload(self, unit: str) -> None:
+        """Reload a unit and wait for the JobRemoved signal.
+
+        Args:
+            unit: The name of the unit.
+
+        """
+        self._run_job("ReloadUnit", unit)
+
+    def _run_job(self, method: str, unit: str) -> None:
+        """Queue a systemd job for a unit and wait until it is removed.
+
+        Args:
+            method: The Manager method queuing the job, e.g. 'RestartUnit'.
+            unit: The name of the unit.
+
+        Raises:
+            ServiceControlError: When the job cannot be queued, fails or times out, or the bus
+                fails.
+
+        """
+        rule = MatchRule(
+            type="signal",
+            interface=SYSTEMD_MANAGER_INTERFACE,
+            member="JobRemoved",
+            path=SYSTEMD_PATH,
+        )
+        with span(f"dbus {method}", unit=unit), _bus_errors(f"{method} {unit}"):
+            if not self._subscribed:
+                Proxy(message_bus, self._conn).AddMatch(rule)
+                self._call(new_method_call(self._manager, "Subscribe"))
+                self._subscribed = True
+
+            with self._conn.filter(rule, bufsize=64) as removed_jobs:
+                call = new_method_call(self._manager, method, "ss", (unit, "replace"))
+                (job,) = self._call(call)
+                try:
+                    while True:
+                        signal = self._conn.recv_until_filtered(
+                            removed_jobs, timeout=SERVICE_JOB_TIMEOUT
+                        )
+                        _, job_path, _, result = signal.body
+                        if job_path == job:
+                            break
+                except TimeoutError as e:
+                    raise ServiceControlError(f"Timed out waiting for {method} {unit}.") from e
+
+        if result != "done":
+            raise ServiceControlError(f"{method} {unit} finished with result '{result}'.")
+
+    def _call(self, message: typing.Any) -> tuple:
+        """Call a method and unwrap its reply.
+
+        Args:
+            message: The method call message.
+
+        Returns:
+            The body of the reply.
+
+        Raises:
+            ServiceControlError: When the method returns an error or the bus fails.
+
+        """
+        with _bus_errors("call systemd"):
+            try:
+                reply = self._conn.send_and_get_reply(message, timeout=SERVICE_JOB_TIMEOUT)
+                return unwrap_msg(reply)
+            except DBusErrorResponse as e:
+                raise ServiceControlError(str(e)) from e
+
+
+@contextlib.contextmanager
+def _bus_errors(action: str) -> typing.Iterator[None]:
+    """Convert the timeouts and the errors of a dropped system bus to ServiceControlError.
+
+    Args:
+        action: What was being done, for the error message.
+
+    Raises:
+        ServiceControlError: When the bus times out or fails.
+
+    """
+    try:
+        yield
+    except TimeoutError as e:
+        raise ServiceControlError(f"Timed out waiting for systemd to {action}.") from e
+    except OSError as e:
+        raise ServiceControlError(f"Lost the system bus trying to {action}: {e}") from e
+
+
+def unit_object_path(unit: str) -> str:
+    """Get the D-Bus object path of a systemd unit.
+
+    Args:
+        unit: The name of the unit, e.g. 'auditd.service'.
+
+    Returns:
+        The escaped object path, e.g. '/org/freedesktop/systemd1/unit/auditd_2eservice'.
+
+    """
+    escaped = "".join(c if c.isascii() and c.isalnum() else f"_{ord(c):02x}" for c in unit)
+    return f"{SYSTEMD_PATH}/unit/{escaped}"
+
+
+def get_service_controller() -> ServiceController:
+    """Get the D-Bus service controller, falling back to systemctl.
+
+    Returns:
+        The D-Bus controller if the system bus is reachable, otherwise the systemctl controller.
+
+    """
+    try:
+        return DBusController.connect()
+    except (OSError, ValueError) as e:
+        logger.warning("Cannot connect to the system bus, falling back to systemctl: %s", e)
+        return SystemctlController()
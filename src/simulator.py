@@ -0,0 +1,489 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""The audit rule event volume simulator module.
+
+A rule set is evaluated against a recorded trace, either a sample of an audit log or a synthetic
+syscall mix, the way the kernel evaluates the exit filter: the first matching rule decides
+whether an event is logged and with which key. Fields that the trace does not carry are assumed
+to match, so that the volume is overestimated rather than underestimated.
+"""
+
+import collections
+import errno
+import json
+import re
+import typing
+from dataclasses import dataclass, field
+
+from rules import Rule, parse_number
+
+RECORD_PATTERN = re.compile(r"^type=(\w+) msg=audit\((\d+(?:\.\d+)?):(\d+)\): ?(.*)$")
+FIELD_PATTERN = re.compile(r'(\w+)=("[^"]*"|\S+)')
+# AUDIT_ARCH_* values of the arch field of SYSCALL records, see audit.h.
+AUDIT_ARCHES = {
+    "c000003e": "x86_64",
+    "40000003": "i386",
+    "c00000b7": "aarch64",
+    "40000028": "arm",
+    "c0000015": "ppc64le",
+    "80000016": "s390x",
+}
+ARCH_BITS = {"x86_64": 64, "aarch64": 64, "ppc64le": 64, "s390x": 64, "i386": 32, "arm": 32}
+TRACE_FIELDS = (
+    "uid",
+    "auid",
+    "euid",
+    "suid",
+    "fsuid",
+    "gid",
+    "egid",
+    "sgid",
+    "fsgid",
+    "success",
+    "exit",
+    "exe",
+)
+UNSET_ID = 4294967295
+EXEC_SYSCALLS = ("execve", "execveat")
+SYNTHETIC_EVENT_SIZE = 512
+USER_SPACE_KEY = "user-space"
+
+
+@dataclass
+class TraceEvent:
+    """Events of a trace sharing the same matched attributes.
+
+    Attributes:
+        type: The type of the first record, e.g. 'SYSCALL' or 'USER_LOGIN'.
+        arch: The architecture of a syscall event, e.g. 'x86_64', empty if unknown.
+        syscall: The syscall name, or number if it cannot be resolved.
+        fields: The fields of the SYSCALL record used by the rules.
+        paths: The paths of the PATH records.
+        count: The number of events.
+        size: The total size of the events in the log, in bytes.
+
+    """
+
+    type: str
+    arch: str = ""
+    syscall: str = ""
+    fields: dict[str, str] = field(default_factory=dict)
+    paths: tuple[str, ...] = ()
+    count: float = 0.0
+    size: float = 0.0
+
+
+@dataclass
+class Trace:
+    """A recorded or synthetic trace.
+
+    Attributes:
+        events: The aggregated events.
+        duration: The time covered by the trace, in seconds.
+
+    """
+
+    events: list[TraceEvent]
+    duration: float
+
+
+@dataclass
+class Simulation:
+    """The estimated volume of a rule set.
+
+    Attributes:
+        events_per_second: The events per second of each rule key.
+        bytes_per_hour: The log volume in bytes per hour.
+        seconds_to_rotation: The time until the log file reaches `max_log_file`.
+        seconds_of_retention: The time until an event is rotated out of `num_logs` files.
+
+    """
+
+    events_per_second: dict[str, float]
+    bytes_per_hour: float
+    seconds_to_rotation: float | None
+    seconds_of_retention: float | None
+
+
+def _aggregate(events: dict[tuple, TraceEvent], event: TraceEvent) -> None:
+    """Add an event to the events with the same matched attributes.
+
+    Args:
+        events: The aggregated events, by matched attributes.
+        event: The event to add.
+
+    """
+    key = (event.type, event.arch, event.syscall, tuple(sorted(event.fields.items())), event.paths)
+    if key in events:
+        events[key].count += event.count
+        events[key].size += event.size
+    else:
+        events[key] = event
+
+
+def _parse_event(
+    records: list[tuple[str, str, int]],
+    syscall_table: typing.Callable[[str], dict[str, str]],
+) -> TraceEvent:
+    """Parse the records of an event.
+
+    Args:
+        records: The (type, body, size) of each record of the event.
+        syscall_table: Get the syscall number to name mapping of an architecture.
+
+    Returns:
+        The event.
+
+    """
+    event = TraceEvent(type=records[0][0], count=1, size=sum(size for _, _, size in records))
+    paths = []
+    for record_type, body, _ in records:
+        raw, _, enriched = body.partition("\x1d")
+        values: dict[str, str] = dict(FIELD_PATTERN.findall(raw))
+        if record_type == "SYSCALL":
+            event.arch = AUDIT_ARCHES.get(values.get("arch", ""), "")
+            names: dict[str, str] = dict(FIELD_PATTERN.findall(enriched))
+            number = values.get("syscall", "")
+            event.syscall = names.get("SYSCALL") or syscall_table(event.arch).get(number, number)
+            event.fields = {
+                name: values[name].strip('"') for name in TRACE_FIELDS if name in values
+            }
+        elif record_type == "PATH" and "name" in values:
+            paths.append(values["name"].strip('"'))
+    event.paths = tuple(paths)
+    return event
+
+
+def read_audit_log(
+    lines: typing.Iterable[str], syscall_table: typing.Callable[[str], dict[str, str]]
+) -> Trace:
+    """Read a trace from an audit log sample.
+
+    The sample only holds the events of the rules loaded when it was recorded, so a synthetic
+    mix is needed to estimate rules watching syscalls that were not logged.
+
+    Args:
+        lines: The lines of the audit log, in the RAW or ENRICHED format.
+        syscall_table: Get the syscall number to name mapping of an architecture.
+
+    Returns:
+        The trace.
+
+    """
+    events: dict[tuple, TraceEvent] = {}
+    records: list[tuple[str, str, int]] = []
+    serial = None
+    first = last = None
+    for line in lines:
+        if not (match := RECORD_PATTERN.match(line)):
+            continue
+        record_type, timestamp, record_serial, body = match.groups()
+        if record_serial != serial and records:
+            _aggregate(events, _parse_event(records, syscall_table))
+            records = []
+        serial = record_serial
+        first = float(timestamp) if first is None else first
+        last = float(timestamp)
+        if record_type != "EOE":
+            records.append((record_type, body, len(line.encode()) + 1))
+    if records:
+        _aggregate(events, _parse_event(records, syscall_table))
+    duration = last - first if first is not None and last is not None else 0.0
+    return Trace(events=list(events.values()), duration=max(duration, 1.0))
+
+
+def read_synthetic(lines: typing.Iterable[str]) -> Trace:
+    """Read a synthetic syscall mix.
+
+    Each line is a JSON object describing a kind of syscall and its rate, e.g.
+    '{"syscall": "openat", "rate": 120, "uid": "1000", "exit": "-13", "paths": ["/etc/shadow"]}'.
+    The 'arch' (default 'x86_64') and 'size' (default 512 bytes per event) keys are optional and
+    the other keys are SYSCALL record fields.
+
+    Args:
+        lines: The lines of the mix.
+
+    Returns:
+        The trace, covering one second.
+
+    Raises:
+        ValueError: When a line is not a JSON object with a syscall and a rate.
+
+    """
+    events: dict[tuple, TraceEvent] = {}
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+            rate = float(entry.pop("rate"))
+            event = TraceEvent(
+                type="SYSCALL",
+                syscall=str(entry.pop("syscall")),
+                arch=str(entry.pop("arch", "x86_64")),
+                paths=tuple(entry.pop("paths", ())),
+                count=rate,
+                size=rate * float(entry.pop("size", SYNTHETIC_EVENT_SIZE)),
+            )
+        except (json.JSONDecodeError, AttributeError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"line {number}: invalid synthetic syscall: {e}") from e
+        event.fields = {name: str(value) for name, value in entry.items()}
+        _aggregate(events, event)
+    return Trace(events=list(events.values()), duration=1.0)
+
+
+def _number(name: str, value: str, *, from_rule: bool = False) -> int | None:
+    """Convert a field value to a number the way the kernel compares it.
+
+    Args:
+        name: The field name.
+        value: The field value, from a rule or a trace.
+        from_rule: Parse the value as auditctl does, with a leading 0 for octal.
+
+    Returns:
+        The number, or None if the value is not numeric.
+
+    """
+    value = value.strip('"')
+    if value in ("unset", "-1") and name != "exit":
+        return UNSET_ID
+    if name == "success" and value in ("yes", "no"):
+        return int(value == "yes")
+    if name == "exit" and value.lstrip("-") in errno.errorcode.values():
+        return -getattr(errno, value.lstrip("-"))
+    try:
+        return parse_number(value) if from_rule else int(value, 0)
+    except ValueError:
+        return int(value) if value.isdigit() else None
+
+
+def _compare(name: str, operator: str, actual: str, expected: str) -> bool:
+    """Evaluate a rule field against a trace value.
+
+    Args:
+        name: The field name.
+        operator: The rule operator.
+        actual: The value of the trace.
+        expected: The value of the rule.
+
+    Returns:
+        True if the field matches.
+
+    """
+    left, right = _number(name, actual), _number(name, expected, from_rule=True)
+    if left is None or right is None:
+        left_value: int | str = actual.strip('"')
+        right_value: int | str = expected
+        if operator not in ("=", "!="):
+            return True
+    else:
+        left_value, right_value = left, right
+    return {
+        "=": lambda a, b: a == b,
+        "!=": lambda a, b: a != b,
+        "<": lambda a, b: a < b,
+        ">": lambda a, b: a > b,
+        "<=": lambda a, b: a <= b,
+        ">=": lambda a, b: a >= b,
+        "&": lambda a, b: bool(a & b),
+        "&=": lambda a, b: a & b == b,
+    }[operator](left_value, right_value)
+
+
+def _path_matches(path: str, paths: tuple[str, ...], *, recursive: bool) -> bool:
+    """Check if a watched path or directory covers one of the paths of an event.
+
+    Args:
+        path: The watched path.
+        paths: The paths of the event.
+        recursive: Whether the files under the path are covered.
+
+    Returns:
+        True if one of the paths is covered.
+
+    """
+    return any(
+        name == path or (recursive and name.startswith(f"{path.rstrip('/')}/")) for name in paths
+    )
+
+
+def _permissions_match(permissions: str, event: TraceEvent) -> bool:
+    """Check if the permissions of a watch cover the syscall of an event.
+
+    Only the execute permission is told apart, by the exec syscalls, as the trace does not
+    record the access mode of the other syscalls.
+
+    Args:
+        permissions: The watched permissions.
+        event: The event.
+
+    Returns:
+        True if the permissions cover the syscall.
+
+    """
+    if event.syscall in EXEC_SYSCALLS:
+        return "x" in permissions
+    return bool(set(permissions) - {"x"})
+
+
+def _field_matches(name: str, operator: str, value: str, event: TraceEvent) -> bool:
+    """Evaluate a field of a filter rule against an event.
+
+    Args:
+        name: The field name.
+        operator: The field operator.
+        value: The field value.
+        event: The event.
+
+    Returns:
+        True if the field matches, or if the event does not carry it.
+
+    """
+    if name == "arch":
+        bits = ARCH_BITS.get(event.arch)
+        matched = {"b64": bits == 64, "b32": bits == 32}.get(value, event.arch == value)  # noqa: PLR2004
+        return not event.arch or matched == (operator == "=")
+    if name in ("path", "dir"):
+        matched = _path_matches(value, event.paths, recursive=name == "dir")
+        return matched == (operator == "=")
+    if name == "perm":
+        return bool(event.paths) and _permissions_match(value, event)
+    if name not in event.fields:
+        return True
+    return _compare(name, operator, event.fields[name], value)
+
+
+def rule_matches(rule: Rule, event: TraceEvent) -> bool:
+    """Check if an exit filter rule or a file watch matches a syscall event.
+
+    Args:
+        rule: The rule.
+        event: The syscall event.
+
+    Returns:
+        True if the rule matches the event.
+
+    """
+    if rule.filter == "watch":
+        # A directory watch covers its subtree, and no path is under a watched file.
+        return _path_matches(rule.path, event.paths, recursive=True) and _permissions_match(
+            rule.permissions, event
+        )
+    # A syscall number that could not be resolved may be any of the rule syscalls.
+    if (
+        rule.syscalls
+        and "all" not in rule.syscalls
+        and event.syscall not in rule.syscalls
+        and not event.syscall.isdigit()
+    ):
+        return False
+    for name, operator, value in rule.fields:
+        if not _field_matches(name, operator, value, event):
+            return False
+    for comparison in rule.comparisons:
+        left, operator, right = re.split(r"(!=|=)", comparison)
+        if left in event.fields and right in event.fields:
+            if (event.fields[left] == event.fields[right]) != (operator == "="):
+                return False
+    return True
+
+
+def _event_key(rules: list[Rule], event: TraceEvent) -> str | None:
+    """Find the key an event is logged with.
+
+    Args:
+        rules: The rule set, in load order.
+        event: The event.
+
+    Returns:
+        The key of the first matching rule, an empty string for a rule without key, or None if
+        the event is not logged.
+
+    """
+    if event.type != "SYSCALL":
+        for rule in rules:
+            msgtypes = [(op, value) for name, op, value in rule.fields if name == "msgtype"]
+            if (
+                rule.filter == "exclude"
+                and rule.action == "never"
+                and msgtypes
+                and all(_compare("msgtype", op, event.type, value) for op, value in msgtypes)
+            ):
+                return None
+        return USER_SPACE_KEY
+    for rule in rules:
+        if rule.filter in ("exit", "watch") and rule_matches(rule, event):
+            return (rule.keys[0] if rule.keys else "") if rule.action == "always" else None
+    return None
+
+
+def simulate(rules: list[Rule], trace: Trace, max_log_file: int, num_logs: int) -> Simulation:
+    """Estimate the event volume of a rule set on a trace.
+
+    Args:
+        rules: The rule set, in load order.
+        trace: The trace.
+        max_log_file: The size of a log file before rotation, in MiB.
+        num_logs: The number of rotated log files kept.
+
+    Returns:
+        The estimated volume.
+
+    """
+    counts: dict[str, float] = collections.defaultdict(float)
+    size = 0.0
+    for event in trace.events:
+        if (key := _event_key(rules, event)) is None:
+            continue
+        counts[key] += event.count
+        size += event.size
+
+    bytes_per_second = size / trace.duration
+    seconds_to_rotation = None
+    seconds_of_retention = None
+    if bytes_per_second:
+        seconds_to_rotation = max_log_file * 1024 * 1024 / bytes_per_second
+        seconds_of_retention = seconds_to_rotation * max(num_logs, 1)
+    return Simulation(
+        events_per_second={key: count / trace.duration for key, count in counts.items()},
+        bytes_per_hour=bytes_per_second * 3600,
+        seconds_to_rotation=seconds_to_rotation,
+        seconds_of_retention=seconds_of_retention,
+    )
+
+
+def _hours(seconds: float | None) -> str:
+    """Format a duration in hours.
+
+    Args:
+        seconds: The duration in seconds, None for never.
+
+    Returns:
+        The formatted duration.
+
+    """
+    return f"{seconds / 3600:.1f}" if seconds is not None else "never"
+
+
+def format_simulation(simulation: Simulation) -> dict[str, typing.Any]:
+    """Format the estimated volume as action results.
+
+    Args:
+        simulation: The estimated volume of a rule set.
+
+    Returns:
+        The volume formatted for `event.set_results`, with the rule keys turned into valid
+        result keys.
+
+    """
+    return {
+        "events-per-second": {
+            re.sub(r"[^a-z0-9]+", "-", key.lower()).strip("-") or "no-key": f"{rate:.2f}"
+            for key, rate in simulation.events_per_second.items()
+        },
+        "total-events-per-second": f"{sum(simulation.events_per_second.values()):.2f}",
+        "log-mib-per-hour": f"{simulation.bytes_per_hour / 1024 / 1024:.2f}",
+        "hours-to-rotation": _hours(simulation.seconds_to_rotation),
+        "hours-of-retention": _hours(simulation.seconds_of_retention),
+    }
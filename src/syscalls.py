@@ -0,0 +1,46 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""The syscall tables of the audited architectures.
+
+The module is shared by the charm and the netlink forwarder, which runs with the system python
+and imports it from the helper directory, so it only imports the standard library.
+"""
+
+import functools
+import logging
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+# See linux/audit.h, the architectures are only resolved for the Ubuntu ones.
+ARCHITECTURES = {
+    "c000003e": "x86_64",
+    "40000003": "i386",
+    "c00000b7": "aarch64",
+    "40000028": "armeb",
+    "c0000015": "ppc64le",
+    "80000016": "s390x",
+    "c00000f3": "riscv64",
+}
+
+
+@functools.lru_cache(maxsize=len(ARCHITECTURES))
+def syscall_table(arch: str) -> dict[str, str]:
+    """Load the syscall table of an architecture with `ausyscall --dump`.
+
+    Args:
+        arch: The architecture name, e.g. 'x86_64'.
+
+    Returns:
+        A mapping of syscall number to name, empty if ausyscall fails.
+
+    """
+    try:
+        output = subprocess.run(
+            ["ausyscall", arch, "--dump"], check=True, capture_output=True, text=True
+        ).stdout
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        logger.warning("Cannot load the %s syscall table: %s", arch, e)
+        return {}
+    return dict(line.split("\t", 1) for line in output.splitlines() if "\t" in line)
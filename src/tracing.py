@@ -0,0 +1,85 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""The hook timing and tracing module."""
+
+import contextlib
+import logging
+import time
+import typing
+
+import opentelemetry.trace
+
+from constants import SLOW_HOOK_THRESHOLD
+
+logger = logging.getLogger(__name__)
+tracer = opentelemetry.trace.get_tracer(__name__)
+
+# Durations of the spans recorded during the current hook, in seconds.
+_timings: list[tuple[str, float]] = []
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: typing.Any) -> typing.Iterator[opentelemetry.trace.Span]:
+    """Trace a step of the hook and record its duration.
+
+    Args:
+        name: The name of the span, e.g. the command being run.
+        attributes: Attributes attached to the span.
+
+    Yields:
+        The current span.
+
+    """
+    start = time.monotonic()
+    with tracer.start_as_current_span(name) as current:
+        for key, value in attributes.items():
+            current.set_attribute(key, value)
+        try:
+            yield current
+        finally:
+            _timings.append((name, time.monotonic() - start))
+
+
+def timings() -> list[tuple[str, float]]:
+    """Get the spans recorded during the current hook.
+
+    Returns:
+        The (name, duration) of each recorded span, in recording order.
+
+    """
+    return list(_timings)
+
+
+def reset() -> None:
+    """Forget the recorded spans."""
+    _timings.clear()
+
+
+def summary() -> str:
+    """Summarize where the hook time went.
+
+    Returns:
+        The recorded spans sorted from slowest to fastest, with their total.
+
+    """
+    if not _timings:
+        return "no traced steps"
+    steps = ", ".join(
+        f"{name} {duration:.2f}s" for name, duration in sorted(_timings, key=lambda t: -t[1])
+    )
+    return f"{steps} (total {sum(d for _, d in _timings):.2f}s)"
+
+
+def status_detail() -> str:
+    """Describe the hook timing for the unit status when the hook was slow.
+
+    Returns:
+        The slowest step and the total, or an empty string if the hook was fast.
+
+    """
+    total = sum(duration for _, duration in _timings)
+    if total < SLOW_HOOK_THRESHOLD:
+        return ""
+    name, duration = max(_timings, key=lambda t: t[1])
+    return f"Slow hook: {total:.1f}s, mostly {name} ({duration:.1f}s)"
@@ -7,12 +7,20 @@ import logging
 import os
 import pwd
 import subprocess
+import time
 from pathlib import Path
 
 from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
 
+from constants import DPKG_STATUS_FILE
+from tracing import span
+
 logger = logging.getLogger(__name__)
 
+# Installed package versions read from the dpkg status file, keyed by package name, along with
+# the modification time of the status file they were read from.
+_dpkg_status_cache: dict[str, tuple[float, str | None]] = {}
+
 
 def read_file(path: Path) -> str:
     """Read the content of a file.
@@ -27,6 +35,39 @@ def read_file(path: Path) -> str:
     return path.read_text(encoding="utf-8")
 
 
+def get_file_age(path: Path) -> float:
+    """Get the time since a file was last modified.
+
+    Args:
+        path: Path object to the file.
+
+    Returns:
+        float: The age of the file in seconds, or infinity if the file does not exist.
+
+    """
+    try:
+        return time.time() - path.stat().st_mtime
+    except FileNotFoundError:
+        return float("inf")
+
+
+def backoff_delay(attempts: int, base: float, cap: float) -> float:
+    """Get the exponential backoff delay before the next attempt.
+
+    Args:
+        attempts: The number of consecutive attempts already made.
+        base: The delay after the first attempt, in seconds.
+        cap: The maximum delay, in seconds.
+
+    Returns:
+        float: The delay in seconds, zero if no attempt was made yet.
+
+    """
+    if attempts <= 0:
+        return 0.0
+    return float(min(cap, base * 2 ** (attempts - 1)))
+
+
 def write_file(path: Path, content: str, owner: str, mode: int = 0o600) -> None:
     """Write a content rendered from a template to a file.
 
@@ -37,10 +78,33 @@ def write_file(path: Path, content: str, owner: str, mode: int = 0o600) -> None:
         mode: access permission mask applied to the file using chmod (default=0o600)
 
     """
-    path.write_text(content, encoding="utf-8")
-    os.chmod(path, mode)
-    u = pwd.getpwnam(owner)
-    os.chown(path, uid=u.pw_uid, gid=u.pw_gid)
+    with span("write", path=str(path)):
+        path.write_text(content, encoding="utf-8")
+        os.chmod(path, mode)
+        u = pwd.getpwnam(owner)
+        os.chown(path, uid=u.pw_uid, gid=u.pw_gid)
+
+
+def update_file(path: Path, content: str, owner: str, mode: int = 0o600) -> bool:
+    """Write a content to a file only if it differs from the current content.
+
+    Args:
+        path: Path object to the file.
+        content: the data to be written to the file.
+        owner: the owner of the file.
+        mode: access permission mask applied to the file using chmod (default=0o600)
+
+    Returns:
+        bool: True if the file was written.
+
+    """
+    try:
+        if read_file(path) == content:
+            return False
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    write_file(path, content, owner, mode)
+    return True
 
 
 def render_jinja2_template(context: dict, template_name: str, template_file_path: str) -> str:
@@ -68,10 +132,47 @@ def render_jinja2_template(context: dict, template_name: str, template_file_path
     return rendered_content
 
 
+def get_installed_version(package: str, status_file: Path = DPKG_STATUS_FILE) -> str | None:
+    """Get the installed version of a package from the dpkg status file.
+
+    The status file is streamed until the stanza of the package ends, and the result is cached
+    until the status file is modified.
+
+    Args:
+        package: The name of the package.
+        status_file: Path object to the dpkg status file.
+
+    Returns:
+        The installed version of the package, or None if it is not installed.
+
+    """
+    mtime = status_file.stat().st_mtime
+    if (cached := _dpkg_status_cache.get(package)) and cached[0] == mtime:
+        return cached[1]
+
+    version = None
+    with status_file.open(encoding="utf-8") as status:
+        in_stanza, fields = False, {}
+        for line in status:
+            if line.startswith("Package: "):
+                in_stanza = line[len("Package: ") :].strip() == package
+            elif not line.strip() and in_stanza:
+                break
+            elif in_stanza and line.startswith(("Status: ", "Version: ")):
+                key, _, value = line.partition(": ")
+                fields[key] = value.strip()
+        if fields.get("Status", "").endswith(" installed"):
+            version = fields.get("Version")
+
+    _dpkg_status_cache[package] = (mtime, version)
+    return version
+
+
 def get_machine_virt_type() -> str:
     """Get the machine_virt_type."""
     try:
-        virt_type = subprocess.check_output(["systemd-detect-virt"]).decode().strip()
+        with span("systemd-detect-virt"):
+            virt_type = subprocess.check_output(["systemd-detect-virt"]).decode().strip()
     except subprocess.CalledProcessError as e:
         logger.error("Failed to detect virtualization type: %s", e.stderr)
         raise e
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Watch the files managed by the auditd charm and dispatch a charm event when they change.
+
+`auditd-drift-watcher.service` blocks on inotify, through libc with ctypes, so it costs nothing
+while the watched files are left alone. The changes are debounced and dispatched as a single
+drift-detected hook with juju-exec.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import subprocess
+import time
+from pathlib import Path
+
+logger = logging.getLogger("auditd-drift-watcher")
+
+JUJU_EXEC = "/usr/bin/juju-exec"
+
+# See inotify(7).
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+class Inotify:
+    """A minimal inotify instance over ctypes."""
+
+    def __init__(self) -> None:
+        """Initialize the instance.
+
+        Raises:
+            OSError: When the inotify instance cannot be created.
+
+        """
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, path: Path, mask: int = WATCH_MASK) -> int:
+        """Watch a file or a directory.
+
+        Args:
+            path: The path to watch.
+            mask: The inotify events to watch.
+
+        Returns:
+            The watch descriptor.
+
+        Raises:
+            OSError: When the path cannot be watched.
+
+        """
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        return wd
+
+    def read(self, timeout: float | None = None) -> list[tuple[int, int, str]]:
+        """Read the pending events.
+
+        Args:
+            timeout: The maximum time to wait for an event in seconds, forever if None.
+
+        Returns:
+            The (watch descriptor, mask, name) of each event, empty on timeout.
+
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        return parse_events(os.read(self.fd, READ_SIZE))
+
+    def close(self) -> None:
+        """Close the inotify instance."""
+        os.close(self.fd)
+
+
+def parse_events(buffer: bytes) -> list[tuple[int, int, str]]:
+    """Parse the `struct inotify_event` records read from an inotify instance.
+
+    Args:
+        buffer: The bytes read from the inotify file descriptor.
+
+    Returns:
+        The (watch descriptor, mask, name) of each event.
+
+    """
+    events = []
+    offset = 0
+    while offset + EVENT_HEADER.size <= len(buffer):
+        wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+        offset += EVENT_HEADER.size
+        name = buffer[offset : offset + length].rstrip(b"\0").decode(errors="replace")
+        offset += length
+        events.append((wd, mask, name))
+    return events
+
+
+class DriftWatcher:
+    """Watch managed files and directories for changes."""
+
+    def __init__(self, inotify: Inotify, paths: list[Path]) -> None:
+        """Watch the given paths.
+
+        Files are watched through their parent directory, so that they are still watched when
+        they are replaced by a rename, as editors and configuration tools do.
+
+        Args:
+            inotify: The inotify instance.
+            paths: The managed files and directories.
+
+        """
+        self.inotify = inotify
+        self._watches: dict[int, tuple[Path, str | None]] = {}
+        for path in paths:
+            if path.is_dir():
+                self._watches[inotify.add_watch(path)] = (path, None)
+            else:
+                self._watches[inotify.add_watch(path.parent)] = (path.parent, path.name)
+
+    def changed(self, events: list[tuple[int, int, str]]) -> set[Path]:
+        """Filter the events down to the managed paths that changed.
+
+        Args:
+            events: The events read from the inotify instance.
+
+        Returns:
+            The managed paths that changed.
+
+        """
+        changed = set()
+        for wd, _, name in events:
+            if wd not in self._watches:
+                continue
+            directory, filename = self._watches[wd]
+            if filename is None or name == filename:
+                changed.add(directory / name)
+        return changed
+
+    def wait(self, debounce: float) -> set[Path]:
+        """Wait until the managed paths changed and settled.
+
+        Args:
+            debounce: The time without further changes after which the changes are settled.
+
+        Returns:
+            The managed paths that changed.
+
+        """
+        changed: set[Path] = set()
+        while not changed:
+            changed = self.changed(self.inotify.read())
+        while events := self.inotify.read(timeout=debounce):
+            changed |= self.changed(events)
+        return changed
+
+    def discard(self) -> None:
+        """Discard the pending events, e.g. the charm's own writes while it was dispatched."""
+        while self.inotify.read(timeout=0):
+            continue
+
+
+def dispatch(unit: str, charm_dir: Path, event: str) -> bool:
+    """Dispatch a custom charm event with juju-exec.
+
+    Args:
+        unit: The name of the unit, e.g. 'auditd/0'.
+        charm_dir: The directory of the charm.
+        event: The name of the event, e.g. 'drift-detected'.
+
+    Returns:
+        True if the hook ran successfully.
+
+    """
+    cmd = [JUJU_EXEC, "-u", unit, f"JUJU_DISPATCH_PATH=hooks/{event} {charm_dir}/dispatch"]
+    result = subprocess.run(cmd, check=False, capture_output=True, text=True)
+    if result.returncode:
+        logger.error("Failed to dispatch %s: %s", event, result.stderr)
+    return not result.returncode
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the watcher.
+
+    Args:
+        argv: The command line arguments.
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--unit", required=True)
+    parser.add_argument("--charm-dir", type=Path, required=True)
+    parser.add_argument("--event", default="drift-detected")
+    parser.add_argument("--debounce", type=float, default=2.0)
+    parser.add_argument("--path", type=Path, action="append", required=True)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    watcher = DriftWatcher(Inotify(), args.path)
+    logger.info("Watching %s", ", ".join(str(path) for path in args.path))
+    while True:
+        changed = watcher.wait(args.debounce)
+        logger.info("Drift detected in %s", ", ".join(sorted(str(path) for path in changed)))
+        start = time.monotonic()
+        dispatch(args.unit, args.charm_dir, args.event)
+        logger.info("Dispatched %s in %.1fs", args.event, time.monotonic() - start)
+        watcher.discard()
+
+
+if __name__ == "__main__":  # pragma: nocover
+    main()
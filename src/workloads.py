@@ -2,43 +2,373 @@
 # See LICENSE file for licensing details.
 """The auditd service module."""
 
+import functools
+import ipaddress
 import logging
+import os
+import platform
+import re
 import subprocess
+import tarfile
+import tempfile
+import typing
+from dataclasses import dataclass, field
 from pathlib import Path
 
 import pydantic
 from charms.operator_libs_linux.v0 import apt
 from charms.operator_libs_linux.v1 import systemd
 
+from benchmark import SyscallOverhead, compute_overhead, measure_latencies
 from constants import (
+    APT_CACHE_FILE,
+    APT_CACHE_MAX_AGE,
+    AU_REMOTE_PLUGIN_TEMPLATE,
+    AUDISP_PLUGINS_PKG,
+    AUDISP_REMOTE_QUEUE_FILE,
+    AUDISP_REMOTE_TEMPLATE,
     AUDIT_RULE_PATH,
     AUDITD_CONFIG_TEMPLATE,
     AUDITD_MAX_NUM_LOGS,
+    AUDITD_MAX_RESTARTS,
     AUDITD_MIN_NUM_LOGS,
+    AUDITD_RESOURCES_TEMPLATE,
+    AUDITD_SPACE_LEFT,
+    COMPAT_ARCHES,
+    HEALTH_PROPERTIES,
+    HELPER_LIB_DIR,
+    HELPER_SCRIPT_PATH,
+    HELPER_SERVICE_TEMPLATE,
+    IO_SCHEDULING_CLASSES,
+    LOG_FORMATS,
+    NETWORK_FAILURE_ACTIONS,
+    OVERFLOW_ACTIONS,
+    REMOTE_FORMATS,
+    ROTATE_SERVICE_TEMPLATE,
+    ROTATE_TIMER_TEMPLATE,
+    RULE_PROFILE_PATH,
+    RULE_PROFILE_PREFIX,
+    RULE_PROFILES,
+    SYSTEMD_UNIT_DIR,
     TEMPLATE_FILE_PATH,
 )
-from utils import read_file, render_jinja2_template, write_file
+from rules import (
+    canonicalize,
+    diff_rules,
+    lint_rules,
+    parse_rule,
+    read_rule_files,
+    rules_hash,
+)
+from service_control import (
+    ServiceControlError,
+    ServiceController,
+    UnitState,
+    get_service_controller,
+)
+from simulator import Simulation, read_audit_log, read_synthetic, simulate
+from syscalls import syscall_table
+from tracing import span
+from utils import (
+    get_file_age,
+    get_installed_version,
+    read_file,
+    render_jinja2_template,
+    update_file,
+    write_file,
+)
 
 logger = logging.getLogger()
 
+READ_CHUNK_SIZE = 64 * 1024
+HOSTNAME_PATTERN = re.compile(r"(?!-)[A-Za-z0-9-]{1,63}(?<!-)(\.(?!-)[A-Za-z0-9-]{1,63}(?<!-))*")
+CALENDAR_PATTERN = re.compile(r"[A-Za-z0-9*:,./~+ -]+")
+RECORD_TYPE_PATTERN = re.compile(r"[A-Z][A-Z0-9_]*")
+RULE_KEY_PATTERN = re.compile(r"[^\s\",]{1,31}")
+
+
+def _is_ip_address(value: str) -> bool:
+    """Indicate if a string is an IPv4 or IPv6 address.
+
+    Args:
+        value (str): The string to check.
+
+    Returns:
+        True if the string is an IP address.
+
+    """
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _syscall_table(arch: str | None) -> dict[str, str] | None:
+    """Load the syscall table of the architecture of a rule with `ausyscall --dump`.
+
+    Args:
+        arch: The value of the arch field of a rule, None for the native architecture.
+
+    Returns:
+        The syscall names by number, or None if the syscall table cannot be loaded.
+
+    """
+    machine = platform.machine()
+    table = {None: machine, "b64": machine, "b32": COMPAT_ARCHES.get(machine)}.get(arch, arch)
+    if not table:
+        return None
+    return syscall_table(table) or None
+
+
+def _syscall_names(arch: str | None) -> set[str] | None:
+    """Get the syscall names of an architecture.
+
+    Args:
+        arch: The value of the arch field of a rule, None for the native architecture.
+
+    Returns:
+        The syscall names, or None if the syscall table cannot be loaded.
+
+    """
+    table = _syscall_table(arch)
+    return set(table.values()) if table is not None else None
+
+
+def _parse_version(version: str) -> apt.Version:
+    """Parse a Debian version string, e.g. '1:3.1.2-2'.
+
+    Args:
+        version (str): The version string with an optional epoch.
+
+    Returns:
+        The comparable version.
+
+    """
+    epoch, separator, upstream = version.partition(":")
+    if not separator:
+        return apt.Version(version, "")
+    return apt.Version(upstream, epoch)
+
+
+def _satisfies_min_version(version: str, min_version: str) -> bool:
+    """Check a package version against a minimum version.
+
+    Args:
+        version (str): The version to check.
+        min_version (str): The minimum acceptable version, empty for any version.
+
+    Returns:
+        True if the version is at or above the minimum version.
+
+    """
+    return not min_version or _parse_version(version) >= _parse_version(min_version)
+
+
+def _systemd_int(value: typing.Any) -> int | None:
+    """Convert a systemd numeric property, which may be unset.
+
+    Args:
+        value (Any): The property value from D-Bus (int) or from `systemctl show` (str).
+
+    Returns:
+        The value, or None if systemd reports it as unset.
+
+    """
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number >= 2**64 - 1 else number
+
+
+RESOURCE_CONTROL_OPTIONS = (
+    "cpu_weight",
+    "io_weight",
+    "nice",
+    "io_scheduling_class",
+    "oom_score_adjust",
+    "memory_high",
+)
+
 
 class AuditRuleReloadError(Exception):
     """Error when reloading the audit rules."""
 
 
+class AuditdInstallError(Exception):
+    """Error when installing the auditd package from local debs."""
+
+
 class AuditdServiceRestartError(Exception):
     """Error when restarting the auditd service."""
 
 
+class InvalidAuditRulesError(Exception):
+    """Error when the audit rule files do not pass the linter."""
+
+    def __init__(self, errors: list[str]) -> None:
+        """Initialize the error.
+
+        Args:
+            errors: The lint errors, formatted as 'file:line: message'.
+
+        """
+        more = f" (and {len(errors) - 1} more)" if len(errors) > 1 else ""
+        super().__init__(f"Invalid audit rule {errors[0]}{more}")
+        self.errors = errors
+
+
 class AuditdServiceNotActiveError(Exception):
     """Error when the auditd service is not active."""
 
 
+@dataclass
+class AuditdHealth:
+    """A snapshot of the auditd service health.
+
+    Attributes:
+        active_state: The ActiveState of the auditd unit.
+        main_pid: The PID of the auditd daemon, 0 if not running.
+        n_restarts: The number of automatic restarts systemd did for auditd.
+        memory_bytes: The memory used by the auditd unit.
+        cpu_seconds: The CPU time used by the auditd unit.
+        io_read_bytes: The bytes read by the auditd unit.
+        io_write_bytes: The bytes written by the auditd unit.
+        kernel: The kernel audit counters reported by `auditctl -s`.
+
+    """
+
+    active_state: str
+    main_pid: int
+    n_restarts: int
+    memory_bytes: int | None = None
+    cpu_seconds: float | None = None
+    io_read_bytes: int | None = None
+    io_write_bytes: int | None = None
+    kernel: dict[str, int] = field(default_factory=dict)
+
+    def metrics(self) -> dict[str, float | None]:
+        """Get the snapshot as metrics.
+
+        Returns:
+            The metric values keyed by metric name, the counters being named `*_total`.
+
+        """
+        return {
+            "up": int(self.active_state == "active"),
+            "restarts_total": self.n_restarts,
+            "memory_bytes": self.memory_bytes,
+            "cpu_seconds_total": self.cpu_seconds,
+            "io_read_bytes_total": self.io_read_bytes,
+            "io_write_bytes_total": self.io_write_bytes,
+            **{f"kernel_{name}": value for name, value in self.kernel.items()},
+        }
+
+    def status_detail(self) -> str:
+        """Describe the notable health issues for the unit status.
+
+        Returns:
+            The lost events and restarts, or an empty string if there are none.
+
+        """
+        issues = []
+        if lost := self.kernel.get("lost"):
+            issues.append(f"{lost} audit events lost")
+        if self.n_restarts:
+            issues.append(f"auditd restarted {self.n_restarts} times")
+        return ", ".join(issues)
+
+
+@dataclass
+class ChangePlan:
+    """The changes to apply to auditd at the end of the hook.
+
+    Attributes:
+        daemon_reload: Whether systemd must reload its unit files.
+        restart: Whether auditd must restart, which also loads the audit rules.
+        reload_rules: Whether the audit rules must be loaded.
+        reasons: Why the changes are needed.
+
+    """
+
+    daemon_reload: bool = False
+    restart: bool = False
+    reload_rules: bool = False
+    reasons: list[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        """Indicate if there is any change to apply."""
+        return self.daemon_reload or self.restart or self.reload_rules
+
+    def schedule_daemon_reload(self, reason: str) -> None:
+        """Schedule a systemd reload.
+
+        Args:
+            reason: Why the reload is needed.
+
+        """
+        self.daemon_reload = True
+        self.reasons.append(reason)
+
+    def schedule_restart(self, reason: str) -> None:
+        """Schedule an auditd restart.
+
+        Args:
+            reason: Why the restart is needed.
+
+        """
+        self.restart = True
+        self.reasons.append(reason)
+
+    def schedule_rule_reload(self, reason: str) -> None:
+        """Schedule loading the audit rules.
+
+        Args:
+            reason: Why the reload is needed.
+
+        """
+        self.reload_rules = True
+        self.reasons.append(reason)
+
+
 class AuditdConfig(pydantic.BaseModel):
     """Auditd charm configuration."""
 
     num_logs: int = pydantic.Field(10)
     max_log_file: int = pydantic.Field(512)
+    max_rule_overhead: int = pydantic.Field(100)
+    min_auditd_version: str = pydantic.Field("")
+    apt_cache_max_age: int = pydantic.Field(APT_CACHE_MAX_AGE)
+    cpu_weight: int | None = pydantic.Field(None, ge=1, le=10000)
+    io_weight: int | None = pydantic.Field(None, ge=1, le=10000)
+    nice: int | None = pydantic.Field(None, ge=-20, le=19)
+    io_scheduling_class: str | None = pydantic.Field(None)
+    oom_score_adjust: int | None = pydantic.Field(None, ge=-1000, le=1000)
+    memory_high: str | None = pydantic.Field(None)
+    drift_watcher: bool = pydantic.Field(False)
+    forwarding_only: bool = pydantic.Field(False)
+    log_format: str = pydantic.Field("ENRICHED")
+    netlink_forwarder: bool = pydantic.Field(False)
+    mask_journald_audit: bool = pydantic.Field(False)
+    tcp_listen_port: int | None = pydantic.Field(None, ge=1, le=65535)
+    tcp_listen_queue: int = pydantic.Field(5, ge=1)
+    tcp_max_per_addr: int = pydantic.Field(1, ge=1, le=1024)
+    tcp_client_max_idle: int = pydantic.Field(0, ge=0)
+    remote_server: str | None = pydantic.Field(None)
+    remote_port: int = pydantic.Field(60, ge=1, le=65535)
+    remote_queue_depth: int = pydantic.Field(2048, ge=1)
+    remote_network_failure_action: str = pydantic.Field("stop")
+    remote_network_retry_time: int = pydantic.Field(1, ge=1)
+    remote_overflow_action: str = pydantic.Field("syslog")
+    remote_format: str = pydantic.Field("managed")
+    remote_disk_spool: bool = pydantic.Field(False)
+    rule_profile: str = pydantic.Field("")
+    min_retention_hours: int = pydantic.Field(0, ge=0)
+    rotate_schedule: str = pydantic.Field("")
+    forward_record_types: list[str] = pydantic.Field([])
+    forward_keys: list[str] = pydantic.Field([])
+    forward_dedup_window: int = pydantic.Field(0, ge=0)
 
     @pydantic.field_validator("num_logs")
     @classmethod
@@ -50,24 +380,349 @@ class AuditdConfig(pydantic.BaseModel):
             raise ValueError(f"'num_logs' cannot be larger than {AUDITD_MAX_NUM_LOGS}.")
         return value
 
+    @pydantic.field_validator("max_rule_overhead")
+    @classmethod
+    def validate_max_rule_overhead(cls, value: int) -> int:
+        """Validate 'max_rule_overhead' charm config option."""
+        if value < 0:
+            raise ValueError("'max_rule_overhead' cannot be negative.")
+        return value
+
+    @pydantic.field_validator("apt_cache_max_age")
+    @classmethod
+    def validate_apt_cache_max_age(cls, value: int) -> int:
+        """Validate 'apt_cache_max_age' charm config option."""
+        if value < 0:
+            raise ValueError("'apt_cache_max_age' cannot be negative.")
+        return value
+
+    @pydantic.field_validator("io_scheduling_class")
+    @classmethod
+    def validate_io_scheduling_class(cls, value: str | None) -> str | None:
+        """Validate 'io_scheduling_class' charm config option."""
+        if value and value not in IO_SCHEDULING_CLASSES:
+            raise ValueError(
+                f"'io_scheduling_class' must be one of {', '.join(IO_SCHEDULING_CLASSES)}."
+            )
+        return value
+
+    @pydantic.field_validator("memory_high")
+    @classmethod
+    def validate_memory_high(cls, value: str | None) -> str | None:
+        """Validate 'memory_high' charm config option."""
+        if value and not re.fullmatch(r"\d+[KMGT]?|\d{1,2}%|100%|infinity", value):
+            raise ValueError(
+                "'memory_high' must be a size in bytes with an optional K, M, G or T suffix, "
+                "a percentage, or 'infinity'."
+            )
+        return value
+
+    @pydantic.field_validator("remote_network_failure_action")
+    @classmethod
+    def validate_remote_network_failure_action(cls, value: str) -> str:
+        """Validate 'remote_network_failure_action' charm config option."""
+        if value not in NETWORK_FAILURE_ACTIONS:
+            raise ValueError(
+                "'remote_network_failure_action' must be one of "
+                f"{', '.join(NETWORK_FAILURE_ACTIONS)}."
+            )
+        return value
+
+    @pydantic.field_validator("remote_overflow_action")
+    @classmethod
+    def validate_remote_overflow_action(cls, value: str) -> str:
+        """Validate 'remote_overflow_action' charm config option."""
+        if value not in OVERFLOW_ACTIONS:
+            raise ValueError(
+                f"'remote_overflow_action' must be one of {', '.join(OVERFLOW_ACTIONS)}."
+            )
+        return value
+
+    @pydantic.field_validator("remote_format")
+    @classmethod
+    def validate_remote_format(cls, value: str) -> str:
+        """Validate 'remote_format' charm config option."""
+        if value not in REMOTE_FORMATS:
+            raise ValueError(f"'remote_format' must be one of {', '.join(REMOTE_FORMATS)}.")
+        return value
+
+    @pydantic.field_validator("log_format")
+    @classmethod
+    def validate_log_format(cls, value: str) -> str:
+        """Validate 'log_format' charm config option."""
+        if value not in LOG_FORMATS:
+            raise ValueError(f"'log_format' must be one of {', '.join(LOG_FORMATS)}.")
+        return value
+
+    @pydantic.field_validator("rule_profile")
+    @classmethod
+    def validate_rule_profile(cls, value: str) -> str:
+        """Validate 'rule_profile' charm config option."""
+        if value and value not in RULE_PROFILES:
+            raise ValueError(f"'rule_profile' must be empty or one of {', '.join(RULE_PROFILES)}.")
+        return value
+
+    @pydantic.field_validator("rotate_schedule")
+    @classmethod
+    def validate_rotate_schedule(cls, value: str) -> str:
+        """Validate 'rotate_schedule' charm config option."""
+        if value and not CALENDAR_PATTERN.fullmatch(value.strip()):
+            raise ValueError("'rotate_schedule' must be a systemd calendar event, e.g. 'daily'.")
+        return value.strip()
+
+    @pydantic.field_validator("forward_record_types", "forward_keys", mode="before")
+    @classmethod
+    def split_forward_filter(cls, value: str | list[str]) -> list[str]:
+        """Split the comma-separated forwarder filter charm config options."""
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(",") if item.strip()]
+        return value
+
+    @pydantic.field_validator("forward_record_types")
+    @classmethod
+    def validate_forward_record_types(cls, value: list[str]) -> list[str]:
+        """Validate 'forward_record_types' charm config option."""
+        value = [record_type.upper() for record_type in value]
+        if invalid := [t for t in value if not RECORD_TYPE_PATTERN.fullmatch(t)]:
+            raise ValueError(f"'forward_record_types' has invalid record types: {invalid}.")
+        return value
+
+    @pydantic.field_validator("forward_keys")
+    @classmethod
+    def validate_forward_keys(cls, value: list[str]) -> list[str]:
+        """Validate 'forward_keys' charm config option."""
+        if invalid := [key for key in value if not RULE_KEY_PATTERN.fullmatch(key)]:
+            raise ValueError(f"'forward_keys' has invalid rule keys: {invalid}.")
+        return value
+
+    @pydantic.field_validator("remote_server")
+    @classmethod
+    def validate_remote_server(cls, value: str | None) -> str | None:
+        """Validate 'remote_server' charm config option."""
+        if value and not (_is_ip_address(value) or HOSTNAME_PATTERN.fullmatch(value)):
+            raise ValueError("'remote_server' must be a hostname or an IP address.")
+        return value
+
+    @pydantic.model_validator(mode="after")
+    def validate_forwarding_only(self) -> "AuditdConfig":
+        """Validate that the events are forwarded when auditd does not write them."""
+        if self.forwarding_only and not (self.remote_server or self.netlink_forwarder):
+            raise ValueError(
+                "'forwarding_only' requires 'remote_server' or 'netlink_forwarder', otherwise "
+                "the audit events are discarded."
+            )
+        return self
+
+    @pydantic.model_validator(mode="after")
+    def validate_forward_filter(self) -> "AuditdConfig":
+        """Validate that the forwarder filter and dedup apply to the netlink forwarder."""
+        forward_options = (
+            self.forward_record_types or self.forward_keys or self.forward_dedup_window
+        )
+        if forward_options and not self.netlink_forwarder:
+            raise ValueError(
+                "'forward_record_types', 'forward_keys' and 'forward_dedup_window' require "
+                "'netlink_forwarder', which writes the filtered log."
+            )
+        return self
+
 
 class AuditdService:
     """Auditd service class."""
 
     pkg = "auditd"
     name = "auditd"
+    unit = "auditd.service"
     rule_path = Path("/etc/audit/rules.d/")
     config_file = Path("/etc/audit/auditd.conf")
+    resources_drop_in = SYSTEMD_UNIT_DIR / "auditd.service.d" / "juju-resources.conf"
+    remote_config_file = Path("/etc/audit/audisp-remote.conf")
+    remote_plugin_file = Path("/etc/audit/plugins.d/au-remote.conf")
+
+    def __init__(self) -> None:
+        """Initialize the instance."""
+        self.plan = ChangePlan()
+
+    @functools.cached_property
+    def controller(self) -> ServiceController:
+        """The controller used to query and restart the auditd service."""
+        return get_service_controller()
+
+    def install(
+        self,
+        min_version: str = "",
+        cache_max_age: int = APT_CACHE_MAX_AGE,
+        debs: Path | None = None,
+    ) -> None:
+        """Install the auditd package.
+
+        Apt is left alone when auditd is already installed at an acceptable version, and the apt
+        cache is only updated when it is older than `cache_max_age`. When local debs are given,
+        they are installed with dpkg instead of apt.
+
+        Args:
+            min_version (str): The minimum acceptable auditd version, empty for any version.
+            cache_max_age (int): The maximum age of the apt cache in hours.
+            debs (Path | None): A .deb file or a tar archive of .deb files to install offline.
+
+        Raises:
+            AuditdInstallError: When the local debs cannot be installed.
+
+        """
+        installed = self.installed_version()
+        if installed and _satisfies_min_version(installed, min_version):
+            logger.info("%s %s is already installed, skipping apt.", self.pkg, installed)
+        elif debs:
+            self._install_local_debs(debs)
+        else:
+            if get_file_age(APT_CACHE_FILE) > cache_max_age * 3600:
+                with span("apt-get update"):
+                    apt.update()
+            with span("apt-get install", package=self.pkg):
+                if installed:
+                    apt.DebianPackage.from_apt_cache(self.pkg).ensure(apt.PackageState.Latest)
+                else:
+                    apt.add_package(package_names=self.pkg)
+        self.update_rules()
+
+    def _install_local_debs(self, debs: Path) -> None:
+        """Install auditd from local .deb files with dpkg.
+
+        Args:
+            debs (Path): A .deb file or a tar archive of .deb files.
+
+        Raises:
+            AuditdInstallError: When the archive holds no .deb file or dpkg fails.
+
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if tarfile.is_tarfile(debs):
+                deb_files = []
+                with tarfile.open(debs) as archive:
+                    for member in archive.getmembers():
+                        if not member.isfile() or not member.name.endswith(".deb"):
+                            continue
+                        if content := archive.extractfile(member):
+                            deb_file = Path(tmp_dir) / Path(member.name).name
+                            deb_file.write_bytes(content.read())
+                            deb_files.append(str(deb_file))
+            else:
+                deb_files = [str(debs)]
+            if not deb_files:
+                raise AuditdInstallError(f"No .deb file found in {debs}.")
+
+            cmd = ["dpkg", "-i", "--force-confold", *sorted(deb_files)]
+            logger.info("Installing %s from local debs: %s", self.pkg, ", ".join(deb_files))
+            try:
+                with span("dpkg -i", argv=cmd):
+                    subprocess.run(
+                        cmd,
+                        check=True,
+                        capture_output=True,
+                        text=True,
+                        env={**os.environ, "DEBIAN_FRONTEND": "noninteractive"},
+                    )
+            except subprocess.CalledProcessError as e:
+                raise AuditdInstallError(f"Failed to install local debs: {e.stderr}") from e
+
+    def update_rules(self) -> bool:
+        """Install the bundled audit rules.
+
+        The rules are loaded by `apply_changes`, only when a rule file changed.
+
+        Returns:
+            True if a rule file changed.
+
+        Raises:
+            InvalidAuditRulesError: When the rule files would not pass the linter.
+
+        """
+        changed = self._add_audit_rules(AUDIT_RULE_PATH)
+        if changed:
+            self.plan.schedule_rule_reload("audit rules installed")
+        return changed
+
+    def configure_profile(self, profile: str) -> bool:
+        """Install the selected rule profile and remove the other ones.
+
+        A rule reload is only scheduled when the installed profiles change.
+
+        Args:
+            profile: The name of the rule profile, or an empty string for none.
+
+        Returns:
+            True if the installed profiles changed.
+
+        Raises:
+            InvalidAuditRulesError: When the rule files would not pass the linter.
+
+        """
+        selected = f"{RULE_PROFILE_PREFIX}{profile}.rules" if profile else None
+        files: dict[str, str | None] = {
+            installed.name: None
+            for installed in self.rule_path.glob(f"{RULE_PROFILE_PREFIX}*.rules")
+            if installed.name != selected
+        }
+        if selected:
+            files[selected] = read_file(Path(RULE_PROFILE_PATH) / f"{profile}.rules")
+
+        changed = self._write_rule_files(files)
+        if changed:
+            self.plan.schedule_rule_reload("rule profile changed")
+        return changed
+
+    def lint_rules(self, changes: dict[str, str | None] | None = None) -> list[str]:
+        """Lint the rule files that augenrules loads.
+
+        Args:
+            changes: The content of the rule files about to be written by name, None for the
+                ones about to be removed.
+
+        Returns:
+            The lint errors, formatted as 'file:line: message'.
+
+        """
+        contents: dict[str, str | None] = {
+            rule_file.name: read_file(rule_file) for rule_file in self.rule_path.glob("*.rules")
+        }
+        contents.update(changes or {})
+        sources = [
+            (name, content.splitlines())
+            for name, content in sorted(contents.items())
+            if content is not None
+        ]
+        return lint_rules(sources, _syscall_names)
 
-    def install(self) -> None:
-        """Install the auditd package."""
-        apt.add_package(package_names=self.pkg, update_cache=True)
-        self._add_audit_rules(AUDIT_RULE_PATH)
-        self._merge_audit_rules()
+    def rules_in_sync(self) -> bool:
+        """Compare the rules loaded in the kernel with the rule files by canonical hash.
+
+        Returns:
+            True if the loaded rules match the rule files, or if they cannot be listed.
+
+        """
+        desired = canonicalize(read_rule_files(self.rule_path))
+        try:
+            loaded = canonicalize(self._run_auditctl("-l").splitlines())
+        except AuditRuleReloadError as e:
+            logger.warning("Cannot list the loaded audit rules: %s", str(e))
+            return True
+        if rules_hash(desired) == rules_hash(loaded):
+            return True
+
+        missing, unexpected = diff_rules(desired, loaded)
+        for rule in missing:
+            logger.debug("Audit rule not loaded: %s", rule)
+        for rule in unexpected:
+            logger.debug("Unexpected audit rule loaded: %s", rule)
+        logger.info(
+            "Loaded audit rules differ: %d missing, %d unexpected.", len(missing), len(unexpected)
+        )
+        return False
 
     def remove(self) -> None:
         """Remove the auditd package."""
-        apt.remove_package(package_names=self.pkg)
+        with span("apt-get remove", package=self.pkg):
+            apt.remove_package(package_names=self.pkg)
 
     def restart(self) -> None:
         """Restart the auditd service.
@@ -77,22 +732,48 @@ class AuditdService:
 
         """
         try:
-            systemd.service_restart(self.name)
-        except systemd.SystemdError as exc:
+            self.controller.restart(self.unit)
+        except ServiceControlError as exc:
             raise AuditdServiceRestartError(f"Failed to restart {self.name}.") from exc
 
     def configure(self, content: str) -> None:
         """Configure auditd service.
 
+        The restart is deferred to `apply_changes`.
+
         Args:
             content (str): The content of auditd configuration.
 
+        """
+        write_file(self.config_file, content, "root", 0o640)
+        self.plan.schedule_restart("auditd.conf changed")
+
+    def apply_changes(self) -> ChangePlan:
+        """Apply the pending changes with at most one restart or rule reload.
+
+        Returns:
+            The applied plan.
+
         Raises:
             AuditdServiceRestartError: When the auditd service fails to restart.
+            InvalidAuditRulesError: When augenrules fails to load the audit rules.
 
         """
-        write_file(self.config_file, content, "root", 0o640)
-        self.restart()
+        if not self.plan:
+            return self.plan
+
+        plan, self.plan = self.plan, ChangePlan()
+
+        logger.info("Applying auditd changes: %s", ", ".join(plan.reasons))
+        if plan.daemon_reload:
+            with span("systemctl daemon-reload"):
+                systemd.daemon_reload()
+        if plan.restart:
+            # auditd.service loads the rules with augenrules when it starts.
+            self.restart()
+        elif plan.reload_rules:
+            self._merge_audit_rules()
+        return plan
 
     def render_config(self, context: dict) -> str:
         """Render auditd config file given the context.
@@ -101,7 +782,78 @@ class AuditdService:
             context (dict): The context pass to the template file.
 
         """
-        return render_jinja2_template(context, AUDITD_CONFIG_TEMPLATE, TEMPLATE_FILE_PATH)
+        return render_jinja2_template(
+            {**context, "max_restarts": AUDITD_MAX_RESTARTS, "space_left": AUDITD_SPACE_LEFT},
+            AUDITD_CONFIG_TEMPLATE,
+            TEMPLATE_FILE_PATH,
+        )
+
+    def configure_resources(self, context: dict) -> bool:
+        """Manage the systemd drop-in holding the auditd resource controls.
+
+        The drop-in is removed when no resource control is set, and a systemd reload and an
+        auditd restart are only scheduled when the drop-in changes.
+
+        Args:
+            context (dict): The resource control options.
+
+        Returns:
+            True if the drop-in changed.
+
+        """
+        if any(context.get(option) is not None for option in RESOURCE_CONTROL_OPTIONS):
+            content = render_jinja2_template(
+                context, AUDITD_RESOURCES_TEMPLATE, TEMPLATE_FILE_PATH
+            )
+            changed = update_file(self.resources_drop_in, content, "root", 0o644)
+        elif changed := self.resources_drop_in.exists():
+            self.resources_drop_in.unlink()
+
+        if changed:
+            self.plan.schedule_daemon_reload("resource controls changed")
+            self.plan.schedule_restart("resource controls changed")
+        return changed
+
+    def configure_remote(self, context: dict) -> bool:
+        """Manage the audisp-remote plugin forwarding the events to a remote auditd.
+
+        The plugins package is installed when a remote server is set, and the plugin is
+        deactivated when it is unset. With the disk spool, audisp-remote stores the events in
+        its queue file before sending them, so that they survive long network outages. An auditd
+        restart is only scheduled when the plugin configuration changes.
+
+        Args:
+            context (dict): The remote logging options.
+
+        Returns:
+            True if the plugin configuration changed.
+
+        """
+        active = bool(context.get("remote_server"))
+        if not active and not self.remote_plugin_file.exists():
+            return False
+
+        changed = False
+        if active:
+            if get_installed_version(AUDISP_PLUGINS_PKG) is None:
+                with span("apt-get install", package=AUDISP_PLUGINS_PKG):
+                    apt.add_package(package_names=AUDISP_PLUGINS_PKG)
+            if context.get("remote_disk_spool"):
+                AUDISP_REMOTE_QUEUE_FILE.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            content = render_jinja2_template(
+                {**context, "queue_file": AUDISP_REMOTE_QUEUE_FILE},
+                AUDISP_REMOTE_TEMPLATE,
+                TEMPLATE_FILE_PATH,
+            )
+            changed = update_file(self.remote_config_file, content, "root", 0o640)
+        content = render_jinja2_template(
+            {"active": active}, AU_REMOTE_PLUGIN_TEMPLATE, TEMPLATE_FILE_PATH
+        )
+        changed |= update_file(self.remote_plugin_file, content, "root", 0o640)
+
+        if changed:
+            self.plan.schedule_restart("remote logging changed")
+        return changed
 
     def is_installed(self) -> bool:
         """Indicate if auditd is installed.
@@ -110,11 +862,25 @@ class AuditdService:
             True if the auditd is installed.
 
         """
-        try:
-            apt.DebianPackage.from_installed_package(self.pkg)
-        except apt.PackageNotFoundError:
-            return False
-        return True
+        return self.installed_version() is not None
+
+    def installed_version(self) -> str | None:
+        """Get the installed auditd version.
+
+        Returns:
+            The installed version including its epoch, or None if auditd is not installed.
+
+        """
+        return get_installed_version(self.pkg)
+
+    def state(self) -> UnitState:
+        """Get the systemd state of the auditd service.
+
+        Returns:
+            The ActiveState, SubState and NRestarts of auditd.
+
+        """
+        return self.controller.state(self.unit)
 
     def is_active(self) -> bool:
         """Indicate if the auditd service is active.
@@ -123,26 +889,400 @@ class AuditdService:
             True if the auditd is running.
 
         """
-        return systemd.service_running(self.name)
+        return self.state().is_active
+
+    def health(self) -> AuditdHealth:
+        """Gather the auditd service health in one call.
+
+        Returns:
+            The systemd state and resource usage of auditd, and the kernel audit counters.
+
+        Raises:
+            ServiceControlError: When systemd cannot be queried.
+
+        """
+        props = self.controller.properties(self.unit, HEALTH_PROPERTIES)
+        cpu_nsec = _systemd_int(props.get("CPUUsageNSec"))
+        return AuditdHealth(
+            active_state=str(props.get("ActiveState", "")),
+            main_pid=_systemd_int(props.get("MainPID")) or 0,
+            n_restarts=_systemd_int(props.get("NRestarts")) or 0,
+            memory_bytes=_systemd_int(props.get("MemoryCurrent")),
+            cpu_seconds=cpu_nsec / 1e9 if cpu_nsec is not None else None,
+            io_read_bytes=_systemd_int(props.get("IOReadBytes")),
+            io_write_bytes=_systemd_int(props.get("IOWriteBytes")),
+            kernel=self._kernel_status(),
+        )
+
+    def _kernel_status(self) -> dict[str, int]:
+        """Get the kernel audit counters from `auditctl -s`.
+
+        Returns:
+            The numeric counters, or an empty dict if auditctl fails.
+
+        """
+        try:
+            with span("auditctl", argv=["auditctl", "-s"]):
+                output = subprocess.run(
+                    ["auditctl", "-s"], check=True, capture_output=True, text=True
+                ).stdout
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            logger.warning("Failed to get the kernel audit status: %s", e)
+            return {}
+        status = {}
+        for line in output.splitlines():
+            name, _, value = line.partition(" ")
+            if value.split(" ")[0].isdigit():
+                status[name] = int(value.split(" ")[0])
+        return status
+
+    def proposed_rule_files(self, profile: str) -> list[Path]:
+        """List the bundled rule files and the rule profile, in load order.
+
+        Args:
+            profile (str): The name of the rule profile, or an empty string for none.
+
+        Returns:
+            The rule files shipped with the charm.
+
+        """
+        rule_files = sorted(Path(AUDIT_RULE_PATH).glob("*.rules"))
+        if profile:
+            rule_files.append(Path(RULE_PROFILE_PATH) / f"{profile}.rules")
+        return rule_files
+
+    def simulate_rules(self, trace: Path, profile: str, config: dict) -> Simulation:
+        """Estimate the event volume of the bundled rules and a rule profile on a trace.
+
+        Args:
+            trace (Path): An audit log sample, or a synthetic syscall mix as JSON lines.
+            profile (str): The name of the rule profile, or an empty string for none.
+            config (dict): The charm config, for `max_log_file` and `num_logs`.
+
+        Returns:
+            The estimated volume.
+
+        Raises:
+            ValueError: When the trace or a rule cannot be parsed.
+
+        """
+        rule_set = []
+        for rule_file in self.proposed_rule_files(profile):
+            for line in read_file(rule_file).splitlines():
+                if rule := parse_rule(line):
+                    rule_set.append(rule)
+
+        with trace.open(encoding="utf-8", errors="replace") as lines:
+            first = next((line for line in lines if line.strip()), "")
+            lines.seek(0)
+            if first.startswith("{"):
+                recorded = read_synthetic(lines)
+            else:
+                recorded = read_audit_log(lines, lambda arch: _syscall_table(arch) or {})
+        return simulate(rule_set, recorded, config["max_log_file"], config["num_logs"])
+
+    def benchmark_rules(
+        self, iterations: int, profile: str = ""
+    ) -> tuple[dict[str, SyscallOverhead], dict[str, SyscallOverhead]]:
+        """Measure the syscall overhead of the loaded and the bundled rule sets.
+
+        The kernel rules are temporarily replaced by an empty filter and then by the bundled
+        rules and the rule profile; the persisted rules are always reloaded afterwards. The host
+        is not audited by its persisted rules in the meantime.
+
+        Args:
+            iterations (int): The number of calls to time for each syscall class.
+            profile (str): The name of the rule profile to measure with the bundled rules.
+
+        Returns:
+            The overhead of the currently loaded and of the bundled rule sets.
+
+        Raises:
+            AuditRuleReloadError: When the audit rules cannot be loaded.
+            InvalidAuditRulesError: When augenrules fails to reload the persisted rules.
+
+        """
+        current = measure_latencies(iterations)
+        try:
+            self._run_auditctl("-D")
+            baseline = measure_latencies(iterations)
+            with tempfile.NamedTemporaryFile("w", suffix=".rules", encoding="utf-8") as rules:
+                for rule_file in self.proposed_rule_files(profile):
+                    rules.write(read_file(rule_file))
+                rules.flush()
+                self._run_auditctl("-R", rules.name)
+            proposed = measure_latencies(iterations)
+        finally:
+            self._merge_audit_rules()
+        return compute_overhead(baseline, current), compute_overhead(baseline, proposed)
+
+    def _run_auditctl(self, *args: str) -> str:
+        """Run auditctl to list or change the loaded kernel rules.
+
+        Args:
+            args: The arguments passed to auditctl.
+
+        Returns:
+            The output of auditctl.
+
+        Raises:
+            AuditRuleReloadError: When auditctl fails.
+
+        """
+        try:
+            with span("auditctl", argv=["auditctl", *args]):
+                return subprocess.run(
+                    ["auditctl", *args], check=True, capture_output=True, text=True
+                ).stdout
+        except subprocess.CalledProcessError as e:
+            raise AuditRuleReloadError(f"auditctl {' '.join(args)} failed: {e.stderr}") from e
 
-    def _add_audit_rules(self, path: str) -> None:
+    def _add_audit_rules(self, path: str) -> bool:
         """Add audit rule files.
 
         Args:
             path (str): The path to find the rule files.
 
+        Returns:
+            True if a rule file was written.
+
+        Raises:
+            InvalidAuditRulesError: When the rule files would not pass the linter.
+
         """
-        for rule_file in Path(path).glob("*"):
-            content = read_file(rule_file)
-            destination = self.rule_path / rule_file.name
-            logger.info("Writing audit rule to '%s'", destination)
-            write_file(self.rule_path / rule_file.name, content, "root", 0o640)
+        return self._write_rule_files(
+            {rule_file.name: read_file(rule_file) for rule_file in Path(path).glob("*.rules")}
+        )
+
+    def _write_rule_files(self, files: dict[str, str | None]) -> bool:
+        """Lint the rule files as augenrules would load them once written, then write them.
+
+        augenrules stops at the first invalid rule and leaves the kernel with a partial rule set,
+        on the next reload or whenever auditd starts, so invalid rules are never written.
+
+        Args:
+            files: The content of the rule files to write by name, None for the ones to remove.
+
+        Returns:
+            True if a rule file was written or removed.
+
+        Raises:
+            InvalidAuditRulesError: When the rule files would not pass the linter.
+
+        """
+        changes = {}
+        for name, content in files.items():
+            path = self.rule_path / name
+            if content != (read_file(path) if path.exists() else None):
+                changes[name] = content
+        if not changes:
+            return False
+
+        if errors := self.lint_rules(changes):
+            for error in errors:
+                logger.error("Invalid audit rule %s", error)
+            raise InvalidAuditRulesError(errors)
+
+        for name, content in changes.items():
+            path = self.rule_path / name
+            if content is None:
+                logger.info("Removing audit rule file '%s'", path)
+                path.unlink()
+            else:
+                logger.info("Wrote audit rule to '%s'", path)
+                update_file(path, content, "root", 0o640)
+        return True
 
     def _merge_audit_rules(self) -> None:
-        """Merge all audit rule files."""
+        """Merge all audit rule files and load them.
+
+        Raises:
+            InvalidAuditRulesError: When augenrules fails to load the audit rules.
+
+        """
+        logger.info("Installing audit rules.")
         try:
-            logger.info("Installing audit rules.")
-            subprocess.run(["augenrules", "--load"], check=False)
+            with span("augenrules", argv=["augenrules", "--load"]):
+                subprocess.run(
+                    ["augenrules", "--load"], check=True, capture_output=True, text=True
+                )
         except subprocess.CalledProcessError as e:
             logger.error("Failed to reload audit rules: %s", e.stderr)
-            raise e
+            errors = [f"augenrules: {line}" for line in (e.stderr or "").splitlines() if line]
+            raise InvalidAuditRulesError(
+                errors or [f"augenrules exited with {e.returncode}"]
+            ) from e
+
+
+class HelperService:
+    """A charm-managed systemd service running a helper script shipped with the charm."""
+
+    def __init__(
+        self,
+        name: str,
+        script: str,
+        description: str,
+        args: list[str],
+        metrics_file: Path | None = None,
+        modules: tuple[str, ...] = (),
+    ) -> None:
+        """Initialize the instance.
+
+        Args:
+            name (str): The name of the service.
+            script (str): The file name of the helper script in the charm source.
+            description (str): The description of the service.
+            args (list[str]): The arguments passed to the helper script.
+            metrics_file (Path | None): The metrics textfile written by the service, if any.
+            modules (tuple[str, ...]): The file names of the charm modules imported by the
+                helper script, installed alongside it.
+
+        """
+        self.name = name
+        self.unit = f"{name}.service"
+        self.unit_file = SYSTEMD_UNIT_DIR / self.unit
+        self.script_source = Path(HELPER_SCRIPT_PATH) / script
+        self.script = HELPER_LIB_DIR / script
+        self.description = description
+        self.args = args
+        self.metrics_file = metrics_file
+        self.modules = modules
+
+    def ensure(self) -> bool:
+        """Install the helper service and (re)start it when it changed.
+
+        Returns:
+            True if the service was installed or updated.
+
+        """
+        changed = update_file(self.script, read_file(self.script_source), "root", 0o755)
+        for module in self.modules:
+            source = Path(HELPER_SCRIPT_PATH) / module
+            changed |= update_file(HELPER_LIB_DIR / module, read_file(source), "root", 0o644)
+        unit_content = render_jinja2_template(
+            {"description": self.description, "script": self.script, "args": self.args},
+            HELPER_SERVICE_TEMPLATE,
+            TEMPLATE_FILE_PATH,
+        )
+        changed |= update_file(self.unit_file, unit_content, "root", 0o644)
+        if changed:
+            logger.info("Installing the %s service.", self.name)
+            with span("systemctl enable", service=self.name):
+                systemd.daemon_reload()
+                systemd.service_enable(self.unit)
+                systemd.service_restart(self.unit)
+        return changed
+
+    def remove(self) -> None:
+        """Stop and remove the helper service and its metrics textfile.
+
+        The textfile is removed even when the service is gone, so that the exporter does not
+        keep serving stale counters.
+        """
+        if self.metrics_file:
+            self.metrics_file.unlink(missing_ok=True)
+        if not self.unit_file.exists():
+            return
+        logger.info("Removing the %s service.", self.name)
+        with span("systemctl disable", service=self.name):
+            systemd.service_disable("--now", self.unit)
+            self.unit_file.unlink()
+            self.script.unlink(missing_ok=True)
+            for module in self.modules:
+                (HELPER_LIB_DIR / module).unlink(missing_ok=True)
+            systemd.daemon_reload()
+
+
+class RotationTimer:
+    """A charm-managed systemd timer rotating the audit log on a calendar schedule.
+
+    auditd only rotates its log by size; the timer sends it the USR1 signal, on which it rotates
+    the log the same way, keeping `num_logs` files.
+    """
+
+    name = "auditd-rotate"
+
+    def __init__(self) -> None:
+        """Initialize the instance."""
+        self.timer = f"{self.name}.timer"
+        self.service_file = SYSTEMD_UNIT_DIR / f"{self.name}.service"
+        self.timer_file = SYSTEMD_UNIT_DIR / self.timer
+
+    def ensure(self, schedule: str) -> bool:
+        """Install the rotation timer and restart it when it changed.
+
+        Args:
+            schedule (str): The systemd calendar event on which the log is rotated.
+
+        Returns:
+            True if the timer was installed or updated.
+
+        """
+        changed = update_file(
+            self.service_file,
+            render_jinja2_template({}, ROTATE_SERVICE_TEMPLATE, TEMPLATE_FILE_PATH),
+            "root",
+            0o644,
+        )
+        changed |= update_file(
+            self.timer_file,
+            render_jinja2_template(
+                {"schedule": schedule}, ROTATE_TIMER_TEMPLATE, TEMPLATE_FILE_PATH
+            ),
+            "root",
+            0o644,
+        )
+        if changed:
+            logger.info("Scheduling the audit log rotation on '%s'.", schedule)
+            with span("systemctl enable", timer=self.timer):
+                systemd.daemon_reload()
+                systemd.service_enable(self.timer)
+                systemd.service_restart(self.timer)
+        return changed
+
+    def remove(self) -> None:
+        """Stop and remove the rotation timer."""
+        if not self.timer_file.exists():
+            return
+        logger.info("Removing the audit log rotation timer.")
+        with span("systemctl disable", timer=self.timer):
+            systemd.service_disable("--now", self.timer)
+            self.timer_file.unlink()
+            self.service_file.unlink(missing_ok=True)
+            systemd.daemon_reload()
+
+
+class JournaldAuditSocket:
+    """The journald socket receiving the kernel audit messages."""
+
+    unit = "systemd-journald-audit.socket"
+    journald = "systemd-journald.service"
+
+    def mask(self) -> None:
+        """Mask the socket and restart journald so that it closes the audit socket."""
+        logger.info("Masking %s.", self.unit)
+        with span("systemctl mask", unit=self.unit):
+            systemd.service_pause(self.unit)
+            systemd.service_restart(self.journald)
+
+    def unmask(self) -> None:
+        """Unmask and start the socket and restart journald so that it reads it again."""
+        logger.info("Unmasking %s.", self.unit)
+        with span("systemctl unmask", unit=self.unit):
+            systemd.service_resume(self.unit)
+            systemd.service_restart(self.journald)
+
+    def audit_volume(self) -> int:
+        """Measure the journal volume of the audit messages over the last hour.
+
+        Returns:
+            The size of the audit entries written to the journal in the last hour, in bytes.
+
+        """
+        cmd = ["journalctl", "_TRANSPORT=audit", "--since=-1h", "--output=export", "--no-pager"]
+        volume = 0
+        with span("journalctl", argv=cmd):
+            with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+                while chunk := proc.stdout.read(READ_CHUNK_SIZE):  # type: ignore[union-attr]
+                    volume += len(chunk)
+        return volume
@@ -0,0 +1,72 @@
+from unittest.mock import patch
+
+import pytest
+
+import benchmark
+from benchmark import SyscallOverhead
+
+
+@patch("benchmark.os.close")
+@patch("benchmark.os.open", return_value=3)
+def test_probe_open(mock_open, mock_close):
+    benchmark._probe_open()
+    mock_open.assert_called_once_with(benchmark.BENCHMARK_PROBE_PATH, benchmark.os.O_RDONLY)
+    mock_close.assert_called_once_with(3)
+
+
+@patch("benchmark.os.stat")
+def test_probe_stat(mock_stat):
+    benchmark._probe_stat()
+    mock_stat.assert_called_once_with(benchmark.BENCHMARK_PROBE_PATH)
+
+
+@patch("benchmark.subprocess.run")
+def test_probe_execve(mock_run):
+    benchmark._probe_execve()
+    mock_run.assert_called_once_with([benchmark.BENCHMARK_EXECVE_BINARY], check=True)
+
+
+def test_percentiles():
+    p50, p99 = benchmark.percentiles([i * 1000 for i in range(1, 101)])
+    assert p50 == pytest.approx(50.5)
+    assert p99 == pytest.approx(99.01)
+
+
+def test_measure_latencies():
+    calls = {"open": 0, "execve": 0}
+
+    def count(name):
+        def probe():
+            calls[name] += 1
+
+        return probe
+
+    probes = {"open": (count("open"), 1), "execve": (count("execve"), 10)}
+    with patch.dict(benchmark.SYSCALL_PROBES, probes, clear=True):
+        latencies = benchmark.measure_latencies(100)
+    assert calls == {"open": 100, "execve": 10}
+    assert set(latencies) == {"open", "execve"}
+
+
+def test_compute_overhead():
+    overhead = benchmark.compute_overhead(
+        {"open": (2.0, 4.0), "stat": (0.0, 0.0)}, {"open": (3.0, 10.0), "stat": (1.0, 1.0)}
+    )
+    assert overhead["open"] == SyscallOverhead(p50=1.0, p99=6.0, percent=50.0)
+    assert overhead["stat"].percent == 0.0
+
+
+def test_exceeds_budget():
+    overhead = {
+        "open": SyscallOverhead(p50=1.0, p99=2.0, percent=50.0),
+        "execve": SyscallOverhead(p50=1.0, p99=2.0, percent=5.0),
+    }
+    assert benchmark.exceeds_budget(overhead, 10) == ["open"]
+    assert benchmark.exceeds_budget(overhead, 50) == []
+
+
+def test_format_overhead():
+    overhead = {"open": SyscallOverhead(p50=1.234, p99=5.678, percent=12.34)}
+    assert benchmark.format_overhead(overhead) == {
+        "open": {"p50-us": "1.23", "p99-us": "5.68", "p50-percent": "12.3"}
+    }
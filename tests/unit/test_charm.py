@@ -1,10 +1,37 @@
+import time
 from unittest.mock import patch
 
+import ops
 import pytest
 from ops import testing
 
 import charm
+from benchmark import SyscallOverhead
 from charm import AuditdOperatorCharm
+from service_control import UnitState
+from simulator import Simulation
+from workloads import AuditdHealth
+
+
+@pytest.fixture(autouse=True)
+def mock_host():
+    with (
+        patch.object(charm.HelperService, "ensure") as mock_ensure,
+        patch.object(charm.HelperService, "remove"),
+        patch.object(charm.RotationTimer, "ensure"),
+        patch.object(charm.RotationTimer, "remove"),
+        patch.object(
+            charm.AuditdService, "health", return_value=AuditdHealth("active", 1, 0)
+        ) as mock_health,
+        patch("charm.write_metrics") as mock_write_metrics,
+        patch.object(charm.AuditdService, "state", return_value=UnitState("failed", "failed", 0)),
+        patch.object(charm.AuditdService, "rules_in_sync", return_value=True),
+        patch.object(charm.AuditdService, "configure_remote", return_value=False),
+        patch.object(charm.AuditdService, "configure_profile", return_value=False),
+        patch.object(charm.AuditdService, "lint_rules", return_value=[]),
+        patch("charm.measure_growth", side_effect=FileNotFoundError),
+    ):
+        yield mock_ensure, mock_health, mock_write_metrics
 
 
 @patch("charm.AuditdService.remove")
@@ -36,15 +63,67 @@ def test_on_install_lxc(mock_virt, mock_auditd_install):
     assert isinstance(e.value.__cause__, charm.PlatformUnsupportedError)
 
 
+@patch.object(charm.AuditdOperatorCharm, "_get_debs_resource", return_value=None)
 @patch("charm.AuditdService.install")
 @patch("charm.get_machine_virt_type", return_value="kvm")
-def test_on_install_non_lxc(mock_virt, mock_auditd_install):
+def test_on_install_non_lxc(mock_virt, mock_auditd_install, _):
     ctx = testing.Context(AuditdOperatorCharm)
     state = testing.State()
     ctx.run(ctx.on.install(), state)
     mock_auditd_install.assert_called_once()
 
 
+@patch.object(charm.AuditdOperatorCharm, "_get_debs_resource", return_value=None)
+@patch("charm.AuditdService.install")
+@patch("charm.get_machine_virt_type", return_value="kvm")
+def test_on_install_passes_package_config(mock_virt, mock_auditd_install, _):
+    ctx = testing.Context(AuditdOperatorCharm)
+    state = testing.State(config={"min_auditd_version": "1:3.1.2", "apt_cache_max_age": 6})
+    ctx.run(ctx.on.install(), state)
+    mock_auditd_install.assert_called_once_with("1:3.1.2", 6, None)
+
+
+@patch("charm.AuditdService.install")
+@patch("charm.get_machine_virt_type", return_value="kvm")
+def test_on_install_with_debs_resource(mock_virt, mock_auditd_install, tmp_path):
+    debs = tmp_path / "auditd-debs.tar"
+    debs.write_bytes(b"debs")
+    ctx = testing.Context(AuditdOperatorCharm)
+    state = testing.State(resources={testing.Resource(name="auditd-debs", path=debs)})
+    ctx.run(ctx.on.install(), state)
+    assert mock_auditd_install.call_args.args[2].read_bytes() == b"debs"
+
+
+@patch("charm.AuditdService.install")
+@patch("charm.get_machine_virt_type", return_value="kvm")
+@patch("charm.ops.model.Resources.fetch", side_effect=ops.ModelError)
+def test_on_install_without_debs_resource(_, mock_virt, mock_auditd_install):
+    ctx = testing.Context(AuditdOperatorCharm)
+    ctx.run(ctx.on.install(), testing.State())
+    assert mock_auditd_install.call_args.args[2] is None
+
+
+@patch("charm.AuditdService.install")
+@patch("charm.get_machine_virt_type", return_value="kvm")
+def test_on_install_with_empty_debs_resource(mock_virt, mock_auditd_install, tmp_path):
+    debs = tmp_path / "auditd-debs.tar"
+    debs.write_bytes(b"")
+    ctx = testing.Context(AuditdOperatorCharm)
+    state = testing.State(resources={testing.Resource(name="auditd-debs", path=debs)})
+    ctx.run(ctx.on.install(), state)
+    assert mock_auditd_install.call_args.args[2] is None
+
+
+@patch.object(charm.AuditdOperatorCharm, "_get_debs_resource", return_value=None)
+@patch("charm.AuditdService.install")
+@patch("charm.get_machine_virt_type", return_value="kvm")
+def test_on_install_invalid_config_uses_defaults(mock_virt, mock_auditd_install, _):
+    ctx = testing.Context(AuditdOperatorCharm)
+    state = testing.State(config={"apt_cache_max_age": -1})
+    ctx.run(ctx.on.install(), state)
+    mock_auditd_install.assert_called_once_with("", 24, None)
+
+
 @patch("charm.AuditdService.install")
 @patch("charm.get_machine_virt_type", return_value="lxc")
 def test_on_upgrade_lxc(mock_virt, mock_auditd_install):
@@ -56,9 +135,10 @@ def test_on_upgrade_lxc(mock_virt, mock_auditd_install):
     assert isinstance(e.value.__cause__, charm.PlatformUnsupportedError)
 
 
+@patch.object(charm.AuditdOperatorCharm, "_get_debs_resource", return_value=None)
 @patch("charm.AuditdService.install")
 @patch("charm.get_machine_virt_type", return_value="kvm")
-def test_on_upgrade_non_lxc(mock_virt, mock_auditd_install):
+def test_on_upgrade_non_lxc(mock_virt, mock_auditd_install, _):
     ctx = testing.Context(AuditdOperatorCharm)
     state = testing.State()
     ctx.run(ctx.on.install(), state)
@@ -70,6 +150,7 @@ def test_on_upgrade_non_lxc(mock_virt, mock_auditd_install):
     [
         {"num_logs": -1, "max_log_file": 512},
         {"num_logs": 1000, "max_log_file": 512},
+        {"forwarding_only": True},
     ],
 )
 @patch.object(charm.AuditdOperatorCharm, "_configure_auditd")
@@ -133,18 +214,18 @@ def test_configure_auditd_no_change(
 
 @patch.object(charm.AuditdService, "render_config", return_value="new")
 @patch("charm.read_file", return_value="old")
-@patch.object(
-    charm.AuditdService, "configure", side_effect=charm.AuditdServiceRestartError("fail")
-)
+@patch("workloads.write_file")
+@patch.object(charm.AuditdService, "restart", side_effect=charm.AuditdServiceRestartError("fail"))
 @patch.object(charm.AuditdService, "is_active", return_value=True)
 def test_configure_auditd_configure_error(
-    mock_is_active, mock_configure, mock_read_file, mock_render_config
+    mock_is_active, mock_restart, mock_write_file, mock_read_file, mock_render_config
 ):
     ctx = testing.Context(AuditdOperatorCharm)
     state = testing.State(config={"num_logs": 2, "max_log_file": 512})
     out = ctx.run(ctx.on.config_changed(), state)
-    mock_configure.assert_called_once()
-    assert out.unit_status == testing.BlockedStatus("Failed to configure and restart auditd.")
+    mock_write_file.assert_called_once()
+    mock_restart.assert_called_once()
+    assert out.unit_status == testing.BlockedStatus("Failed to configure and restart auditd: fail")
 
 
 @patch.object(charm.AuditdService, "render_config", return_value="same")
@@ -171,4 +252,596 @@ def test_configure_auditd_restart_error(
     ctx = testing.Context(AuditdOperatorCharm)
     state = testing.State(config={"num_logs": 2, "max_log_file": 512})
     out = ctx.run(ctx.on.config_changed(), state)
-    assert out.unit_status == testing.BlockedStatus("Failed to configure and restart auditd.")
+    assert out.unit_status == testing.BlockedStatus("Failed to configure and restart auditd: fail")
+    stored = out.get_stored_state("_stored", owner_path="AuditdOperatorCharm")
+    assert len(stored.content["restart_attempts"]) == 1
+    assert stored.content["last_restart_failure"] == "fail"
+
+
+def _restart_history(attempts: list[float], failure: str = "") -> testing.StoredState:
+    return testing.StoredState(
+        owner_path="AuditdOperatorCharm",
+        content={"restart_attempts": attempts, "last_restart_failure": failure},
+    )
+
+
+@patch.object(charm.AuditdService, "render_config", return_value="same")
+@patch("charm.read_file", return_value="same")
+@patch.object(charm.AuditdService, "is_active", return_value=False)
+@patch.object(charm.AuditdService, "restart")
+def test_configure_auditd_restart_backoff(mock_restart, *_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    stored = _restart_history([time.time() - 10, time.time()], "fail")
+    out = ctx.run(ctx.on.update_status(), testing.State(stored_states={stored}))
+    mock_restart.assert_not_called()
+    assert out.unit_status.name == "blocked"
+    assert out.unit_status.message.startswith("auditd is down, next restart in 6")
+    assert out.unit_status.message.endswith("s: fail")
+
+
+@patch.object(charm.AuditdService, "render_config", return_value="same")
+@patch("charm.read_file", return_value="same")
+@patch.object(charm.AuditdService, "is_active", return_value=False)
+@patch.object(charm.AuditdService, "restart")
+def test_configure_auditd_restart_after_backoff(mock_restart, *_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    stored = _restart_history([time.time() - 1000])
+    out = ctx.run(ctx.on.update_status(), testing.State(stored_states={stored}))
+    mock_restart.assert_called_once()
+    assert out.unit_status == testing.ActiveStatus()
+    stored = out.get_stored_state("_stored", owner_path="AuditdOperatorCharm")
+    assert len(stored.content["restart_attempts"]) == 2  # noqa: PLR2004
+    assert stored.content["last_restart_failure"] == "auditd is failed"
+
+
+@patch.object(charm.AuditdService, "render_config", return_value="same")
+@patch("charm.read_file", return_value="same")
+@patch.object(charm.AuditdService, "is_active", return_value=False)
+@patch.object(charm.AuditdService, "restart")
+def test_configure_auditd_crash_loop_attempts(mock_restart, *_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    stored = _restart_history([0.0] * 10, "fail")
+    out = ctx.run(ctx.on.update_status(), testing.State(stored_states={stored}))
+    mock_restart.assert_not_called()
+    assert out.unit_status == testing.BlockedStatus("auditd is crash-looping (10 restarts): fail")
+
+
+@patch.object(charm.AuditdService, "render_config", return_value="same")
+@patch("charm.read_file", return_value="same")
+@patch.object(charm.AuditdService, "is_active", return_value=False)
+@patch.object(
+    charm.AuditdService, "state", return_value=UnitState("activating", "auto-restart", 12)
+)
+@patch.object(charm.AuditdService, "restart")
+def test_configure_auditd_crash_loop_systemd(mock_restart, *_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    stored = _restart_history([0.0])
+    out = ctx.run(ctx.on.update_status(), testing.State(stored_states={stored}))
+    mock_restart.assert_not_called()
+    assert out.unit_status == testing.BlockedStatus(
+        "auditd is crash-looping (12 restarts): auditd is activating"
+    )
+
+
+@patch.object(charm.AuditdService, "render_config", return_value="same")
+@patch("charm.read_file", return_value="same")
+@patch.object(charm.AuditdService, "is_active", return_value=False)
+@patch.object(
+    charm.AuditdService, "state", return_value=UnitState("activating", "auto-restart", 12)
+)
+@patch.object(charm.AuditdService, "restart")
+def test_configure_auditd_config_changed_resets_history(mock_restart, *_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    stored = _restart_history([time.time()] * 10, "fail")
+    out = ctx.run(ctx.on.config_changed(), testing.State(stored_states={stored}))
+    mock_restart.assert_called_once()
+    assert out.unit_status == testing.ActiveStatus()
+
+
+@patch.object(charm.AuditdService, "render_config", return_value="same")
+@patch("charm.read_file", return_value="same")
+@patch.object(charm.AuditdService, "is_active", return_value=True)
+def test_configure_auditd_active_clears_history(*_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    stored = _restart_history([time.time()], "fail")
+    out = ctx.run(ctx.on.update_status(), testing.State(stored_states={stored}))
+    stored = out.get_stored_state("_stored", owner_path="AuditdOperatorCharm")
+    assert stored.content["restart_attempts"] == []
+    assert stored.content["last_restart_failure"] == ""
+
+
+@patch.object(charm.AuditdService, "update_rules")
+@patch.object(
+    charm.AuditdService,
+    "benchmark_rules",
+    return_value=(
+        {"open": SyscallOverhead(p50=1.0, p99=2.0, percent=10.0)},
+        {"open": SyscallOverhead(p50=1.0, p99=2.0, percent=20.0)},
+    ),
+)
+def test_benchmark_rules_action_apply(mock_benchmark, mock_update_rules):
+    ctx = testing.Context(AuditdOperatorCharm)
+    state = testing.State(config={"max_rule_overhead": 50, "rule_profile": "cis"})
+    with patch.object(charm.AuditdService, "configure_profile") as mock_configure_profile:
+        ctx.run(
+            ctx.on.action("benchmark-rules", params={"iterations": 2000, "apply": True}), state
+        )
+    mock_benchmark.assert_called_once_with(2000, "cis")
+    mock_update_rules.assert_called_once()
+    mock_configure_profile.assert_called_once_with("cis")
+    assert ctx.action_results["applied"] is True
+    assert ctx.action_results["proposed"]["open"]["p50-percent"] == "20.0"
+
+
+@patch.object(charm.AuditdService, "update_rules")
+@patch.object(
+    charm.AuditdService,
+    "benchmark_rules",
+    return_value=({}, {"open": SyscallOverhead(p50=1.0, p99=2.0, percent=20.0)}),
+)
+def test_benchmark_rules_action_no_apply(mock_benchmark, mock_update_rules):
+    ctx = testing.Context(AuditdOperatorCharm)
+    ctx.run(
+        ctx.on.action("benchmark-rules", params={"iterations": 2000, "apply": False}),
+        testing.State(),
+    )
+    mock_update_rules.assert_not_called()
+    assert ctx.action_results["applied"] is False
+
+
+@patch.object(charm.AuditdService, "update_rules")
+@patch.object(
+    charm.AuditdService,
+    "benchmark_rules",
+    return_value=({}, {"open": SyscallOverhead(p50=1.0, p99=2.0, percent=20.0)}),
+)
+def test_benchmark_rules_action_over_budget(mock_benchmark, mock_update_rules):
+    ctx = testing.Context(AuditdOperatorCharm)
+    state = testing.State(config={"max_rule_overhead": 10})
+    with pytest.raises(testing.ActionFailed) as e:
+        ctx.run(
+            ctx.on.action("benchmark-rules", params={"iterations": 2000, "apply": True}), state
+        )
+    assert "open" in e.value.message
+    mock_update_rules.assert_not_called()
+
+
+@patch.object(
+    charm.AuditdService, "benchmark_rules", side_effect=charm.AuditRuleReloadError("fail")
+)
+def test_benchmark_rules_action_reload_error(_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    with pytest.raises(testing.ActionFailed):
+        ctx.run(
+            ctx.on.action("benchmark-rules", params={"iterations": 2000, "apply": False}),
+            testing.State(),
+        )
+
+
+def test_benchmark_rules_action_invalid_config():
+    ctx = testing.Context(AuditdOperatorCharm)
+    state = testing.State(config={"max_rule_overhead": -1})
+    with pytest.raises(testing.ActionFailed):
+        ctx.run(
+            ctx.on.action("benchmark-rules", params={"iterations": 2000, "apply": False}), state
+        )
+
+
+@patch("charm.tracing.status_detail", return_value="Slow hook: 14.0s, mostly augenrules (12.0s)")
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd", return_value=True)
+def test_configure_charm_reports_slow_hook(_, __):
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.config_changed(), testing.State())
+    assert out.unit_status == testing.ActiveStatus("Slow hook: 14.0s, mostly augenrules (12.0s)")
+
+
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd", return_value=True)
+def test_configure_charm_exports_health(_, mock_host):
+    mock_ensure, mock_health, mock_write_metrics = mock_host
+    mock_health.return_value = AuditdHealth("active", 1, 2, kernel={"lost": 5})
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.update_status(), testing.State())
+    mock_ensure.assert_called_once()
+    mock_write_metrics.assert_called_once_with("auditd", mock_health.return_value.metrics())
+    assert out.unit_status == testing.ActiveStatus("5 audit events lost, auditd restarted 2 times")
+
+
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd", return_value=True)
+def test_configure_charm_health_unavailable(_, mock_host):
+    mock_ensure, mock_health, mock_write_metrics = mock_host
+    mock_ensure.side_effect = charm.systemd.SystemdError("fail")
+    mock_health.side_effect = charm.ServiceControlError("fail")
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.update_status(), testing.State())
+    mock_write_metrics.assert_not_called()
+    assert out.unit_status == testing.ActiveStatus()
+
+
+@patch.object(charm.AuditdService, "render_config", return_value="same")
+@patch("charm.read_file", return_value="same")
+@patch.object(charm.AuditdService, "state", side_effect=charm.ServiceControlError("timed out"))
+@patch.object(charm.AuditdService, "apply_changes")
+def test_configure_auditd_state_unavailable(mock_apply, *_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.update_status(), testing.State())
+    mock_apply.assert_not_called()
+    assert out.unit_status == testing.BlockedStatus(
+        "Failed to query the auditd service: timed out"
+    )
+
+
+@patch.object(charm.AuditdService, "render_config", return_value="same")
+@patch("charm.read_file", return_value="same")
+@patch.object(charm.AuditdService, "is_active", return_value=True)
+@patch.object(charm.AuditdService, "rules_in_sync", return_value=False)
+@patch.object(charm.AuditdService, "_merge_audit_rules")
+@patch.object(charm.AuditdService, "restart")
+def test_configure_auditd_reloads_drifted_rules(mock_restart, mock_merge, *_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.update_status(), testing.State())
+    mock_merge.assert_called_once()
+    mock_restart.assert_not_called()
+    assert out.unit_status == testing.ActiveStatus()
+
+
+@patch.object(charm.AuditdService, "render_config", return_value="same")
+@patch("charm.read_file", return_value="same")
+@patch.object(charm.AuditdService, "is_active", return_value=True)
+@patch.object(charm.AuditdService, "_merge_audit_rules")
+def test_configure_auditd_rules_in_sync(mock_merge, *_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    ctx.run(ctx.on.update_status(), testing.State())
+    mock_merge.assert_not_called()
+
+
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd", return_value=True)
+def test_configure_charm_aggregator_opens_port(_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.config_changed(), testing.State(config={"tcp_listen_port": 60}))
+    assert out.opened_ports == {testing.TCPPort(60)}
+
+    out = ctx.run(ctx.on.config_changed(), testing.State(opened_ports={testing.TCPPort(60)}))
+    assert out.opened_ports == frozenset()
+
+
+@pytest.mark.parametrize(
+    "config, ensured, removed",
+    [
+        ({}, 1, 2),
+        ({"drift_watcher": True}, 2, 1),
+        ({"netlink_forwarder": True}, 2, 1),
+        ({"drift_watcher": True, "netlink_forwarder": True}, 3, 0),
+    ],
+)
+@patch.object(charm.HelperService, "remove")
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd", return_value=True)
+def test_configure_charm_optional_services(_, mock_remove, mock_host, config, ensured, removed):
+    mock_ensure, _, _ = mock_host
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.config_changed(), testing.State(config=config))
+    assert mock_ensure.call_count == ensured
+    assert mock_remove.call_count == removed
+    assert out.unit_status == testing.ActiveStatus()
+
+
+@patch.object(charm.RotationTimer, "remove")
+@patch.object(charm.RotationTimer, "ensure")
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd", return_value=True)
+def test_configure_charm_rotation_timer(_, mock_ensure, mock_remove):
+    ctx = testing.Context(AuditdOperatorCharm)
+    ctx.run(ctx.on.config_changed(), testing.State(config={"rotate_schedule": "daily"}))
+    mock_ensure.assert_called_once_with("daily")
+    mock_remove.assert_not_called()
+
+    ctx.run(ctx.on.config_changed(), testing.State())
+    mock_remove.assert_called_once()
+
+
+@patch.object(charm.RotationTimer, "ensure", side_effect=charm.systemd.SystemdError("fail"))
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd", return_value=True)
+def test_configure_charm_rotation_timer_error(*_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.config_changed(), testing.State(config={"rotate_schedule": "daily"}))
+    assert out.unit_status == testing.ActiveStatus()
+
+
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd", return_value=True)
+def test_configure_charm_forwarder_filter(_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    config = {
+        "netlink_forwarder": True,
+        "forward_record_types": "EXECVE,USER_LOGIN",
+        "forward_keys": "exec",
+        "forward_dedup_window": 5,
+        "log_format": "RAW",
+    }
+    with ctx(ctx.on.config_changed(), testing.State(config=config)) as manager:
+        manager.run()
+        assert "--log-format" not in manager.charm.forwarder.args
+        assert manager.charm.forwarder.args[-8:] == [
+            "--record-type",
+            "EXECVE",
+            "--record-type",
+            "USER_LOGIN",
+            "--key",
+            "exec",
+            "--dedup-window",
+            "5",
+        ]
+
+
+def _journald_state(masked: bool, config: dict | None = None) -> testing.State:
+    stored = testing.StoredState(
+        owner_path="AuditdOperatorCharm",
+        content={"journald_audit_masked": masked, "journald_audit_volume": 3 * 2**20},
+    )
+    return testing.State(config=config or {}, stored_states={stored})
+
+
+@patch.object(charm.JournaldAuditSocket, "mask")
+@patch.object(charm.JournaldAuditSocket, "audit_volume", return_value=25 * 2**20)
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd", return_value=True)
+def test_configure_charm_masks_journald_audit(_, mock_volume, mock_mask):
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.config_changed(), _journald_state(False, {"mask_journald_audit": True}))
+    mock_mask.assert_called_once()
+    assert out.unit_status == testing.ActiveStatus("journald audit masked, saving 25.0 MiB/h")
+
+    out = ctx.run(ctx.on.update_status(), out)
+    mock_volume.assert_called_once()
+    assert out.unit_status == testing.ActiveStatus("journald audit masked, saving 25.0 MiB/h")
+
+
+@patch.object(charm.JournaldAuditSocket, "unmask")
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd", return_value=True)
+def test_configure_charm_restores_journald_audit(_, mock_unmask):
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.config_changed(), _journald_state(True))
+    mock_unmask.assert_called_once()
+    assert out.unit_status == testing.ActiveStatus()
+
+
+@patch.object(charm.JournaldAuditSocket, "mask", side_effect=charm.systemd.SystemdError("fail"))
+@patch.object(charm.JournaldAuditSocket, "audit_volume", return_value=0)
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd", return_value=True)
+def test_configure_charm_mask_journald_audit_error(*_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.config_changed(), _journald_state(False, {"mask_journald_audit": True}))
+    assert out.unit_status == testing.ActiveStatus()
+
+
+@pytest.mark.parametrize("masked", [True, False])
+@patch.object(charm.JournaldAuditSocket, "unmask")
+@patch("charm.AuditdService.remove")
+@patch("charm.get_machine_virt_type", return_value="kvm")
+def test_on_remove_restores_journald_audit(_, __, mock_unmask, masked):
+    ctx = testing.Context(AuditdOperatorCharm)
+    ctx.run(ctx.on.remove(), _journald_state(masked))
+    assert mock_unmask.called is masked
+
+
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd", return_value=True)
+@patch.object(charm.AuditdService, "update_rules")
+def test_on_drift_detected(mock_update_rules, mock_configure_auditd):
+    ctx = testing.Context(AuditdOperatorCharm)
+    with ctx(ctx.on.update_status(), testing.State()) as manager:
+        manager.charm.on.drift_detected.emit()
+        mock_update_rules.assert_called_once()
+        mock_configure_auditd.assert_called_once()
+        manager.run()
+    args = manager.charm.drift_watcher.args
+    assert args[args.index("--path") + 1] == "/etc/audit/auditd.conf"
+
+
+@patch.object(charm.AuditdOperatorCharm, "_configure_auditd")
+@patch.object(
+    charm.AuditdService,
+    "update_rules",
+    side_effect=charm.InvalidAuditRulesError(["a.rules:1: bad"]),
+)
+def test_on_drift_detected_invalid_rules(_, mock_configure_auditd):
+    ctx = testing.Context(AuditdOperatorCharm)
+    with ctx(ctx.on.update_status(), testing.State()) as manager:
+        manager.charm.on.drift_detected.emit()
+        mock_configure_auditd.assert_not_called()
+        assert manager.charm.unit.status == ops.BlockedStatus("Invalid audit rule a.rules:1: bad")
+
+
+@patch.object(charm.AuditdService, "render_config", return_value="new")
+@patch("charm.read_file", return_value="old")
+@patch("workloads.write_file")
+@patch("workloads.update_file", return_value=True)
+@patch("workloads.systemd.daemon_reload")
+@patch.object(charm.AuditdService, "is_active")
+@patch.object(charm.AuditdService, "restart")
+def test_configure_auditd_single_restart(mock_restart, mock_is_active, mock_daemon_reload, *_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.config_changed(), testing.State(config={"cpu_weight": 50}))
+    mock_daemon_reload.assert_called_once()
+    mock_restart.assert_called_once()
+    mock_is_active.assert_not_called()
+    assert out.unit_status == testing.ActiveStatus()
+
+
+@patch.object(charm.AuditdService, "is_active", return_value=True)
+def test_configure_auditd_rule_profile(*_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    with patch("charm.read_file", return_value=""), patch.object(charm.AuditdService, "configure"):
+        state = testing.State(config={"rule_profile": "cis", "max_rule_overhead": 10})
+        with ctx(ctx.on.config_changed(), state) as manager:
+            out = manager.run()
+            manager.charm.auditd.configure_profile.assert_called_once_with("cis")
+    assert out.unit_status == testing.ActiveStatus()
+
+
+@patch.object(charm.AuditdService, "configure")
+def test_configure_auditd_rule_profile_over_budget(mock_configure):
+    ctx = testing.Context(AuditdOperatorCharm)
+    state = testing.State(config={"rule_profile": "stig", "max_rule_overhead": 10})
+    out = ctx.run(ctx.on.config_changed(), state)
+    assert out.unit_status == testing.BlockedStatus(
+        "Rule profile 'stig' is estimated to exceed the 10% overhead budget for: execve."
+    )
+    mock_configure.assert_not_called()
+
+
+def test_list_rule_profiles_action():
+    ctx = testing.Context(AuditdOperatorCharm)
+    ctx.run(ctx.on.action("list-rule-profiles"), testing.State())
+    assert set(ctx.action_results) == {"cis", "stig", "pci-dss"}
+    assert ctx.action_results["cis"]["events-per-second"] == "5.0"
+    assert ctx.action_results["cis"]["overhead"]["execve"] == "8%"
+
+
+@patch("charm.read_file", return_value="old")
+@patch.object(charm.AuditdService, "restart")
+@patch("workloads.write_file")
+def test_configure_auditd_invalid_rules(mock_write_file, mock_restart, _):
+    ctx = testing.Context(AuditdOperatorCharm)
+    invalid = charm.InvalidAuditRulesError(["passwd.rules:2: unknown field 'uidd'"])
+    with patch.object(charm.AuditdService, "configure_profile", side_effect=invalid):
+        out = ctx.run(ctx.on.config_changed(), testing.State())
+    assert out.unit_status == testing.BlockedStatus(
+        "Invalid audit rule passwd.rules:2: unknown field 'uidd'"
+    )
+    mock_restart.assert_not_called()
+    stored = out.get_stored_state("_stored", owner_path="AuditdOperatorCharm")
+    assert stored.content["pending_restart"] is True
+
+    # The config file now matches, the restart is retried once the rules are fixed.
+    rendered = charm.AuditdService().render_config(charm.AuditdConfig().model_dump())
+    with patch("charm.read_file", return_value=rendered):
+        out = ctx.run(ctx.on.config_changed(), out)
+    mock_restart.assert_called_once()
+    stored = out.get_stored_state("_stored", owner_path="AuditdOperatorCharm")
+    assert stored.content["pending_restart"] is False
+
+
+@patch.object(charm.AuditdService, "is_active", return_value=True)
+@patch.object(charm.AuditdService, "restart")
+@patch("workloads.systemd.daemon_reload")
+def test_configure_auditd_deferred_daemon_reload(mock_daemon_reload, mock_restart, _):
+    ctx = testing.Context(AuditdOperatorCharm)
+    stored = testing.StoredState(
+        owner_path="AuditdOperatorCharm", content={"pending_daemon_reload": True}
+    )
+    rendered = charm.AuditdService().render_config(charm.AuditdConfig().model_dump())
+    with (
+        patch("charm.read_file", return_value=rendered),
+        patch.object(charm.AuditdService, "configure_resources", return_value=False),
+    ):
+        out = ctx.run(ctx.on.update_status(), testing.State(stored_states={stored}))
+    mock_daemon_reload.assert_called_once()
+    mock_restart.assert_not_called()
+    stored = out.get_stored_state("_stored", owner_path="AuditdOperatorCharm")
+    assert stored.content["pending_daemon_reload"] is False
+
+
+@patch.object(charm.AuditdOperatorCharm, "_get_debs_resource", return_value=None)
+@patch.object(charm.AuditdService, "_merge_audit_rules")
+@patch.object(
+    charm.AuditdService, "install", side_effect=charm.InvalidAuditRulesError(["a.rules:1: bad"])
+)
+@patch("charm.get_machine_virt_type", return_value="kvm")
+def test_on_install_invalid_rules(mock_virt, mock_install, mock_merge, _):
+    ctx = testing.Context(AuditdOperatorCharm)
+    out = ctx.run(ctx.on.install(), testing.State())
+    mock_merge.assert_not_called()
+    assert out.unit_status == testing.BlockedStatus("Invalid audit rule a.rules:1: bad")
+
+
+@patch.object(charm.AuditdService, "_merge_audit_rules")
+@patch.object(
+    charm.AuditdService,
+    "_add_audit_rules",
+    side_effect=charm.InvalidAuditRulesError(["a.rules:1: bad"]),
+)
+@patch.object(charm.AuditdService, "benchmark_rules", return_value=({}, {}))
+def test_benchmark_rules_action_apply_invalid_rules(mock_benchmark, mock_add_rules, mock_merge):
+    ctx = testing.Context(AuditdOperatorCharm)
+    with pytest.raises(testing.ActionFailed) as e:
+        ctx.run(
+            ctx.on.action("benchmark-rules", params={"iterations": 2000, "apply": True}),
+            testing.State(),
+        )
+    assert e.value.message == "Invalid audit rule a.rules:1: bad"
+    mock_merge.assert_not_called()
+
+
+@patch.object(charm.AuditdService, "simulate_rules")
+def test_simulate_rules_action(mock_simulate):
+    mock_simulate.return_value = Simulation({"access": 2.5}, 3600, 7200, 72000)
+    ctx = testing.Context(AuditdOperatorCharm)
+    state = testing.State(config={"rule_profile": "cis"})
+    params = {"trace": "/var/log/audit/audit.log"}
+    ctx.run(ctx.on.action("simulate-rules", params=params), state)
+    assert mock_simulate.call_args.args[:2] == (charm.Path("/var/log/audit/audit.log"), "cis")
+    assert ctx.action_results["events-per-second"] == {"access": "2.50"}
+    assert ctx.action_results["hours-of-retention"] == "20.0"
+
+    ctx.run(ctx.on.action("simulate-rules", params={**params, "profile": ""}), state)
+    assert mock_simulate.call_args.args[1] == ""
+
+
+@pytest.mark.parametrize(
+    "config, params, side_effect",
+    [
+        ({"max_rule_overhead": -1}, {"trace": "/mix.jsonl"}, None),
+        ({}, {"trace": "/mix.jsonl", "profile": "hipaa"}, None),
+        ({}, {"trace": "/missing.log"}, FileNotFoundError("/missing.log")),
+        ({}, {"trace": "/mix.jsonl"}, ValueError("line 1: invalid synthetic syscall")),
+    ],
+)
+def test_simulate_rules_action_failed(config, params, side_effect):
+    ctx = testing.Context(AuditdOperatorCharm)
+    with (
+        patch.object(charm.AuditdService, "simulate_rules", side_effect=side_effect),
+        pytest.raises(testing.ActionFailed),
+    ):
+        ctx.run(ctx.on.action("simulate-rules", params=params), testing.State(config=config))
+
+
+@patch("forecast.logs_size", return_value=0)
+@patch("forecast.shutil.disk_usage")
+@patch.object(charm.AuditdService, "is_active", return_value=True)
+@patch("charm.read_file", return_value="")
+@patch.object(charm.AuditdService, "configure")
+def test_forecast_log_growth(mock_configure, mock_read_file, mock_active, mock_disk, _, mock_host):
+    _, _, mock_write_metrics = mock_host
+    mock_disk.return_value.free = 100 * 2**30
+    now = time.time()
+    samples = [[now - 7200, 0]] * charm.LOG_GROWTH_SAMPLES
+    stored = testing.StoredState(
+        owner_path="AuditdOperatorCharm",
+        content={"log_inode": 12, "log_size": 100, "log_growth": samples},
+    )
+    config = {"max_log_file": 8, "num_logs": 5, "min_retention_hours": 48}
+    ctx = testing.Context(AuditdOperatorCharm)
+    with patch("charm.measure_growth", return_value=(12, 10 * 2**20, 10 * 2**20)):
+        out = ctx.run(ctx.on.update_status(), testing.State(config=config, stored_states={stored}))
+    assert out.unit_status == testing.ActiveStatus("audit log retention below the 48h minimum")
+    stored = out.get_stored_state("_stored", owner_path="AuditdOperatorCharm")
+    assert len(stored.content["log_growth"]) == charm.LOG_GROWTH_SAMPLES
+    assert stored.content["log_growth"][-1][1] == 10 * 2**20
+    assert stored.content["log_size"] == 10 * 2**20
+    mock_write_metrics.assert_any_call(
+        "auditd_log",
+        {
+            "growth_bytes_per_second": pytest.approx(10 * 2**20 / 7200, abs=1),
+            "retention_seconds": pytest.approx(8 * 3600, rel=0.01),
+            "space_left_seconds": None,
+            "min_retention_seconds": 48 * 3600,
+        },
+    )
+
+
+@patch.object(charm.AuditdService, "is_active", return_value=True)
+@patch("charm.read_file", return_value="")
+@patch.object(charm.AuditdService, "configure")
+def test_forecast_log_growth_first_sample(*_):
+    ctx = testing.Context(AuditdOperatorCharm)
+    with patch("charm.measure_growth", return_value=(12, 4096, 4096)):
+        out = ctx.run(ctx.on.update_status(), testing.State())
+    assert out.unit_status == testing.ActiveStatus()
+    stored = out.get_stored_state("_stored", owner_path="AuditdOperatorCharm")
+    assert [sample[1] for sample in stored.content["log_growth"]] == [0]
@@ -0,0 +1,51 @@
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+
+import exporter
+
+
+def test_collect(tmp_path):
+    (tmp_path / "b.prom").write_text("b 2\n", encoding="utf-8")
+    (tmp_path / "a.prom").write_text("a 1\n", encoding="utf-8")
+    (tmp_path / ".c.prom.tmp").write_text("c 3\n", encoding="utf-8")
+    assert exporter.collect(tmp_path) == b"a 1\nb 2\n"
+
+
+@patch("pathlib.Path.read_bytes", side_effect=FileNotFoundError)
+def test_collect_file_removed(_, tmp_path):
+    (tmp_path / "a.prom").write_text("a 1\n", encoding="utf-8")
+    assert exporter.collect(tmp_path) == b""
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "auditd.prom").write_text("auditd_up 1\n", encoding="utf-8")
+    httpd = exporter.http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), exporter.make_handler(tmp_path)
+    )
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def test_serve_metrics(server):
+    with urllib.request.urlopen(f"{server}/metrics") as response:
+        assert response.read() == b"auditd_up 1\n"
+
+
+def test_serve_not_found(server):
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(f"{server}/")
+    assert e.value.code == 404  # noqa: PLR2004
+
+
+@patch("exporter.http.server.ThreadingHTTPServer")
+def test_main(mock_server, tmp_path):
+    exporter.main(["--metrics-dir", str(tmp_path), "--port", "9842"])
+    assert mock_server.call_args.args[0] == ("127.0.0.1", 9842)
+    mock_server.return_value.serve_forever.assert_called_once()
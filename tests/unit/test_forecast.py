@@ -0,0 +1,96 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+import forecast
+
+MIB = 2**20
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "audit.log"
+    path.write_bytes(b"x" * 100)
+    return path
+
+
+def test_measure_growth(log_file):
+    inode = os.stat(log_file).st_ino
+    assert forecast.measure_growth(log_file, 0, 0) == (inode, 100, 100)
+    with log_file.open("ab") as f:
+        f.write(b"x" * 50)
+    assert forecast.measure_growth(log_file, inode, 100) == (inode, 150, 50)
+
+
+def test_measure_growth_rotated(log_file):
+    inode = os.stat(log_file).st_ino
+    log_file.rename(log_file.with_name("audit.log.1"))
+    log_file.write_bytes(b"x" * 30)
+    new_inode = os.stat(log_file).st_ino
+    assert forecast.measure_growth(log_file, inode, 60) == (new_inode, 30, 70)
+    assert forecast.measure_growth(log_file, 1, 60) == (new_inode, 30, 30)
+    log_file.with_name("audit.log.1").unlink()
+    assert forecast.measure_growth(log_file, inode, 60) == (new_inode, 30, 30)
+
+
+def test_measure_growth_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        forecast.measure_growth(tmp_path / "audit.log", 0, 0)
+
+
+def test_logs_size(log_file):
+    log_file.with_name("audit.log.1").write_bytes(b"x" * 20)
+    log_file.with_name("other.log").write_bytes(b"x" * 20)
+    assert forecast.logs_size(log_file) == 120  # noqa: PLR2004
+    with patch("forecast.Path.glob", return_value=[log_file.with_name("audit.log.2")]):
+        assert forecast.logs_size(log_file) == 0
+
+
+@pytest.mark.parametrize(
+    "samples, rate",
+    [
+        ([], None),
+        ([[10, 0]], None),
+        ([[10, 0], [10, 5]], None),
+        ([[10, 0], [20, 50], [30, 200]], 10),
+    ],
+)
+def test_growth_rate(samples, rate):
+    assert forecast.growth_rate(samples) == rate
+
+
+@pytest.mark.parametrize(
+    "rate, free, used, expected",
+    [
+        (0, 100 * MIB, 0, forecast.LogForecast(0, None, None)),
+        (MIB / 3600, 200 * MIB, 0, forecast.LogForecast(MIB / 3600, 40 * 3600, None)),
+        (MIB / 3600, 100 * MIB, 0, forecast.LogForecast(MIB / 3600, 40 * 3600, 25 * 3600)),
+        (MIB / 3600, 10 * MIB, 0, forecast.LogForecast(MIB / 3600, 40 * 3600, 0)),
+        (MIB / 3600, 100 * MIB, 20 * MIB, forecast.LogForecast(MIB / 3600, 40 * 3600, None)),
+    ],
+)
+def test_forecast(rate, free, used, expected, log_file):
+    config = {"max_log_file": 8, "num_logs": 5}
+    with (
+        patch("forecast.shutil.disk_usage") as mock_disk,
+        patch("forecast.logs_size", return_value=used),
+    ):
+        mock_disk.return_value.free = free
+        assert forecast.forecast(rate, log_file, config, space_left=75) == expected
+
+
+def test_log_forecast_status_detail():
+    result = forecast.LogForecast(10.0, 30 * 3600, 1800)
+    assert result.status_detail(0) == ""
+    assert result.status_detail(30) == ""
+    assert result.status_detail(48) == "audit log retention below the 48h minimum"
+    assert forecast.LogForecast(0, None, None).status_detail(24) == ""
+
+
+def test_log_forecast_metrics():
+    assert forecast.LogForecast(1.23456, 3600, None).metrics() == {
+        "growth_bytes_per_second": 1.235,
+        "retention_seconds": 3600,
+        "space_left_seconds": None,
+    }
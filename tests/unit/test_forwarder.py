@@ -0,0 +1,384 @@
+import errno
+import logging
+import struct
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import forwarder
+
+
+def _message(record_type: int, text: bytes) -> bytes:
+    header = struct.pack("=IHHII", 16 + len(text), record_type, 0, 0, 0)
+    padding = b"\0" * (-len(text) % 4)
+    return header + text + padding
+
+
+SYSCALL = b"audit(1700000000.123:42): arch=c000003e syscall=59 success=yes"
+EOE = b"audit(1700000000.123:42): "
+
+
+def test_parse_messages():
+    buffer = _message(1300, SYSCALL) + _message(1320, EOE) + b"\0\0"
+    assert forwarder.parse_messages(buffer) == [
+        forwarder.Record(1300, SYSCALL.decode()),
+        forwarder.Record(1320, "audit(1700000000.123:42): "),
+    ]
+
+
+def test_parse_messages_truncated():
+    assert forwarder.parse_messages(struct.pack("=IHHII", 0, 1300, 0, 0, 0)) == []
+
+
+def test_record_format():
+    assert forwarder.Record(1300, "audit(1:2): a=b").format() == "type=SYSCALL msg=audit(1:2): a=b"
+    assert forwarder.Record(9999, "x").format() == "type=UNKNOWN[9999] msg=x"
+
+
+@patch("forwarder.socket.socket")
+def test_open_socket(mock_socket):
+    sock = forwarder.open_socket(1024)
+    mock_socket.assert_called_once_with(
+        forwarder.socket.AF_NETLINK, forwarder.socket.SOCK_RAW, forwarder.NETLINK_AUDIT
+    )
+    sock.bind.assert_called_once_with((0, 1))
+
+
+def test_forwarder_handle(tmp_path):
+    output = logging.FileHandler(tmp_path / "audit.log")
+    fwd = forwarder.Forwarder(output, tmp_path / "metrics" / "forwarder.prom")
+    fwd.handle(_message(1300, SYSCALL) + _message(1320, EOE))
+    output.close()
+    assert (tmp_path / "audit.log").read_text() == (
+        f"type=SYSCALL msg={SYSCALL.decode()}\ntype=EOE msg=audit(1700000000.123:42): \n"
+    )
+    assert fwd.stats.records == 2  # noqa: PLR2004
+    assert fwd.stats.bytes == (tmp_path / "audit.log").stat().st_size
+    assert fwd.stats.types == {"SYSCALL": 1, "EOE": 1}
+
+    fwd.write_metrics()
+    metrics = (tmp_path / "metrics" / "forwarder.prom").read_text()
+    assert "auditd_forwarder_records_total 2\n" in metrics
+    assert 'auditd_forwarder_records_by_type_total{type="SYSCALL"} 1\n' in metrics
+    assert "auditd_forwarder_resolver_cache_misses_total" in metrics
+    assert not list((tmp_path / "metrics").glob(".*.tmp"))
+
+
+@patch("forwarder.time.monotonic", side_effect=[0, 1, 20, 20, 21])
+def test_forwarder_run(_, tmp_path):
+    fwd = forwarder.Forwarder(MagicMock(), tmp_path / "forwarder.prom")
+    sock = MagicMock()
+    sock.recv.side_effect = [
+        _message(1300, SYSCALL),
+        TimeoutError,
+        OSError(errno.ENOBUFS, "No buffer space available"),
+        OSError(errno.EBADF, "Bad file descriptor"),
+    ]
+    with pytest.raises(OSError, match="Bad file descriptor"):
+        fwd.run(sock, 15)
+    sock.settimeout.assert_called_once_with(15)
+    assert fwd.stats.records == 1
+    assert fwd.stats.overruns == 1
+    assert "auditd_forwarder_overruns_total 0\n" in (tmp_path / "forwarder.prom").read_text()
+
+
+@patch.object(forwarder.Forwarder, "run")
+@patch("forwarder.open_socket")
+def test_main(mock_open_socket, mock_run, tmp_path):
+    output = tmp_path / "audit-forward" / "audit.log"
+    forwarder.main(["--output", str(output), "--metrics-file", str(tmp_path / "f.prom")])
+    mock_open_socket.assert_called_once_with(8 * 1024 * 1024)
+    mock_run.assert_called_once_with(mock_open_socket.return_value, 15.0)
+    assert output.parent.is_dir()
+
+
+@patch.object(forwarder.Forwarder, "__init__", return_value=None)
+@patch.object(forwarder.Forwarder, "run")
+@patch("forwarder.open_socket")
+def test_main_raw(_, __, mock_init, tmp_path):
+    output = tmp_path / "audit.log"
+    forwarder.main(
+        ["--output", str(output), "--metrics-file", str(tmp_path / "f"), "--log-format", "RAW"]
+    )
+    assert mock_init.call_args.args[2] is False
+
+
+@pytest.mark.parametrize(
+    "text, keys",
+    [
+        ('audit(1.2:3): syscall=59 key="exec"', ("exec",)),
+        ("audit(1.2:3): syscall=59 key=(null)", ()),
+        ("audit(1.2:3): syscall=59 key=6964656E74697479017072697669", ("identity", "privi")),
+        ("audit(1.2:3): item=0 name=/etc/shadow", None),
+    ],
+)
+def test_record_keys(text, keys):
+    assert forwarder.record_keys(text) == keys
+
+
+def test_record_filter():
+    record_filter = forwarder.RecordFilter(frozenset({"EXECVE", "PATH"}), frozenset({"exec"}))
+    events = [
+        forwarder.Record(1300, 'audit(1.2:3): syscall=59 key="exec"'),
+        forwarder.Record(1309, "audit(1.2:3): argc=1 a0=ls"),
+        forwarder.Record(1300, 'audit(1.2:4): syscall=2 key="identity"'),
+        forwarder.Record(1302, "audit(1.2:4): item=0 name=/etc/shadow"),
+        forwarder.Record(1302, "audit(1.2:5): item=0 name=/etc/passwd"),
+        forwarder.Record(1100, "pid=1 msg='op=PAM'"),
+    ]
+    assert [record_filter.accepts(record) for record in events] == [
+        False,
+        True,
+        False,
+        False,
+        False,
+        False,
+    ]
+
+
+def test_record_filter_types_only():
+    record_filter = forwarder.RecordFilter(types=frozenset({"SYSCALL"}))
+    assert record_filter.accepts(forwarder.Record(1300, SYSCALL.decode()))
+    assert not record_filter.accepts(forwarder.Record(1327, "audit(1.2:3): proctitle=6C73"))
+    assert not record_filter.event_keys
+
+
+@patch("forwarder.EVENT_KEY_CACHE_SIZE", 2)
+def test_record_filter_event_keys_bounded():
+    record_filter = forwarder.RecordFilter(keys=frozenset({"exec"}))
+    for serial in range(3):
+        record_filter.accepts(forwarder.Record(1300, f'audit(1.2:{serial}): key="exec"'))
+    assert list(record_filter.event_keys) == ["1.2:1", "1.2:2"]
+    assert not record_filter.accepts(forwarder.Record(1302, "audit(1.2:0): item=0"))
+    assert record_filter.accepts(forwarder.Record(1302, "audit(1.2:2): item=0"))
+
+
+def test_forwarder_handle_filtered(tmp_path):
+    output = logging.FileHandler(tmp_path / "audit.log")
+    record_filter = forwarder.RecordFilter(types=frozenset({"SYSCALL"}))
+    fwd = forwarder.Forwarder(output, tmp_path / "forwarder.prom", record_filter=record_filter)
+    fwd.handle(_message(1300, SYSCALL) + _message(1320, EOE))
+    output.close()
+    assert (tmp_path / "audit.log").read_text() == f"type=SYSCALL msg={SYSCALL.decode()}\n"
+    assert fwd.stats.filtered == 1
+
+    fwd.write_metrics()
+    assert "auditd_forwarder_filtered_total 1\n" in (tmp_path / "forwarder.prom").read_text()
+
+
+@patch.object(forwarder.Forwarder, "__init__", return_value=None)
+@patch.object(forwarder.Forwarder, "run")
+@patch("forwarder.open_socket")
+def test_main_record_filter(_, __, mock_init, tmp_path):
+    args = ["--output", str(tmp_path / "audit.log"), "--metrics-file", str(tmp_path / "f")]
+    forwarder.main([*args, "--record-type", "EXECVE", "--key", "exec", "--key", "identity"])
+    assert mock_init.call_args.args[3] == forwarder.RecordFilter(
+        frozenset({"EXECVE"}), frozenset({"exec", "identity"})
+    )
+
+    forwarder.main(args)
+    assert mock_init.call_args.args[3] is None
+
+
+def _event(serial: int, timestamp: float = 1700000000.0, name: str = "/etc/shadow") -> list:
+    event = f"audit({timestamp:.3f}:{serial}): "
+    return [
+        forwarder.Record(1300, f'{event}syscall=257 exe="/usr/bin/cat" key="identity"'),
+        forwarder.Record(1302, f"{event}item=0 name={name} inode=42"),
+        forwarder.Record(1320, event),
+    ]
+
+
+def _feed(deduplicator: forwarder.Deduplicator, records: list) -> list:
+    return [output for record in records for output in deduplicator.feed(record)]
+
+
+def test_event_signature():
+    assert forwarder.event_signature(_event(1)) == (
+        '"/usr/bin/cat"',
+        "257",
+        '"identity"',
+        "/etc/shadow",
+    )
+    assert forwarder.event_signature(_event(2)) == forwarder.event_signature(_event(1))
+    assert forwarder.event_signature(_event(3, name="/etc/passwd")) != (
+        forwarder.event_signature(_event(1))
+    )
+
+
+def test_deduplicator():
+    deduplicator = forwarder.Deduplicator(window=5)
+    assert _feed(deduplicator, _event(1)) == _event(1)
+    assert _feed(deduplicator, _event(2, 1700000001.0)) == []
+    assert _feed(deduplicator, _event(3, 1700000002.0)) == []
+    assert _feed(deduplicator, _event(4, 1700000002.0, "/etc/passwd")) == _event(
+        4, 1700000002.0, "/etc/passwd"
+    )
+    assert deduplicator.collapsed == 2  # noqa: PLR2004
+
+    summary = forwarder.Record(
+        forwarder.AUDIT_DEDUP,
+        'audit(1700000000.000:1): repeats=2 last=1700000002.000:3 key="identity"',
+    )
+    assert _feed(deduplicator, _event(5, 1700000006.0)) == [summary, *_event(5, 1700000006.0)]
+    assert summary.format() == f"type=DEDUP msg={summary.text}"
+
+
+def test_deduplicator_passes_other_records():
+    deduplicator = forwarder.Deduplicator(window=5)
+    login = forwarder.Record(1112, "audit(1700000000.000:1): pid=1 res=success")
+    assert deduplicator.feed(login) == [login]
+    assert deduplicator.feed(forwarder.Record(1320, "no event id")) == [
+        forwarder.Record(1320, "no event id")
+    ]
+
+
+def test_deduplicator_lru():
+    deduplicator = forwarder.Deduplicator(window=5, size=2)
+    _feed(deduplicator, _event(1, name="/a"))
+    _feed(deduplicator, _event(2, name="/b"))
+    _feed(deduplicator, _event(3, name="/a"))
+    assert _feed(deduplicator, _event(4, name="/c")) == _event(4, name="/c")
+    assert [signature[-1] for signature in deduplicator.recent] == ["/a", "/c"]
+
+    assert _feed(deduplicator, _event(5, name="/c")) == []
+    assert _feed(deduplicator, _event(6, name="/d")) == [
+        forwarder.Record(
+            forwarder.AUDIT_DEDUP,
+            'audit(1700000000.000:1): repeats=1 last=1700000000.000:3 key="identity"',
+        ),
+        *_event(6, name="/d"),
+    ]
+    assert [signature[-1] for signature in deduplicator.recent] == ["/c", "/d"]
+
+
+@patch("forwarder.MAX_PENDING_EVENTS", 1)
+def test_deduplicator_pending_bounded():
+    deduplicator = forwarder.Deduplicator(window=5)
+    first, second = _event(1), _event(2)
+    assert deduplicator.feed(first[0]) == []
+    assert deduplicator.feed(second[0]) == [first[0]]
+    assert deduplicator.feed(first[1]) == [first[1]]
+
+
+def test_deduplicator_expire():
+    deduplicator = forwarder.Deduplicator(window=5)
+    _feed(deduplicator, [*_event(1), *_event(2, 1700000001.0)])
+    _feed(deduplicator, _event(3, 1700000003.0, "/etc/passwd")[:2])
+    assert deduplicator.expire(1700000004.0) == []
+
+    syscall, path, _ = _event(3, 1700000003.0, "/etc/passwd")
+    assert deduplicator.expire(1700000005.0) == [
+        syscall,
+        path,
+        forwarder.Record(
+            forwarder.AUDIT_DEDUP,
+            'audit(1700000000.000:1): repeats=1 last=1700000001.000:2 key="identity"',
+        ),
+    ]
+    assert not deduplicator.pending
+    assert not deduplicator.recent
+
+
+def test_repeats_summary_without_key():
+    repeats = forwarder.Repeats("1.2:3", 1.2, "", count=1, last_id="1.3:4")
+    assert repeats.summary() == [
+        forwarder.Record(forwarder.AUDIT_DEDUP, "audit(1.2:3): repeats=1 last=1.3:4")
+    ]
+    assert forwarder.Repeats("1.2:3", 1.2, "").summary() == []
+
+
+def test_record_filter_keeps_dedup_records():
+    record_filter = forwarder.RecordFilter(frozenset({"EXECVE"}), frozenset({"identity"}))
+    summary = forwarder.Record(forwarder.AUDIT_DEDUP, 'audit(1.2:3): repeats=1 key="identity"')
+    assert record_filter.accepts(summary)
+
+
+def test_forwarder_handle_deduplicated(tmp_path):
+    output = logging.FileHandler(tmp_path / "audit.log")
+    fwd = forwarder.Forwarder(
+        output, tmp_path / "forwarder.prom", deduplicator=forwarder.Deduplicator(window=5)
+    )
+    buffer = b"".join(
+        _message(record.type, record.text.encode()) for record in [*_event(1), *_event(2)]
+    )
+    fwd.handle(buffer)
+    output.close()
+    assert fwd.stats.records == 3  # noqa: PLR2004
+    assert fwd.stats.deduplicated == 1
+
+    fwd.write_metrics()
+    assert "auditd_forwarder_deduplicated_total 1\n" in (tmp_path / "forwarder.prom").read_text()
+
+
+@patch("forwarder.time.monotonic", side_effect=[0, 20, 20, 21])
+def test_forwarder_run_expires_dedup(_, tmp_path):
+    deduplicator = forwarder.Deduplicator(window=5)
+    fwd = forwarder.Forwarder(MagicMock(), tmp_path / "forwarder.prom", deduplicator=deduplicator)
+    sock = MagicMock()
+    sock.recv.side_effect = [_message(1300, SYSCALL), OSError(errno.EBADF, "Bad file")]
+    with pytest.raises(OSError, match="Bad file"):
+        fwd.run(sock, 15)
+    assert fwd.stats.records == 1
+    assert not deduplicator.pending
+
+
+@patch.object(forwarder.Forwarder, "__init__", return_value=None)
+@patch.object(forwarder.Forwarder, "run")
+@patch("forwarder.open_socket")
+def test_main_dedup(_, __, mock_init, tmp_path):
+    args = ["--output", str(tmp_path / "audit.log"), "--metrics-file", str(tmp_path / "f")]
+    forwarder.main([*args, "--dedup-window", "2.5", "--dedup-cache-size", "16"])
+    deduplicator = mock_init.call_args.args[4]
+    assert (deduplicator.window, deduplicator.size) == (2.5, 16)
+
+    forwarder.main(args)
+    assert mock_init.call_args.args[4] is None
+
+
+@pytest.fixture
+def resolver_caches():
+    forwarder.resolve_user.cache_clear()
+    forwarder.resolve_group.cache_clear()
+    forwarder.syscall_table.cache_clear()
+    yield
+    forwarder.syscall_table.cache_clear()
+
+
+@patch("syscalls.subprocess.run")
+def test_enrich(mock_run, resolver_caches):
+    mock_run.return_value.stdout = "Using x86_64 syscall table:\n0\tread\n59\texecve\n"
+    text = (
+        "audit(1.2:3): arch=c000003e syscall=59 success=yes ppid=1 auid=4294967295 uid=0 "
+        'gid=0 euid=987654 comm="uid=1" key=(null)'
+    )
+    assert forwarder.enrich(text) == (
+        'ARCH=x86_64 SYSCALL=execve AUID="unset" UID="root" GID="root" EUID="unknown(987654)"'
+    )
+    assert forwarder.enrich("audit(1.2:4): arch=c000003e syscall=0 uid=0") == (
+        'ARCH=x86_64 SYSCALL=read UID="root"'
+    )
+    mock_run.assert_called_once_with(
+        ["ausyscall", "x86_64", "--dump"], check=True, capture_output=True, text=True
+    )
+    assert forwarder.resolver_cache_stats() == {"hits": 1, "misses": 4}
+
+
+def test_enrich_groups(resolver_caches):
+    assert forwarder.resolve_group("-1") == "unset"
+    assert forwarder.resolve_group("987654") == "unknown(987654)"
+    assert forwarder.enrich("audit(1.2:3): op=x") == ""
+
+
+@patch("syscalls.subprocess.run", side_effect=FileNotFoundError("ausyscall"))
+def test_enrich_without_syscall_table(_, resolver_caches):
+    assert forwarder.enrich("audit(1.2:3): arch=c00000b7 syscall=221") == "ARCH=aarch64"
+    assert forwarder.enrich("audit(1.2:3): arch=deadbeef syscall=221") == ""
+
+
+def test_record_format_enriched(resolver_caches):
+    record = forwarder.Record(1106, "audit(1.2:3): pid=1 uid=0 res=success")
+    assert record.format(enriched=True) == f'{record.format()}\x1dUID="root"'
+    assert forwarder.Record(1320, "audit(1.2:3): ").format(enriched=True) == (
+        "type=EOE msg=audit(1.2:3): "
+    )
@@ -0,0 +1,24 @@
+from unittest.mock import patch
+
+import metrics
+
+
+def test_render_metrics():
+    rendered = metrics.render_metrics(
+        {"up": 1, "memory_bytes": None, "lost": 2, "restarts_total": 3}, "auditd"
+    )
+    assert rendered == (
+        "# TYPE auditd_lost gauge\nauditd_lost 2\n"
+        "# TYPE auditd_restarts_total counter\nauditd_restarts_total 3\n"
+        "# TYPE auditd_up gauge\nauditd_up 1\n"
+    )
+
+
+@patch("metrics.time.time", return_value=1700000000.5)
+def test_write_metrics(_, tmp_path):
+    metrics.write_metrics("auditd", {"up": 1}, tmp_path / "metrics")
+    assert (tmp_path / "metrics" / "auditd.prom").read_text(encoding="utf-8") == (
+        "# TYPE auditd_timestamp_seconds gauge\nauditd_timestamp_seconds 1700000000\n"
+        "# TYPE auditd_up gauge\nauditd_up 1\n"
+    )
+    assert not (tmp_path / "metrics" / ".auditd.prom.tmp").exists()
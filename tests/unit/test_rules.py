@@ -0,0 +1,247 @@
+from pathlib import Path
+
+import pytest
+
+import rules
+
+
+@pytest.mark.parametrize(
+    "written, listed",
+    [
+        ("-w /etc/passwd -p wa -k passwd", "-w /etc/passwd -p wa -k passwd"),
+        ("-w /etc/sudoers.d/ -p aw -k sudoers", "-w /etc/sudoers.d -p wa -F key=sudoers"),
+        ("-w /etc/hosts", "-w /etc/hosts -p rwxa"),
+        (
+            "-a always,exit -F arch=b64 -S adjtimex -S settimeofday -k time-change",
+            "-a always,exit -F arch=b64 -S settimeofday,adjtimex -F key=time-change",
+        ),
+        (
+            "-a exit,always -F arch=x86_64 -S open -F auid>=1000 -F auid!=4294967295 -k access",
+            "-a always,exit -F arch=b64 -S open -F auid>=1000 -F auid!=-1 -F key=access",
+        ),
+        (
+            "-a always,exit -F path=/usr/bin/sudo -F perm=x -F auid!=unset -k priv",
+            "-a always,exit -F path=/usr/bin/sudo -F perm=x -F auid!=-1 -F key=priv",
+        ),
+        (
+            "-a always,exit -F dir=/var/log/audit/ -F perm=aw -k logs",
+            "-a always,exit -F dir=/var/log/audit -F perm=wa -F key=logs",
+        ),
+        ("-A never,exclude -F msgtype=CWD", "-a never,exclude -F msgtype=CWD"),
+        ("-a always,exit -S all -C auid!=uid", "-a always,exit -S all -C auid!=uid"),
+        (
+            "-a always,exit -F path=/usr/bin/kmod -F perm=x -F auid>=1000 -F auid!=unset "
+            "-k kernel_modules",
+            "-a always,exit -S all -F path=/usr/bin/kmod -F perm=x -F auid>=1000 -F auid!=-1 "
+            "-F key=kernel_modules",
+        ),
+        (
+            "-a always,exit -F arch=b64 -S execve -C euid!=uid -F auid!=unset -k user_emulation",
+            "-a always,exit -F arch=b64 -S execve -C uid!=euid -F auid!=-1 -F key=user_emulation",
+        ),
+        (
+            "-a always,exit -F arch=b64 -S execve -C uid!=euid -F euid=0 -k execpriv",
+            "-a always,exit -F arch=b64 -S execve -C uid!=euid -F euid=0 -F key=execpriv",
+        ),
+        ("-a always,io_uring -F uid=0", "-a always,io_uring -S all -F uid=0"),
+    ],
+)
+def test_canonicalize_rule_matches_auditctl_output(written, listed):
+    assert rules.canonicalize_rule(written) == rules.canonicalize_rule(listed)
+
+
+@pytest.mark.parametrize(
+    "line", ["", "# comment", "-D", "-b 8192", "--backlog_wait_time 60000", "No rules", '-w "x']
+)
+def test_canonicalize_rule_ignores_non_rules(line):
+    assert rules.canonicalize_rule(line) is None
+
+
+def test_canonicalize_rule_keeps_differences():
+    assert rules.canonicalize_rule("-w /etc/passwd -p wa") != rules.canonicalize_rule(
+        "-w /etc/passwd -p w"
+    )
+    assert rules.canonicalize_rule("-a always,exit -F uid=0 -F weird -C odd -x y") == (
+        "-a always,exit -C odd -F uid=0 -F weird -x y -S all"
+    )
+    assert rules.canonicalize_rule("-a never,exclude -F msgtype=CWD") == (
+        "-a exclude,never -F msgtype=CWD"
+    )
+
+
+def test_canonicalize():
+    assert rules.canonicalize(["-w /b -p wa", "-D", "-w /a -p wa"]) == [
+        "-w /a -p wa",
+        "-w /b -p wa",
+    ]
+
+
+def test_read_rule_files(tmp_path):
+    (tmp_path / "20-b.rules").write_text("-w /b\n", encoding="utf-8")
+    (tmp_path / "10-a.rules").write_text("-D\n-w /a\n", encoding="utf-8")
+    (tmp_path / "a.rules.disabled").write_text("-w /c\n", encoding="utf-8")
+    assert rules.read_rule_files(tmp_path) == ["-D", "-w /a", "-w /b"]
+
+
+def test_rules_hash():
+    assert rules.rules_hash(["-w /a -p wa"]) == rules.rules_hash(["-w /a -p wa"])
+    assert rules.rules_hash(["-w /a -p wa"]) != rules.rules_hash(["-w /a -p w"])
+
+
+def test_diff_rules():
+    assert rules.diff_rules(["a", "b", "b"], ["b", "c"]) == (["a", "b"], ["c"])
+
+
+@pytest.mark.parametrize("name", ["cis", "stig", "pci-dss"])
+def test_profiles(name):
+    path = Path("src/audit_rules/profiles") / f"{name}.rules"
+    profile = rules.read_profile(path)
+    assert profile.name == name
+    assert profile.description
+    assert profile.events_per_second > 0
+    assert set(profile.overhead) == {"open", "stat", "execve"}
+    bundle = rules.canonicalize(path.read_text(encoding="utf-8").splitlines())
+    assert len(bundle) == len(set(bundle))
+
+
+def test_read_profile(tmp_path):
+    path = tmp_path / "custom.rules"
+    path.write_text(
+        "## profile: custom\n## events-per-second: 2.5\n## overhead: open=4 execve=30\n"
+        "## 1.2 Section title\n-w /etc/hosts -p wa -k hosts\n"
+    )
+    profile = rules.read_profile(path)
+    assert profile == rules.RuleProfile("custom", "", 2.5, {"open": 4, "execve": 30})
+    assert profile.exceeds_budget(10) == ["execve"]
+    assert profile.exceeds_budget(30) == []
+
+
+@pytest.mark.parametrize(
+    "line",
+    ["", "# comment", "-D", "-b 8192", "--backlog_wait_time 60000", "-e 1", "-f 1"],
+)
+def test_parse_rule_ignores_control_options(line):
+    assert rules.parse_rule(line) is None
+
+
+def test_parse_rule():
+    rule = rules.parse_rule(
+        "-a exit,always -F arch=b64 -S chmod,fchmod -S chown -F auid>=1000 -F auid!=unset "
+        "-C uid!=euid -F key=perm -k mod"
+    )
+    assert rule == rules.Rule(
+        filter="exit",
+        action="always",
+        arch="b64",
+        syscalls=["chmod", "fchmod", "chown"],
+        fields=[("arch", "=", "b64"), ("auid", ">=", "1000"), ("auid", "!=", "unset")],
+        comparisons=["uid!=euid"],
+        keys=["perm", "mod"],
+    )
+    watch = rules.parse_rule("-w /etc/sudoers.d/ -p aw -k sudoers")
+    assert watch == rules.Rule(
+        filter="watch", path="/etc/sudoers.d", permissions="wa", keys=["sudoers"]
+    )
+
+
+@pytest.mark.parametrize(
+    "value, number", [("0", 0), ("12", 12), ("0x41", 65), ("0100", 64), ("03", 3), ("-010", -8)]
+)
+def test_parse_number(value, number):
+    assert rules.parse_number(value) == number
+
+
+def test_parse_rule_octal_masks():
+    rule = rules.parse_rule("-a always,exit -F arch=b64 -S open -F a1&0100 -F a2&03 -k creat")
+    assert rule is not None
+    assert ("a1", "&", "0100") in rule.fields
+
+
+@pytest.mark.parametrize(
+    "line, error",
+    [
+        ('-w "/etc', "cannot be tokenized"),
+        ("-x 1", "unknown option '-x'"),
+        ("-w /etc/hosts -p", "option '-p' requires a value"),
+        ("-w etc/hosts", "watch path must be absolute, got 'etc/hosts'"),
+        ("-w /etc/hosts -p rq", "permissions must be a combination of 'rwxa'"),
+        ("-w /etc/hosts -S open", "option '-S' is not valid in a file watch"),
+        ("-a", "option '-a' requires a value"),
+        ("-a always,entry -S open", "'always,entry' must be a filter list and an action"),
+        ("-a always,never -S open", "'always,never' must be a filter list and an action"),
+        ("-a always,exclude -S open", "syscalls are not valid on the exclude list"),
+        ("-a always,exit -S open -F arch=b64", "the arch field must be set before the syscalls"),
+        ("-a always,exit -C uid<euid", "invalid field comparison 'uid<euid'"),
+        ("-a always,exit -F auid", "invalid field 'auid'"),
+        ("-a always,exit -F auid=", "invalid field 'auid='"),
+        ("-a always,exit -F uidd=0", "unknown field 'uidd'"),
+        ("-a always,user -F perm=x", "field 'perm' is only valid on the exit list"),
+        ("-a always,exit -F path>/etc", "field 'path' only supports the = and != operators"),
+        ("-a always,exit -F path=etc", "field 'path' must be an absolute path, got 'etc'"),
+        ("-a always,exit -F perm=q", "permissions must be a combination of 'rwxa'"),
+        ("-a always,exit -F arch=sparc", "unknown arch 'sparc'"),
+        ("-a always,exit -F filetype=pipe", "unknown file type 'pipe'"),
+        ("-a always,exit -F exit=-EACCESS", "exit must be a number or an errno name"),
+        ("-a always,exit -F auid>=1,000", "field 'auid' must be an id or a name, got '1,000'"),
+        ("-a always,exit -F a0=x", "field 'a0' must be a number, got 'x'"),
+        ("-a always,exit -F a1&08", "field 'a1' must be a number, got '08'"),
+        ("-a always,exit -k key -q 1", "unknown option '-q'"),
+    ],
+)
+def test_parse_rule_errors(line, error):
+    with pytest.raises(rules.RuleSyntaxError, match=error):
+        rules.parse_rule(line)
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "-a always,exit -F exit=-EPERM -F a2&=0x40 -F success=0",
+        "-a never,exclude -F msgtype=CWD",
+        "-a always,exit -F arch=x86_64 -S all -F uid=root",
+        "-A always,exit -F dir=/var/log/audit -F perm=wa -F filetype=dir",
+    ],
+)
+def test_parse_rule_valid(line):
+    assert rules.parse_rule(line) is not None
+
+
+def test_lint_rules():
+    sources = [
+        (
+            "a.rules",
+            [
+                "# watches",
+                "-w /etc/passwd -p wa -k identity",
+                "-a always,exit -F arch=b64 -S open -F exit=-EACCES -k access",
+                "-a always,exit -F arch=b64 -S notasyscall -k typo",
+                "-a always,exit -F arch=b32 -S notasyscall -k unchecked",
+                "-a always,exit -S 2,all -k native",
+            ],
+        ),
+        (
+            "b.rules",
+            [
+                "-w /etc/passwd/ -p aw -k identity",
+                "-a never,exit -F arch=b64 -S open -F exit=-EACCES -k access",
+                "-a always,exit -F uidd=1",
+            ],
+        ),
+    ]
+    tables = {"b64": {"open"}, None: set()}
+    assert rules.lint_rules(sources, tables.get) == [
+        "a.rules:4: unknown syscall notasyscall for arch b64",
+        "b.rules:1: duplicate of a.rules:2",
+        "b.rules:2: 'never' conflicts with 'always' at a.rules:3",
+        "b.rules:3: unknown field 'uidd'",
+    ]
+
+
+def test_lint_bundled_rules_and_profiles():
+    bundled = [
+        (path.name, path.read_text(encoding="utf-8").splitlines())
+        for path in sorted(Path("src/audit_rules").glob("*.rules"))
+    ]
+    for profile in sorted(Path("src/audit_rules/profiles").glob("*.rules")):
+        sources = [*bundled, (profile.name, profile.read_text(encoding="utf-8").splitlines())]
+        assert rules.lint_rules(sources) == []
@@ -0,0 +1,238 @@
+from subprocess import CalledProcessError
+from unittest.mock import MagicMock, patch
+
+import pytest
+from jeepney import new_error, new_method_return, new_signal
+from jeepney.low_level import HeaderFields
+from jeepney.wrappers import DBusAddress
+
+import service_control
+from service_control import (
+    DBusController,
+    ServiceControlError,
+    SystemctlController,
+    UnitState,
+)
+
+MANAGER = DBusAddress(
+    service_control.SYSTEMD_PATH, interface=service_control.SYSTEMD_MANAGER_INTERFACE
+)
+
+
+def test_unit_object_path():
+    assert service_control.unit_object_path("auditd.service") == (
+        "/org/freedesktop/systemd1/unit/auditd_2eservice"
+    )
+
+
+def test_unit_state_is_active():
+    assert UnitState("active", "running", 0).is_active is True
+    assert UnitState("activating", "auto-restart", 2).is_active is False
+
+
+@patch("service_control.subprocess.run")
+def test_systemctl_state(mock_run):
+    mock_run.return_value.stdout = "ActiveState=active\nSubState=running\nNRestarts=2\n"
+    assert SystemctlController().state("auditd.service") == UnitState("active", "running", 2)
+    mock_run.assert_called_once_with(
+        [
+            "systemctl",
+            "show",
+            "auditd.service",
+            "--property=ActiveState,SubState,NRestarts",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+
+@patch("service_control.subprocess.run", side_effect=CalledProcessError(1, "systemctl show"))
+def test_systemctl_properties_failure(_):
+    with pytest.raises(ServiceControlError):
+        SystemctlController().properties("auditd.service", ["ActiveState"])
+
+
+@pytest.mark.parametrize("verb", ["restart", "reload"])
+@patch("service_control.subprocess.run")
+def test_systemctl_jobs(mock_run, verb):
+    getattr(SystemctlController(), verb)("auditd.service")
+    mock_run.assert_called_once_with(
+        ["systemctl", verb, "auditd.service"], check=True, capture_output=True
+    )
+
+
+@patch("service_control.subprocess.run", side_effect=CalledProcessError(1, "systemctl restart"))
+def test_systemctl_job_failure(_):
+    with pytest.raises(ServiceControlError):
+        SystemctlController().restart("auditd.service")
+
+
+class FakeConnection:
+    def __init__(self, replies):
+        """Replay canned messages as a blocking jeepney connection."""
+        self.replies = list(replies)
+        self.sent = []
+        self.outgoing_serial = iter(range(1, 100))
+
+    def send(self, message, serial=None):
+        self.sent.append((serial, message))
+
+    def receive(self, timeout=None):
+        return self._next_reply()
+
+    def send_and_get_reply(self, message, timeout=None):
+        self.sent.append((None, message))
+        return self._next_reply()
+
+    def _next_reply(self):
+        if not self.replies:
+            raise TimeoutError
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def filter(self, rule, bufsize=1):
+        handle = MagicMock()
+        handle.__enter__.return_value = self.signals
+        return handle
+
+    def recv_until_filtered(self, queue, timeout=None):
+        if not queue:
+            raise TimeoutError
+        return queue.pop(0)
+
+
+def _reply(serial, signature, body):
+    call = MagicMock()
+    call.header.serial = serial
+    return new_method_return(call, signature, body)
+
+
+def test_dbus_properties():
+    unit_props = {"ActiveState": ("s", "active"), "SubState": ("s", "running")}
+    service_props = {"NRestarts": ("u", 1), "MainPID": ("u", 42)}
+    conn = FakeConnection(
+        [
+            new_signal(MANAGER, "UnitNew", "so", ("x.service", "/x")),
+            _reply(2, "a{sv}", (service_props,)),
+            _reply(1, "a{sv}", (unit_props,)),
+        ]
+    )
+    controller = DBusController(conn)
+    assert controller.state("auditd.service") == UnitState("active", "running", 1)
+    assert [message.body for _, message in conn.sent] == [
+        (service_control.SYSTEMD_UNIT_INTERFACE,),
+        (service_control.SYSTEMD_SERVICE_INTERFACE,),
+    ]
+
+
+def test_dbus_properties_error():
+    call = MagicMock()
+    call.header.serial = 1
+    conn = FakeConnection([new_error(call, "org.freedesktop.DBus.Error.Failed")])
+    with pytest.raises(ServiceControlError):
+        DBusController(conn).properties("auditd.service", ["ActiveState"])
+
+
+@pytest.mark.parametrize(
+    "error, message",
+    [(TimeoutError(), "Timed out"), (ConnectionResetError("reset"), "Lost the system bus")],
+)
+def test_dbus_properties_bus_error(error, message):
+    conn = FakeConnection([error])
+    with pytest.raises(ServiceControlError, match=message):
+        DBusController(conn).state("auditd.service")
+
+
+@pytest.mark.parametrize(
+    "replies, message",
+    [
+        ([], "Timed out"),
+        ([BrokenPipeError("broken")], "Lost the system bus"),
+        ([_reply(0, "", ()), ConnectionResetError("reset")], "Lost the system bus"),
+    ],
+)
+@patch("service_control.Proxy")
+def test_dbus_job_bus_error(_, replies, message):
+    conn = FakeConnection(replies)
+    conn.signals = []
+    with pytest.raises(ServiceControlError, match=message):
+        DBusController(conn).restart("auditd.service")
+
+
+@patch("service_control.Proxy")
+def test_dbus_job_add_match_bus_error(mock_proxy):
+    mock_proxy.return_value.AddMatch.side_effect = OSError("closed")
+    with pytest.raises(ServiceControlError, match="Lost the system bus"):
+        DBusController(FakeConnection([])).restart("auditd.service")
+
+
+@pytest.mark.parametrize(
+    ("verb", "method"), [("restart", "RestartUnit"), ("reload", "ReloadUnit")]
+)
+@patch("service_control.Proxy")
+def test_dbus_jobs(mock_proxy, verb, method):
+    conn = FakeConnection([_reply(0, "", ()), _reply(0, "o", ("/job/2",))])
+    conn.signals = [
+        new_signal(MANAGER, "JobRemoved", "uoss", (1, "/job/1", "other.service", "failed")),
+        new_signal(MANAGER, "JobRemoved", "uoss", (2, "/job/2", "auditd.service", "done")),
+    ]
+    controller = DBusController(conn)
+    getattr(controller, verb)("auditd.service")
+    mock_proxy.return_value.AddMatch.assert_called_once()
+    _, job_call = conn.sent[1]
+    assert job_call.header.fields[HeaderFields.member] == method
+
+
+@patch("service_control.Proxy")
+def test_dbus_job_subscribes_once(mock_proxy):
+    conn = FakeConnection([_reply(0, "", ()), _reply(0, "o", ("/job/1",))])
+    conn.signals = [new_signal(MANAGER, "JobRemoved", "uoss", (1, "/job/1", "a", "done"))]
+    controller = DBusController(conn)
+    controller.restart("auditd.service")
+    conn.replies = [_reply(0, "o", ("/job/2",))]
+    conn.signals = [new_signal(MANAGER, "JobRemoved", "uoss", (2, "/job/2", "a", "done"))]
+    controller.restart("auditd.service")
+    mock_proxy.return_value.AddMatch.assert_called_once()
+
+
+@patch("service_control.Proxy")
+def test_dbus_job_failed(_):
+    conn = FakeConnection([_reply(0, "", ()), _reply(0, "o", ("/job/1",))])
+    conn.signals = [new_signal(MANAGER, "JobRemoved", "uoss", (1, "/job/1", "a", "failed"))]
+    with pytest.raises(ServiceControlError, match="failed"):
+        DBusController(conn).restart("auditd.service")
+
+
+@patch("service_control.Proxy")
+def test_dbus_job_timeout(_):
+    conn = FakeConnection([_reply(0, "", ()), _reply(0, "o", ("/job/1",))])
+    conn.signals = []
+    with pytest.raises(ServiceControlError, match="Timed out"):
+        DBusController(conn).restart("auditd.service")
+
+
+@patch("service_control.Proxy")
+def test_dbus_job_rejected(_):
+    call = MagicMock()
+    call.header.serial = 0
+    conn = FakeConnection(
+        [_reply(0, "", ()), new_error(call, "org.freedesktop.DBus.Error.Failed")]
+    )
+    conn.signals = []
+    with pytest.raises(ServiceControlError):
+        DBusController(conn).restart("auditd.service")
+
+
+@patch("service_control.open_dbus_connection")
+def test_get_service_controller_dbus(mock_open):
+    controller = service_control.get_service_controller()
+    assert isinstance(controller, DBusController)
+    mock_open.assert_called_once_with(bus="SYSTEM")
+
+
+@patch("service_control.open_dbus_connection", side_effect=FileNotFoundError)
+def test_get_service_controller_fallback(_):
+    assert isinstance(service_control.get_service_controller(), SystemctlController)
@@ -0,0 +1,162 @@
+import pytest
+
+import simulator
+from rules import parse_rule
+
+AUDIT_LOG = [
+    "garbage",
+    "type=SYSCALL msg=audit(1700000000.000:10): arch=c000003e syscall=257 success=no exit=-13 "
+    'auid=1000 uid=1000 euid=1000 pid=12 exe="/usr/bin/cat" key="access"',
+    'type=CWD msg=audit(1700000000.000:10): cwd="/home/ubuntu"',
+    'type=PATH msg=audit(1700000000.000:10): item=0 name="/etc/shadow" inode=1',
+    "type=EOE msg=audit(1700000000.000:10): ",
+    "type=SYSCALL msg=audit(1700000001.000:11): arch=c000003e syscall=257 success=no exit=-13 "
+    'auid=1000 uid=1000 euid=1000 pid=13 exe="/usr/bin/cat" key="access"',
+    'type=PATH msg=audit(1700000001.000:11): item=0 name="/etc/shadow" inode=1',
+    "type=USER_LOGIN msg=audit(1700000005.000:12): pid=3 uid=0 auid=1000 msg='op=login'",
+    "type=SYSCALL msg=audit(1700000010.000:13): arch=40000003 syscall=11 success=yes exit=0 "
+    'auid=1000 uid=0 euid=0 exe="/usr/bin/sudo"\x1dARCH=i386 SYSCALL=execve AUID="ubuntu"',
+]
+
+
+def _rules(*lines):
+    return [parse_rule(line) for line in lines]
+
+
+def _event(syscall="openat", arch="x86_64", paths=(), **fields):
+    return simulator.TraceEvent(
+        "SYSCALL", arch=arch, syscall=syscall, fields=fields, paths=paths, count=1, size=100
+    )
+
+
+def test_read_audit_log():
+    trace = simulator.read_audit_log(AUDIT_LOG, {"x86_64": {"257": "openat"}}.get)
+    assert trace.duration == 10  # noqa: PLR2004
+    opens, login, sudo = trace.events
+    assert opens.syscall == "openat"
+    assert opens.count == 2  # noqa: PLR2004
+    assert opens.paths == ("/etc/shadow",)
+    assert opens.fields == {
+        "uid": "1000",
+        "auid": "1000",
+        "euid": "1000",
+        "success": "no",
+        "exit": "-13",
+        "exe": "/usr/bin/cat",
+    }
+    assert opens.size == sum(len(line) + 1 for line in AUDIT_LOG[1:4] + AUDIT_LOG[5:7])
+    assert login.type == "USER_LOGIN"
+    assert (sudo.arch, sudo.syscall) == ("i386", "execve")
+
+
+def test_read_audit_log_empty():
+    trace = simulator.read_audit_log([], lambda _: {})
+    assert trace == simulator.Trace(events=[], duration=1.0)
+
+
+def test_read_synthetic():
+    trace = simulator.read_synthetic(
+        [
+            '{"syscall": "openat", "rate": 10, "uid": 1000, "paths": ["/etc/shadow"]}',
+            "",
+            '{"syscall": "openat", "rate": 5, "uid": 1000, "paths": ["/etc/shadow"], "size": 100}',
+        ]
+    )
+    assert trace.duration == 1
+    assert trace.events == [
+        simulator.TraceEvent(
+            "SYSCALL", "x86_64", "openat", {"uid": "1000"}, ("/etc/shadow",), 15, 5620
+        )
+    ]
+
+
+@pytest.mark.parametrize(
+    "line", ["{", "[]", '{"syscall": "open"}', '{"syscall": "x", "rate": "y"}']
+)
+def test_read_synthetic_invalid(line):
+    with pytest.raises(ValueError, match="line 1: invalid synthetic syscall"):
+        simulator.read_synthetic([line])
+
+
+@pytest.mark.parametrize(
+    "rule, event, matched",
+    [
+        ("-w /etc/shadow -p wa", _event(paths=("/etc/shadow",)), True),
+        ("-w /etc/sudoers.d -p wa", _event(paths=("/etc/sudoers.d/admins",)), True),
+        ("-w /etc/shadow -p wa", _event(paths=("/etc/shadow-",)), False),
+        ("-w /usr/bin/sudo -p x", _event(paths=("/usr/bin/sudo",)), False),
+        ("-w /usr/bin/sudo -p x", _event("execve", paths=("/usr/bin/sudo",)), True),
+        ("-w /etc/shadow -p wa", _event("execve", paths=("/etc/shadow",)), False),
+        ("-a always,exit -S open,openat", _event(), True),
+        ("-a always,exit -S all", _event("read"), True),
+        ("-a always,exit -S open", _event("257"), True),
+        ("-a always,exit -S open", _event("read"), False),
+        ("-a always,exit -F arch=b64 -S openat", _event(), True),
+        ("-a always,exit -F arch=b32 -S openat", _event(), False),
+        ("-a always,exit -F arch!=b32 -S openat", _event(), True),
+        ("-a always,exit -F arch=i386 -S openat", _event(arch="i386"), True),
+        ("-a always,exit -F arch=b64 -S openat", _event(arch=""), True),
+        ("-a always,exit -F auid>=1000 -F auid!=unset", _event(auid="1000"), True),
+        ("-a always,exit -F auid>=1000 -F auid!=unset", _event(auid="4294967295"), False),
+        ("-a always,exit -F auid>=1000", _event(auid="unset"), True),
+        ("-a always,exit -F auid>=1000", _event(), True),
+        ("-a always,exit -F uid=root", _event(uid="root"), True),
+        ("-a always,exit -F uid>=root", _event(uid="0"), True),
+        ("-a always,exit -F exit=-EACCES", _event(exit="-13"), True),
+        ("-a always,exit -F exit=-EACCES", _event(exit="-1"), False),
+        ("-a always,exit -F success=0", _event(success="no"), True),
+        ("-a always,exit -F success=1", _event(success="no"), False),
+        ("-a always,exit -F a2&0x40", _event(a2="64"), True),
+        ("-a always,exit -F a2=10", _event(a2="010"), True),
+        ("-a always,exit -F a2&0100", _event(a2="64"), True),
+        ("-a always,exit -F a2&=0x41", _event(a2="64"), False),
+        ("-a always,exit -F exe=/usr/bin/cat", _event(exe="/usr/bin/cat"), True),
+        ("-a always,exit -F path=/etc/shadow -F perm=wa", _event(paths=("/etc/shadow",)), True),
+        ("-a always,exit -F path=/etc/shadow", _event(paths=("/etc/passwd",)), False),
+        ("-a always,exit -F path!=/etc/shadow", _event(paths=("/etc/passwd",)), True),
+        ("-a always,exit -F dir=/var/log/audit", _event(paths=("/var/log/audit/a.log",)), True),
+        ("-a always,exit -F perm=x", _event(), False),
+        ("-a always,exit -C uid!=euid", _event(uid="1000", euid="0"), True),
+        ("-a always,exit -C uid!=euid", _event(uid="0", euid="0"), False),
+        ("-a always,exit -C uid=euid", _event(uid="0", euid="0"), True),
+        ("-a always,exit -C uid!=euid", _event(uid="0"), True),
+    ],
+)
+def test_rule_matches(rule, event, matched):
+    assert simulator.rule_matches(parse_rule(rule), event) is matched
+
+
+def test_simulate():
+    trace = simulator.read_audit_log(AUDIT_LOG, {"x86_64": {"257": "openat"}}.get)
+    rules = _rules(
+        "-a never,exclude -F msgtype=CWD",
+        "-a never,exit -F arch=b64 -S openat -F exe=/usr/bin/cat",
+        "-w /etc/shadow -p wa -k shadow",
+        "-a always,exit -F arch=b32 -S execve",
+    )
+    simulation = simulator.simulate(rules, trace, max_log_file=1, num_logs=0)
+    assert simulation.events_per_second == {"user-space": 0.1, "": 0.1}
+    size = len(AUDIT_LOG[7]) + len(AUDIT_LOG[8]) + 2
+    assert simulation.bytes_per_hour == pytest.approx(size / 10 * 3600)
+    assert simulation.seconds_to_rotation == pytest.approx(1024 * 1024 / (size / 10))
+    assert simulation.seconds_of_retention == simulation.seconds_to_rotation
+
+
+def test_simulate_excluded_and_unmatched():
+    trace = simulator.read_audit_log(AUDIT_LOG, lambda _: {})
+    rules = _rules("-a never,exclude -F msgtype=USER_LOGIN", "-a never,exclude -F uid=0")
+    simulation = simulator.simulate(rules, trace, max_log_file=8, num_logs=5)
+    assert simulation == simulator.Simulation({}, 0.0, None, None)
+
+
+def test_format_simulation():
+    simulation = simulator.Simulation(
+        {"MAC-policy": 0.5, "perm_mod": 1.25, "": 2}, 2 * 1024 * 1024, 7200, None
+    )
+    assert simulator.format_simulation(simulation) == {
+        "events-per-second": {"mac-policy": "0.50", "perm-mod": "1.25", "no-key": "2.00"},
+        "total-events-per-second": "3.75",
+        "log-mib-per-hour": "2.00",
+        "hours-to-rotation": "2.0",
+        "hours-of-retention": "never",
+    }
@@ -0,0 +1,20 @@
+from unittest.mock import patch
+
+import syscalls
+
+
+@patch("syscalls.subprocess.run")
+def test_syscall_table(mock_run):
+    syscalls.syscall_table.cache_clear()
+    mock_run.return_value.stdout = "Using x86_64 syscall table:\n0\tread\n59\texecve\n"
+    assert syscalls.syscall_table("x86_64") == {"0": "read", "59": "execve"}
+    assert syscalls.syscall_table("x86_64") == {"0": "read", "59": "execve"}
+    mock_run.assert_called_once_with(
+        ["ausyscall", "x86_64", "--dump"], check=True, capture_output=True, text=True
+    )
+
+
+@patch("syscalls.subprocess.run", side_effect=FileNotFoundError("ausyscall"))
+def test_syscall_table_unavailable(_):
+    syscalls.syscall_table.cache_clear()
+    assert syscalls.syscall_table("aarch64") == {}
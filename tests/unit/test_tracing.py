@@ -0,0 +1,55 @@
+from unittest.mock import patch
+
+import pytest
+
+import tracing
+
+
+@pytest.fixture(autouse=True)
+def clean_timings():
+    tracing.reset()
+    yield
+    tracing.reset()
+
+
+@patch("tracing.time.monotonic", side_effect=[1.0, 3.5])
+def test_span_records_duration(_):
+    with tracing.span("augenrules", argv=["augenrules", "--load"]) as current:
+        assert current is not None
+    assert tracing.timings() == [("augenrules", 2.5)]
+
+
+@patch("tracing.time.monotonic", side_effect=[1.0, 2.0])
+def test_span_records_duration_on_error(_):
+    with pytest.raises(RuntimeError), tracing.span("write"):
+        raise RuntimeError("fail")
+    assert tracing.timings() == [("write", 1.0)]
+
+
+def test_summary_empty():
+    assert tracing.summary() == "no traced steps"
+
+
+@patch("tracing.time.monotonic", side_effect=[0.0, 1.0, 0.0, 3.0])
+def test_summary_sorted_by_duration(_):
+    with tracing.span("write"):
+        pass
+    with tracing.span("apt-get install"):
+        pass
+    assert tracing.summary() == "apt-get install 3.00s, write 1.00s (total 4.00s)"
+
+
+@patch("tracing.time.monotonic", side_effect=[0.0, 1.0])
+def test_status_detail_fast_hook(_):
+    with tracing.span("write"):
+        pass
+    assert tracing.status_detail() == ""
+
+
+@patch("tracing.time.monotonic", side_effect=[0.0, 2.0, 0.0, 12.0])
+def test_status_detail_slow_hook(_):
+    with tracing.span("write"):
+        pass
+    with tracing.span("apt-get install"):
+        pass
+    assert tracing.status_detail() == "Slow hook: 14.0s, mostly apt-get install (12.0s)"
@@ -1,3 +1,4 @@
+import os
 from subprocess import CalledProcessError
 from unittest.mock import MagicMock, patch
 
@@ -12,6 +13,25 @@ def test_read_file(tmp_path):
     assert utils.read_file(file) == "hello"
 
 
+def test_get_file_age(tmp_path):
+    file = tmp_path / "test.txt"
+    file.write_text("hello", encoding="utf-8")
+    age = 30
+    with patch("utils.time.time", return_value=file.stat().st_mtime + age):
+        assert utils.get_file_age(file) == age
+
+
+def test_get_file_age_missing(tmp_path):
+    assert utils.get_file_age(tmp_path / "missing") == float("inf")
+
+
+def test_backoff_delay():
+    assert utils.backoff_delay(0, 60, 600) == 0
+    assert utils.backoff_delay(1, 60, 600) == 60  # noqa: PLR2004
+    assert utils.backoff_delay(3, 60, 600) == 240  # noqa: PLR2004
+    assert utils.backoff_delay(10, 60, 600) == 600  # noqa: PLR2004
+
+
 @patch("utils.os.chmod")
 @patch("utils.pwd.getpwnam")
 @patch("utils.os.chown")
@@ -25,6 +45,55 @@ def test_write_file(mock_chown, mock_getpwnam, mock_chmod, tmp_path):
     mock_chown.assert_called_once()
 
 
+DPKG_STATUS = """\
+Package: adduser
+Status: install ok installed
+Version: 3.137ubuntu1
+
+Package: auditd
+Status: install ok installed
+Priority: optional
+Version: 1:3.1.2-2.1build1.1
+
+Package: libauparse0t64
+Status: deinstall ok config-files
+Version: 1:3.1.2-2.1build1.1
+
+"""
+
+
+@pytest.fixture
+def dpkg_status(tmp_path):
+    utils._dpkg_status_cache.clear()
+    status_file = tmp_path / "status"
+    status_file.write_text(DPKG_STATUS, encoding="utf-8")
+    yield status_file
+    utils._dpkg_status_cache.clear()
+
+
+def test_get_installed_version(dpkg_status):
+    assert utils.get_installed_version("auditd", dpkg_status) == "1:3.1.2-2.1build1.1"
+
+
+def test_get_installed_version_not_installed(dpkg_status):
+    assert utils.get_installed_version("libauparse0t64", dpkg_status) is None
+
+
+def test_get_installed_version_unknown_package(dpkg_status):
+    assert utils.get_installed_version("audispd-plugins", dpkg_status) is None
+
+
+def test_get_installed_version_cached_until_modified(dpkg_status):
+    assert utils.get_installed_version("auditd", dpkg_status) == "1:3.1.2-2.1build1.1"
+    with patch("pathlib.Path.open") as mock_open:
+        assert utils.get_installed_version("auditd", dpkg_status) == "1:3.1.2-2.1build1.1"
+        mock_open.assert_not_called()
+
+    dpkg_status.write_text(DPKG_STATUS.replace("1:3.1.2", "1:4.0"), encoding="utf-8")
+    os.utime(dpkg_status, (0, 0))
+    assert utils.get_installed_version("auditd", dpkg_status) == "1:4.0-2.1build1.1"
+
+
 @patch("utils.Environment")
 def test_render_jinja2_template(mock_env):
     mock_template = MagicMock()
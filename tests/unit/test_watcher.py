@@ -0,0 +1,124 @@
+import struct
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import watcher
+
+
+@pytest.fixture
+def inotify():
+    instance = watcher.Inotify()
+    yield instance
+    instance.close()
+
+
+def test_parse_events():
+    name = b"auditd.conf\0\0\0\0\0"
+    buffer = struct.pack("iIII", 1, watcher.IN_CLOSE_WRITE, 0, len(name)) + name
+    buffer += struct.pack("iIII", 2, watcher.IN_DELETE, 0, 0)
+    assert watcher.parse_events(buffer) == [
+        (1, watcher.IN_CLOSE_WRITE, "auditd.conf"),
+        (2, watcher.IN_DELETE, ""),
+    ]
+
+
+@patch("watcher.ctypes.get_errno", return_value=24)
+@patch("watcher.ctypes.CDLL")
+def test_inotify_init_error(mock_cdll, _):
+    mock_cdll.return_value.inotify_init1.return_value = -1
+    with pytest.raises(OSError, match="Too many open files"):
+        watcher.Inotify()
+
+
+def test_inotify_add_watch_error(inotify, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        inotify.add_watch(tmp_path / "missing")
+
+
+def test_inotify_read_timeout(inotify, tmp_path):
+    inotify.add_watch(tmp_path)
+    assert inotify.read(timeout=0) == []
+
+
+def test_drift_watcher(inotify, tmp_path):
+    config = tmp_path / "auditd.conf"
+    config.write_text("old", encoding="utf-8")
+    rules = tmp_path / "rules.d"
+    rules.mkdir()
+    drift_watcher = watcher.DriftWatcher(inotify, [config, rules])
+
+    (tmp_path / "other.conf").write_text("ignored", encoding="utf-8")
+    config.write_text("new", encoding="utf-8")
+    (rules / "audit.rules").write_text("-w /etc/passwd", encoding="utf-8")
+
+    assert drift_watcher.wait(debounce=0.01) == {config, rules / "audit.rules"}
+
+
+def test_drift_watcher_debounce(inotify, tmp_path):
+    rules = tmp_path / "rules.d"
+    rules.mkdir()
+    drift_watcher = watcher.DriftWatcher(inotify, [rules])
+    wd = inotify.add_watch(rules)
+    with patch.object(inotify, "read") as mock_read:
+        mock_read.side_effect = [
+            [],
+            [(wd, watcher.IN_CREATE, "a.rules")],
+            [(wd, watcher.IN_CREATE, "b.rules")],
+            [],
+        ]
+        assert drift_watcher.wait(debounce=2) == {rules / "a.rules", rules / "b.rules"}
+    assert mock_read.call_args.kwargs == {"timeout": 2}
+
+
+def test_drift_watcher_ignores_unrelated_changes(inotify, tmp_path):
+    config = tmp_path / "auditd.conf"
+    config.write_text("old", encoding="utf-8")
+    drift_watcher = watcher.DriftWatcher(inotify, [config])
+    assert drift_watcher.changed([(99, watcher.IN_MODIFY, "auditd.conf")]) == set()
+
+    (tmp_path / "other.conf").write_text("ignored", encoding="utf-8")
+    assert drift_watcher.changed(inotify.read(timeout=1)) == set()
+
+
+def test_drift_watcher_discard(inotify, tmp_path):
+    config = tmp_path / "auditd.conf"
+    drift_watcher = watcher.DriftWatcher(inotify, [config])
+    config.write_text("new", encoding="utf-8")
+    drift_watcher.discard()
+    assert inotify.read(timeout=0) == []
+
+
+@patch("watcher.subprocess.run")
+def test_dispatch(mock_run, tmp_path):
+    mock_run.return_value.returncode = 0
+    assert watcher.dispatch("auditd/0", tmp_path, "drift-detected") is True
+    mock_run.assert_called_once_with(
+        [
+            "/usr/bin/juju-exec",
+            "-u",
+            "auditd/0",
+            f"JUJU_DISPATCH_PATH=hooks/drift-detected {tmp_path}/dispatch",
+        ],
+        check=False,
+        capture_output=True,
+        text=True,
+    )
+
+
+@patch("watcher.subprocess.run")
+def test_dispatch_failed(mock_run, tmp_path):
+    mock_run.return_value = MagicMock(returncode=1, stderr="hook failed")
+    assert watcher.dispatch("auditd/0", tmp_path, "drift-detected") is False
+
+
+@patch("watcher.dispatch")
+@patch.object(watcher.DriftWatcher, "discard")
+@patch.object(watcher.DriftWatcher, "wait")
+@patch("watcher.Inotify")
+def test_main(mock_inotify, mock_wait, mock_discard, mock_dispatch, tmp_path):
+    mock_wait.side_effect = [{tmp_path / "auditd.conf"}, KeyboardInterrupt]
+    with pytest.raises(KeyboardInterrupt):
+        watcher.main(["--unit", "auditd/0", "--charm-dir", str(tmp_path), "--path", str(tmp_path)])
+    mock_dispatch.assert_called_once_with("auditd/0", tmp_path, "drift-detected")
+    mock_discard.assert_called_once()
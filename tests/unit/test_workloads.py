@@ -1,14 +1,27 @@
+import tarfile
+from pathlib import Path
 from subprocess import CalledProcessError
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
 import pytest
 from charms.operator_libs_linux.v0 import apt
-from charms.operator_libs_linux.v1 import systemd
 
+from service_control import ServiceControlError, UnitState
+from syscalls import syscall_table
 from workloads import (
     AuditdConfig,
+    AuditdHealth,
+    AuditdInstallError,
     AuditdService,
     AuditdServiceRestartError,
+    AuditRuleReloadError,
+    ChangePlan,
+    HelperService,
+    InvalidAuditRulesError,
+    JournaldAuditSocket,
+    RotationTimer,
+    _parse_version,
+    _syscall_names,
 )
 
 
@@ -30,15 +43,90 @@ def test_auditd_config_invalid_num_logs_high():
         AuditdConfig(num_logs=1000, max_log_file=512)
 
 
+def test_auditd_config_invalid_apt_cache_max_age():
+    with pytest.raises(ValueError):
+        AuditdConfig(apt_cache_max_age=-1)
+
+
+def test_auditd_config_invalid_max_rule_overhead():
+    with pytest.raises(ValueError):
+        AuditdConfig(max_rule_overhead=-1)
+
+
+@patch("workloads.get_file_age", return_value=0)
+@patch("workloads.AuditdService.installed_version", return_value=None)
 @patch("workloads.apt.add_package")
 @patch("workloads.AuditdService._add_audit_rules")
 @patch("workloads.AuditdService._merge_audit_rules")
-def test_install_calls_add_package_and_rules(mock_merge, mock_add_rules, mock_add_package):
+def test_install_calls_add_package_and_rules(
+    mock_merge, mock_add_rules, mock_add_package, mock_version, mock_age
+):
     service = AuditdService()
     service.install()
     mock_add_package.assert_called_once()
     mock_add_rules.assert_called_once()
-    mock_merge.assert_called_once()
+    mock_merge.assert_not_called()
+    assert service.plan.reload_rules is True
+
+
+@patch("workloads.get_file_age", return_value=48 * 3600)
+@patch("workloads.AuditdService.installed_version", return_value=None)
+@patch("workloads.apt.update")
+@patch("workloads.apt.add_package")
+@patch("workloads.AuditdService.update_rules")
+def test_install_updates_stale_cache(mock_rules, mock_add_package, mock_update, *_):
+    service = AuditdService()
+    service.install(cache_max_age=24)
+    mock_update.assert_called_once()
+    mock_add_package.assert_called_once_with(package_names=service.pkg)
+
+
+@patch("workloads.get_file_age", return_value=3600)
+@patch("workloads.AuditdService.installed_version", return_value=None)
+@patch("workloads.apt.update")
+@patch("workloads.apt.add_package")
+@patch("workloads.AuditdService.update_rules")
+def test_install_skips_update_with_fresh_cache(mock_rules, mock_add_package, mock_update, *_):
+    service = AuditdService()
+    service.install(cache_max_age=24)
+    mock_update.assert_not_called()
+    mock_add_package.assert_called_once_with(package_names=service.pkg)
+
+
+@pytest.mark.parametrize(
+    "version, upstream, epoch",
+    [("3.1.2-2", "3.1.2-2", ""), ("1:3.1.2-2", "3.1.2-2", "1"), ("2:1.0:rc1-1", "1.0:rc1-1", "2")],
+)
+def test_parse_version(version, upstream, epoch):
+    assert _parse_version(version) == apt.Version(upstream, epoch)
+    assert str(_parse_version(version)) == version
+
+
+@pytest.mark.parametrize("min_version", ["", "1:3.1.2", "3.0"])
+@patch("workloads.AuditdService.installed_version", return_value="1:3.1.2-2.1build1.1")
+@patch("workloads.apt.update")
+@patch("workloads.apt.add_package")
+@patch("workloads.AuditdService.update_rules")
+def test_install_skips_apt_when_installed(
+    mock_rules, mock_add_package, mock_update, _, min_version
+):
+    service = AuditdService()
+    service.install(min_version=min_version)
+    mock_update.assert_not_called()
+    mock_add_package.assert_not_called()
+    mock_rules.assert_called_once()
+
+
+@patch("workloads.get_file_age", return_value=48 * 3600)
+@patch("workloads.AuditdService.installed_version", return_value="1:3.1.2-2")
+@patch("workloads.apt.update")
+@patch("workloads.apt.DebianPackage.from_apt_cache")
+@patch("workloads.AuditdService.update_rules")
+def test_install_upgrades_below_min_version(mock_rules, mock_from_apt_cache, mock_update, *_):
+    service = AuditdService()
+    service.install(min_version="1:4.0")
+    mock_update.assert_called_once()
+    mock_from_apt_cache.return_value.ensure.assert_called_once_with(apt.PackageState.Latest)
 
 
 @patch("workloads.apt.remove_package")
@@ -48,15 +136,16 @@ def test_remove_calls_remove_package(mock_remove_package):
     mock_remove_package.assert_called_once()
 
 
-@patch("workloads.systemd.service_restart")
-def test_restart_success(mock_restart):
+@patch("workloads.get_service_controller")
+def test_restart_success(mock_get_controller):
     service = AuditdService()
     service.restart()
-    mock_restart.assert_called_once_with(service.name)
+    mock_get_controller.return_value.restart.assert_called_once_with(service.unit)
 
 
-@patch("workloads.systemd.service_restart", side_effect=systemd.SystemdError)
-def test_restart_failure(_):
+@patch("workloads.get_service_controller")
+def test_restart_failure(mock_get_controller):
+    mock_get_controller.return_value.restart.side_effect = ServiceControlError("fail")
     service = AuditdService()
     with pytest.raises(AuditdServiceRestartError):
         service.restart()
@@ -64,11 +153,55 @@ def test_restart_failure(_):
 
 @patch("workloads.write_file")
 @patch("workloads.AuditdService.restart")
-def test_configure_writes_file_and_restarts(mock_restart, mock_write_file):
+def test_configure_writes_file_and_schedules_restart(mock_restart, mock_write_file):
     service = AuditdService()
     service.configure("content")
     mock_write_file.assert_called_once()
+    mock_restart.assert_not_called()
+    assert service.plan.restart is True
+
+
+@patch("workloads.AuditdService.lint_rules", return_value=[])
+@patch("workloads.systemd.daemon_reload")
+@patch("workloads.AuditdService._merge_audit_rules")
+@patch("workloads.AuditdService.restart")
+def test_apply_changes_single_restart(mock_restart, mock_merge, mock_daemon_reload, _):
+    service = AuditdService()
+    service.plan.schedule_rule_reload("rules changed")
+    service.plan.schedule_restart("config changed")
+    service.plan.schedule_daemon_reload("drop-in changed")
+    service.plan.schedule_restart("drop-in changed")
+    plan = service.apply_changes()
+    assert plan.reasons == [
+        "rules changed",
+        "config changed",
+        "drop-in changed",
+        "drop-in changed",
+    ]
+    mock_daemon_reload.assert_called_once()
     mock_restart.assert_called_once()
+    mock_merge.assert_not_called()
+    assert not service.plan
+
+
+@patch("workloads.AuditdService.lint_rules", return_value=[])
+@patch("workloads.AuditdService._merge_audit_rules")
+@patch("workloads.AuditdService.restart")
+def test_apply_changes_rule_reload(mock_restart, mock_merge, _):
+    service = AuditdService()
+    service.plan.schedule_rule_reload("rules changed")
+    service.apply_changes()
+    mock_restart.assert_not_called()
+    mock_merge.assert_called_once()
+
+
+@patch("workloads.AuditdService._merge_audit_rules")
+@patch("workloads.AuditdService.restart")
+def test_apply_changes_nothing_pending(mock_restart, mock_merge):
+    service = AuditdService()
+    assert not service.apply_changes()
+    mock_restart.assert_not_called()
+    mock_merge.assert_not_called()
 
 
 @patch("workloads.render_jinja2_template", return_value="rendered")
@@ -77,54 +210,741 @@ def test_render_config_returns_rendered(mock_render):
     result = service.render_config({"foo": "bar"})
     assert result == "rendered"
     mock_render.assert_called_once()
+    assert mock_render.call_args.args[0] == {"foo": "bar", "max_restarts": 10, "space_left": 75}
 
 
-@patch("workloads.apt.DebianPackage.from_installed_package")
+@patch("workloads.get_installed_version", return_value="1:3.1.2-2")
 def test_is_installed_true(_):
     service = AuditdService()
     assert service.is_installed() is True
 
 
-@patch("workloads.apt.DebianPackage.from_installed_package", side_effect=apt.PackageNotFoundError)
+@patch("workloads.get_installed_version", return_value="1:3.1.2-2")
+def test_installed_version(mock_get_installed_version):
+    service = AuditdService()
+    assert service.installed_version() == "1:3.1.2-2"
+    mock_get_installed_version.assert_called_once_with(service.pkg)
+
+
+@patch("workloads.get_installed_version", return_value=None)
 def test_is_installed_false(_):
     service = AuditdService()
     assert service.is_installed() is False
 
 
-@patch("workloads.systemd.service_running", return_value=True)
-def test_is_active_true(_):
+@patch("workloads.get_service_controller")
+def test_is_active_true(mock_get_controller):
+    mock_get_controller.return_value.state.return_value = UnitState("active", "running", 0)
     service = AuditdService()
     assert service.is_active() is True
+    mock_get_controller.return_value.state.assert_called_once_with(service.unit)
+
+
+@patch("workloads.get_service_controller")
+def test_state(mock_get_controller):
+    mock_get_controller.return_value.state.return_value = UnitState("failed", "failed", 3)
+    service = AuditdService()
+    assert service.state() == UnitState("failed", "failed", 3)
 
 
-@patch("workloads.systemd.service_running", return_value=False)
-def test_is_active_false(_):
+@patch("workloads.get_service_controller")
+def test_is_active_false(mock_get_controller):
+    mock_get_controller.return_value.state.return_value = UnitState("failed", "failed", 3)
     service = AuditdService()
     assert service.is_active() is False
 
 
-@patch("workloads.read_file", return_value="rule-content")
-@patch("workloads.write_file")
-@patch("workloads.Path.glob", return_value=[MagicMock(name="rule1", spec=["name"])])
-def test_add_audit_rules(mock_glob, mock_write_file, mock_read_file):
-    service = AuditdService()
-    # Patch rule_file.name for the MagicMock
-    rule_file = mock_glob.return_value[0]
-    rule_file.name = "rule1"
-    service._add_audit_rules("/some/path")
-    mock_read_file.assert_called_once()
-    mock_write_file.assert_called_once()
+@patch("utils.os.chown")
+@patch("utils.pwd.getpwnam")
+def test_add_audit_rules(_, __, tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "passwd.rules").write_text("-w /etc/passwd -p wa -k passwd\n")
+    service = AuditdService()
+    service.rule_path = tmp_path / "rules.d"
+    assert service._add_audit_rules(str(source)) is True
+    assert (service.rule_path / "passwd.rules").read_text() == "-w /etc/passwd -p wa -k passwd\n"
+    assert service._add_audit_rules(str(source)) is False
+
+
+@patch("workloads.update_file")
+def test_add_audit_rules_invalid(mock_update_file, tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "passwd.rules").write_text("-w /etc/passwd -p wa -k passwd\n")
+    service = AuditdService()
+    service.rule_path = tmp_path / "rules.d"
+    service.rule_path.mkdir()
+    (service.rule_path / "local.rules").write_text("-w /etc/passwd -p wa -k passwd\n")
+    with pytest.raises(InvalidAuditRulesError) as e:
+        service._add_audit_rules(str(source))
+    assert str(e.value) == "Invalid audit rule passwd.rules:1: duplicate of local.rules:1"
+    mock_update_file.assert_not_called()
+
+
+@pytest.mark.parametrize("changed", [True, False])
+@patch("workloads.AuditdService._add_audit_rules")
+def test_update_rules_reloads_only_changed_rules(mock_add_rules, changed):
+    mock_add_rules.return_value = changed
+    service = AuditdService()
+    assert service.update_rules() is changed
+    assert service.plan.reload_rules is changed
 
 
 @patch("workloads.subprocess.run")
 def test_merge_audit_rules_success(mock_run):
     service = AuditdService()
     service._merge_audit_rules()
-    mock_run.assert_called_once_with(["augenrules", "--load"], check=False)
+    mock_run.assert_called_once_with(
+        ["augenrules", "--load"], check=True, capture_output=True, text=True
+    )
+
+
+@pytest.mark.parametrize(
+    "stderr, message",
+    [
+        (
+            "Error sending add rule data request (Invalid argument)\n"
+            "There was an error in line 5 of /etc/audit/audit.rules\n",
+            "Invalid audit rule augenrules: Error sending add rule data request "
+            "(Invalid argument) (and 1 more)",
+        ),
+        ("", "Invalid audit rule augenrules exited with 1"),
+    ],
+)
+@patch("workloads.subprocess.run")
+def test_merge_audit_rules_failure(mock_run, stderr, message):
+    mock_run.side_effect = CalledProcessError(1, "augenrules --load", stderr=stderr)
+    service = AuditdService()
+    with pytest.raises(InvalidAuditRulesError) as e:
+        service._merge_audit_rules()
+    assert str(e.value) == message
 
 
-@patch("workloads.subprocess.run", side_effect=CalledProcessError(1, "augenrules --load"))
-def test_merge_audit_rules_failure(_):
+@patch("workloads.compute_overhead", side_effect=["current", "proposed"])
+@patch("workloads.measure_latencies", side_effect=["loaded", "empty", "bundled"])
+@patch("workloads.AuditdService._merge_audit_rules")
+@patch("workloads.AuditdService._run_auditctl")
+def test_benchmark_rules(mock_auditctl, mock_merge, mock_measure, mock_overhead):
     service = AuditdService()
-    with pytest.raises(CalledProcessError):
-        service._merge_audit_rules()
+    assert service.benchmark_rules(100) == ("current", "proposed")
+    assert mock_auditctl.call_args_list[0].args == ("-D",)
+    assert mock_auditctl.call_args_list[1].args[0] == "-R"
+    mock_merge.assert_called_once()
+    mock_overhead.assert_any_call("empty", "loaded")
+    mock_overhead.assert_any_call("empty", "bundled")
+
+
+@patch("workloads.measure_latencies")
+@patch("workloads.AuditdService._merge_audit_rules")
+@patch("workloads.AuditdService._run_auditctl")
+def test_benchmark_rules_with_profile(mock_auditctl, mock_merge, _):
+    loaded = []
+    mock_auditctl.side_effect = lambda *args: loaded.extend(
+        Path(path).read_text() for path in args[1:]
+    )
+    service = AuditdService()
+    with patch("workloads.compute_overhead"):
+        service.benchmark_rules(100, "cis")
+    assert "-k user_emulation" in loaded[0]
+    assert "-k passwd" in loaded[0]
+
+
+@patch("workloads.measure_latencies")
+@patch("workloads.AuditdService._merge_audit_rules")
+@patch("workloads.AuditdService._run_auditctl", side_effect=AuditRuleReloadError("fail"))
+def test_benchmark_rules_restores_rules_on_error(mock_auditctl, mock_merge, _):
+    service = AuditdService()
+    with pytest.raises(AuditRuleReloadError):
+        service.benchmark_rules(100)
+    mock_merge.assert_called_once()
+
+
+@patch("workloads.AuditdService._run_auditctl", return_value="-w /etc/passwd -p wa -k passwd\n")
+def test_rules_in_sync(mock_auditctl, tmp_path):
+    (tmp_path / "passwd.rules").write_text("-w /etc/passwd -p aw -k passwd\n", encoding="utf-8")
+    (tmp_path / "audit.rules.bak").write_text("-w /etc/shadow -p wa\n", encoding="utf-8")
+    service = AuditdService()
+    service.rule_path = tmp_path
+    assert service.rules_in_sync() is True
+    mock_auditctl.assert_called_once_with("-l")
+
+
+@patch("workloads.AuditdService._run_auditctl", return_value="No rules\n")
+def test_rules_in_sync_drifted(_, tmp_path, caplog):
+    (tmp_path / "passwd.rules").write_text("-w /etc/passwd -p wa -k passwd\n", encoding="utf-8")
+    service = AuditdService()
+    service.rule_path = tmp_path
+    with caplog.at_level("DEBUG"):
+        assert service.rules_in_sync() is False
+    assert "Audit rule not loaded: -w /etc/passwd -p wa -F key=passwd" in caplog.text
+
+
+@patch("workloads.AuditdService._run_auditctl", return_value="-w /etc/shadow -p wa\n")
+def test_rules_in_sync_unexpected(_, tmp_path, caplog):
+    service = AuditdService()
+    service.rule_path = tmp_path
+    with caplog.at_level("DEBUG"):
+        assert service.rules_in_sync() is False
+    assert "Unexpected audit rule loaded: -w /etc/shadow -p wa" in caplog.text
+
+
+@patch("workloads.AuditdService._run_auditctl", side_effect=AuditRuleReloadError("fail"))
+def test_rules_in_sync_unavailable(_, tmp_path):
+    service = AuditdService()
+    service.rule_path = tmp_path
+    assert service.rules_in_sync() is True
+
+
+@patch("workloads.subprocess.run")
+def test_run_auditctl_success(mock_run):
+    mock_run.return_value.stdout = "No rules\n"
+    service = AuditdService()
+    assert service._run_auditctl("-l") == "No rules\n"
+    mock_run.assert_called_once_with(
+        ["auditctl", "-l"], check=True, capture_output=True, text=True
+    )
+
+
+@patch("workloads.subprocess.run", side_effect=CalledProcessError(1, "auditctl -D"))
+def test_run_auditctl_failure(_):
+    service = AuditdService()
+    with pytest.raises(AuditRuleReloadError):
+        service._run_auditctl("-D")
+
+
+@patch("workloads.AuditdService.installed_version", return_value=None)
+@patch("workloads.apt.add_package")
+@patch("workloads.AuditdService._install_local_debs")
+@patch("workloads.AuditdService.update_rules")
+def test_install_from_local_debs(mock_rules, mock_local_debs, mock_add_package, _, tmp_path):
+    service = AuditdService()
+    service.install(debs=tmp_path / "auditd.deb")
+    mock_local_debs.assert_called_once_with(tmp_path / "auditd.deb")
+    mock_add_package.assert_not_called()
+
+
+@patch("workloads.subprocess.run")
+def test_install_local_debs_archive(mock_run, tmp_path):
+    for name in ("auditd_3.1.2_amd64.deb", "libauparse0_3.1.2_amd64.deb", "README"):
+        (tmp_path / name).write_bytes(b"content")
+    archive = tmp_path / "auditd-debs.tar"
+    with tarfile.open(archive, "w") as tar:
+        for name in ("auditd_3.1.2_amd64.deb", "libauparse0_3.1.2_amd64.deb", "README"):
+            tar.add(tmp_path / name, arcname=f"debs/{name}")
+    service = AuditdService()
+    service._install_local_debs(archive)
+    cmd = mock_run.call_args.args[0]
+    assert cmd[:3] == ["dpkg", "-i", "--force-confold"]
+    assert [Path(deb).name for deb in cmd[3:]] == [
+        "auditd_3.1.2_amd64.deb",
+        "libauparse0_3.1.2_amd64.deb",
+    ]
+
+
+@patch("workloads.subprocess.run")
+def test_install_local_debs_single_deb(mock_run, tmp_path):
+    deb = tmp_path / "auditd.deb"
+    deb.write_bytes(b"content")
+    service = AuditdService()
+    service._install_local_debs(deb)
+    assert mock_run.call_args.args[0] == ["dpkg", "-i", "--force-confold", str(deb)]
+
+
+@patch("workloads.subprocess.run")
+def test_install_local_debs_empty_archive(mock_run, tmp_path):
+    archive = tmp_path / "auditd-debs.tar"
+    with tarfile.open(archive, "w"):
+        pass
+    service = AuditdService()
+    with pytest.raises(AuditdInstallError):
+        service._install_local_debs(archive)
+    mock_run.assert_not_called()
+
+
+@patch("workloads.subprocess.run", side_effect=CalledProcessError(1, "dpkg -i"))
+def test_install_local_debs_dpkg_failure(_, tmp_path):
+    deb = tmp_path / "auditd.deb"
+    deb.write_bytes(b"content")
+    service = AuditdService()
+    with pytest.raises(AuditdInstallError):
+        service._install_local_debs(deb)
+
+
+@patch("workloads.AuditdService._kernel_status", return_value={"lost": 3, "backlog": 0})
+@patch("workloads.get_service_controller")
+def test_health(mock_get_controller, _):
+    mock_get_controller.return_value.properties.return_value = {
+        "ActiveState": "active",
+        "MainPID": 42,
+        "NRestarts": 1,
+        "MemoryCurrent": 2**64 - 1,
+        "CPUUsageNSec": "1500000000",
+        "IOReadBytes": "[not set]",
+        "IOWriteBytes": 4096,
+    }
+    service = AuditdService()
+    health = service.health()
+    assert health == AuditdHealth(
+        active_state="active",
+        main_pid=42,
+        n_restarts=1,
+        memory_bytes=None,
+        cpu_seconds=1.5,
+        io_read_bytes=None,
+        io_write_bytes=4096,
+        kernel={"lost": 3, "backlog": 0},
+    )
+    assert health.metrics()["kernel_lost"] == 3  # noqa: PLR2004
+    assert health.metrics()["up"] == 1
+    assert health.status_detail() == "3 audit events lost, auditd restarted 1 times"
+
+
+@patch("workloads.AuditdService._kernel_status", return_value={})
+@patch("workloads.get_service_controller")
+def test_health_inactive(mock_get_controller, _):
+    mock_get_controller.return_value.properties.return_value = {"ActiveState": "inactive"}
+    health = AuditdService().health()
+    assert health == AuditdHealth("inactive", 0, 0)
+    assert health.metrics()["up"] == 0
+    assert health.status_detail() == ""
+
+
+@patch("workloads.subprocess.run")
+def test_kernel_status(mock_run):
+    mock_run.return_value.stdout = (
+        "enabled 1\nfailure 1\npid 812\nrate_limit 0\nbacklog_limit 8192\nlost 0\n"
+        "backlog 0\nloginuid_immutable 0 unlocked\n"
+    )
+    status = AuditdService()._kernel_status()
+    assert status["pid"] == 812  # noqa: PLR2004
+    assert status["loginuid_immutable"] == 0
+    assert "enabled" in status
+
+
+@patch("workloads.subprocess.run", side_effect=FileNotFoundError)
+def test_kernel_status_failure(_):
+    assert AuditdService()._kernel_status() == {}
+
+
+@patch("workloads.systemd")
+@patch("workloads.render_jinja2_template", return_value="[Unit]\n")
+def test_helper_service_ensure(mock_render, mock_systemd, tmp_path):
+    (tmp_path / "helper.py").write_text("print()", encoding="utf-8")
+    (tmp_path / "shared.py").write_text("", encoding="utf-8")
+    with (
+        patch("workloads.HELPER_SCRIPT_PATH", str(tmp_path)),
+        patch("workloads.HELPER_LIB_DIR", tmp_path / "lib"),
+        patch("workloads.SYSTEMD_UNIT_DIR", tmp_path / "units"),
+        patch("utils.os.chown"),
+        patch("utils.pwd.getpwnam"),
+    ):
+        helper = HelperService("helper", "helper.py", "Helper", ["--flag"], None, ("shared.py",))
+        assert helper.ensure() is True
+        assert (tmp_path / "lib" / "helper.py").read_text(encoding="utf-8") == "print()"
+        assert (tmp_path / "lib" / "shared.py").exists()
+        assert (tmp_path / "units" / "helper.service").read_text(encoding="utf-8") == "[Unit]\n"
+        mock_systemd.service_restart.assert_called_once_with("helper.service")
+
+        assert helper.ensure() is False
+        mock_systemd.daemon_reload.assert_called_once()
+
+
+@patch("workloads.systemd")
+def test_helper_service_remove(mock_systemd, tmp_path):
+    with (
+        patch("workloads.HELPER_LIB_DIR", tmp_path / "lib"),
+        patch("workloads.SYSTEMD_UNIT_DIR", tmp_path),
+    ):
+        metrics_file = tmp_path / "helper.prom"
+        metrics_file.write_text("helper_total 1\n", encoding="utf-8")
+        helper = HelperService("helper", "helper.py", "Helper", [], metrics_file, ("shared.py",))
+        helper.remove()
+        mock_systemd.service_disable.assert_not_called()
+        assert not metrics_file.exists()
+
+        (tmp_path / "helper.service").write_text("[Unit]\n", encoding="utf-8")
+        (tmp_path / "lib").mkdir()
+        (tmp_path / "lib" / "shared.py").write_text("", encoding="utf-8")
+        helper.remove()
+        assert not (tmp_path / "lib" / "shared.py").exists()
+        mock_systemd.service_disable.assert_called_once_with("--now", "helper.service")
+        assert not (tmp_path / "helper.service").exists()
+
+
+@patch("workloads.systemd")
+def test_rotation_timer_ensure(mock_systemd, tmp_path):
+    with (
+        patch("workloads.SYSTEMD_UNIT_DIR", tmp_path),
+        patch("utils.os.chown"),
+        patch("utils.pwd.getpwnam"),
+    ):
+        timer = RotationTimer()
+        assert timer.ensure("daily") is True
+        assert "OnCalendar=daily\n" in (tmp_path / "auditd-rotate.timer").read_text()
+        service = (tmp_path / "auditd-rotate.service").read_text()
+        assert "--signal=USR1 --kill-who=main auditd.service" in service
+        mock_systemd.service_enable.assert_called_once_with("auditd-rotate.timer")
+        mock_systemd.service_restart.assert_called_once_with("auditd-rotate.timer")
+
+        assert timer.ensure("daily") is False
+        assert timer.ensure("weekly") is True
+        assert mock_systemd.daemon_reload.call_count == 2  # noqa: PLR2004
+
+
+@patch("workloads.systemd")
+def test_rotation_timer_remove(mock_systemd, tmp_path):
+    with patch("workloads.SYSTEMD_UNIT_DIR", tmp_path):
+        timer = RotationTimer()
+        timer.remove()
+        mock_systemd.service_disable.assert_not_called()
+
+        (tmp_path / "auditd-rotate.timer").write_text("[Timer]\n", encoding="utf-8")
+        (tmp_path / "auditd-rotate.service").write_text("[Service]\n", encoding="utf-8")
+        timer.remove()
+        mock_systemd.service_disable.assert_called_once_with("--now", "auditd-rotate.timer")
+        assert not (tmp_path / "auditd-rotate.timer").exists()
+        assert not (tmp_path / "auditd-rotate.service").exists()
+
+
+@pytest.mark.parametrize(
+    "value, valid",
+    [
+        ("", True),
+        ("daily", True),
+        ("Mon *-*-* 00:00:00", True),
+        ("*-*-* 00/6:00", True),
+        ("daily\nExecStart=/bin/sh", False),
+        ("daily; reboot", False),
+    ],
+)
+def test_auditd_config_rotate_schedule(value, valid):
+    if valid:
+        assert AuditdConfig(rotate_schedule=value).rotate_schedule == value
+    else:
+        with pytest.raises(ValueError):
+            AuditdConfig(rotate_schedule=value)
+
+
+def test_auditd_config_forward_filter():
+    config = AuditdConfig(
+        netlink_forwarder=True, forward_record_types="execve, USER_LOGIN,", forward_keys="exec"
+    )
+    assert config.forward_record_types == ["EXECVE", "USER_LOGIN"]
+    assert config.forward_keys == ["exec"]
+    assert AuditdConfig().forward_keys == []
+    assert AuditdConfig(netlink_forwarder=True, forward_keys=["exec"]).forward_keys == ["exec"]
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"netlink_forwarder": True, "forward_record_types": "SYSCALL;PATH"},
+        {"netlink_forwarder": True, "forward_keys": "exec,a key"},
+        {"netlink_forwarder": True, "forward_keys": "k" * 32},
+        {"forward_record_types": "SYSCALL"},
+        {"forward_keys": "exec"},
+        {"forward_dedup_window": 5},
+        {"netlink_forwarder": True, "forward_dedup_window": -1},
+    ],
+)
+def test_auditd_config_invalid_forward_filter(config):
+    with pytest.raises(ValueError):
+        AuditdConfig(**config)
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"cpu_weight": 0},
+        {"io_weight": 10001},
+        {"nice": -21},
+        {"io_scheduling_class": "fast"},
+        {"oom_score_adjust": 1001},
+        {"memory_high": "lots"},
+    ],
+)
+def test_auditd_config_invalid_resource_controls(config):
+    with pytest.raises(ValueError):
+        AuditdConfig(**config)
+
+
+def test_auditd_config_valid_resource_controls():
+    config = AuditdConfig(io_scheduling_class="idle", memory_high="256M", nice=5)
+    assert config.memory_high == "256M"
+    assert config.cpu_weight is None
+
+
+def test_configure_resources(tmp_path):
+    config = AuditdConfig(cpu_weight=50, nice=10, memory_high="256M").model_dump()
+    with (
+        patch.object(AuditdService, "resources_drop_in", tmp_path / "juju-resources.conf"),
+        patch("utils.os.chown"),
+        patch("utils.pwd.getpwnam"),
+    ):
+        service = AuditdService()
+        assert service.configure_resources(config) is True
+        content = service.resources_drop_in.read_text(encoding="utf-8")
+        assert "CPUWeight=50\nNice=10\nMemoryHigh=256M\n" in content
+        assert "IOWeight" not in content
+        assert service.plan.daemon_reload is True
+        assert service.plan.restart is True
+
+        service.plan = ChangePlan()
+        assert service.configure_resources(config) is False
+        assert not service.plan
+
+        assert service.configure_resources(AuditdConfig().model_dump()) is True
+        assert not service.resources_drop_in.exists()
+        assert service.plan.restart is True
+
+
+def test_render_config_aggregator():
+    service = AuditdService()
+    content = service.render_config(AuditdConfig().model_dump())
+    assert "tcp_listen_port" not in content
+    assert "max_restarts = 10\n" in content
+    assert "write_logs = yes\n" in content
+    assert "log_format = ENRICHED\n" in content
+    assert "log_format = RAW\n" in service.render_config(
+        AuditdConfig(log_format="RAW").model_dump()
+    )
+    assert "write_logs = no\n" in service.render_config(
+        AuditdConfig(forwarding_only=True, netlink_forwarder=True).model_dump()
+    )
+
+    config = AuditdConfig(tcp_listen_port=60, tcp_listen_queue=64, tcp_max_per_addr=4)
+    content = service.render_config(config.model_dump())
+    assert "tcp_listen_port = 60\ntcp_listen_queue = 64\ntcp_max_per_addr = 4\n" in content
+
+
+@pytest.mark.parametrize(
+    "option, value",
+    [
+        ("tcp_listen_port", 0),
+        ("tcp_listen_port", 65536),
+        ("tcp_max_per_addr", 1025),
+        ("remote_queue_depth", 0),
+        ("remote_network_failure_action", "exec"),
+        ("remote_network_retry_time", 0),
+        ("remote_overflow_action", "stop"),
+        ("remote_format", "json"),
+        ("log_format", "NOLOG"),
+        ("remote_server", "-bad-.example.com"),
+        ("remote_server", "10.0.0.1:60"),
+        ("rule_profile", "hipaa"),
+    ],
+)
+def test_auditd_config_invalid_remote_logging(option, value):
+    with pytest.raises(ValueError):
+        AuditdConfig(**{option: value})
+
+
+@patch("workloads.apt.add_package")
+@patch("workloads.get_installed_version", return_value=None)
+def test_configure_remote(mock_installed, mock_add_package, tmp_path):
+    config = AuditdConfig(remote_server="10.0.0.1", remote_queue_depth=4096).model_dump()
+    with (
+        patch.object(AuditdService, "remote_config_file", tmp_path / "audisp-remote.conf"),
+        patch.object(AuditdService, "remote_plugin_file", tmp_path / "au-remote.conf"),
+        patch("utils.os.chown"),
+        patch("utils.pwd.getpwnam"),
+    ):
+        service = AuditdService()
+        assert service.configure_remote(config) is True
+        mock_add_package.assert_called_once_with(package_names="audispd-plugins")
+        content = service.remote_config_file.read_text(encoding="utf-8")
+        assert "remote_server = 10.0.0.1\nport = 60\n" in content
+        assert "queue_depth = 4096\n" in content
+        assert "network_failure_action = stop\n" in content
+        assert "mode = immediate\n" in content
+        assert "format = managed\nnetwork_retry_time = 1\n" in content
+        assert "active = yes\n" in service.remote_plugin_file.read_text(encoding="utf-8")
+        assert service.plan.restart is True
+
+        mock_installed.return_value = "1:3.1.2-2"
+        service.plan = ChangePlan()
+        assert service.configure_remote(config) is False
+        assert not service.plan
+        mock_add_package.assert_called_once()
+
+        assert service.configure_remote(AuditdConfig().model_dump()) is True
+        assert "active = no\n" in service.remote_plugin_file.read_text(encoding="utf-8")
+        assert service.plan.restart is True
+
+
+@pytest.mark.parametrize(
+    "config, valid",
+    [
+        ({"forwarding_only": True}, False),
+        ({"forwarding_only": True, "remote_server": "aggregator"}, True),
+        ({"forwarding_only": True, "netlink_forwarder": True}, True),
+        ({"remote_server": "aggregator"}, True),
+    ],
+)
+def test_auditd_config_forwarding_only(config, valid):
+    if valid:
+        assert AuditdConfig(**config)
+    else:
+        with pytest.raises(ValueError, match="'forwarding_only' requires"):
+            AuditdConfig(**config)
+
+
+def test_auditd_config_remote_server():
+    assert AuditdConfig(remote_server="fd00::1").remote_server == "fd00::1"
+    assert AuditdConfig(remote_server="aggregator.example.com").remote_server
+
+
+@patch("workloads.get_installed_version", return_value="1:3.1.2-2")
+def test_configure_remote_disk_spool(_, tmp_path):
+    config = AuditdConfig(
+        remote_server="aggregator",
+        remote_disk_spool=True,
+        remote_format="ascii",
+        remote_overflow_action="suspend",
+        remote_network_retry_time=30,
+    ).model_dump()
+    with (
+        patch.object(AuditdService, "remote_config_file", tmp_path / "audisp-remote.conf"),
+        patch.object(AuditdService, "remote_plugin_file", tmp_path / "au-remote.conf"),
+        patch("workloads.AUDISP_REMOTE_QUEUE_FILE", tmp_path / "spool" / "remote.log"),
+        patch("utils.os.chown"),
+        patch("utils.pwd.getpwnam"),
+    ):
+        service = AuditdService()
+        assert service.configure_remote(config) is True
+    content = (tmp_path / "audisp-remote.conf").read_text(encoding="utf-8")
+    assert f"mode = forward\nqueue_file = {tmp_path}/spool/remote.log\n" in content
+    assert "format = ascii\nnetwork_retry_time = 30\n" in content
+    assert "overflow_action = suspend\n" in content
+    assert (tmp_path / "spool").is_dir()
+
+
+def test_configure_remote_unset(tmp_path):
+    with patch.object(AuditdService, "remote_plugin_file", tmp_path / "au-remote.conf"):
+        service = AuditdService()
+        assert service.configure_remote(AuditdConfig().model_dump()) is False
+    assert not service.plan
+
+
+def test_configure_resources_unset(tmp_path):
+    with patch.object(AuditdService, "resources_drop_in", tmp_path / "juju-resources.conf"):
+        service = AuditdService()
+        assert service.configure_resources(AuditdConfig().model_dump()) is False
+    assert not service.plan
+
+
+@patch("workloads.systemd")
+def test_journald_audit_socket_mask(mock_systemd):
+    JournaldAuditSocket().mask()
+    mock_systemd.service_pause.assert_called_once_with("systemd-journald-audit.socket")
+    mock_systemd.service_restart.assert_called_once_with("systemd-journald.service")
+
+
+@patch("workloads.systemd")
+def test_journald_audit_socket_unmask(mock_systemd):
+    JournaldAuditSocket().unmask()
+    mock_systemd.service_resume.assert_called_once_with("systemd-journald-audit.socket")
+    mock_systemd.service_restart.assert_called_once_with("systemd-journald.service")
+
+
+@patch("workloads.READ_CHUNK_SIZE", 4)
+@patch("workloads.subprocess.Popen")
+def test_journald_audit_socket_audit_volume(mock_popen):
+    proc = mock_popen.return_value.__enter__.return_value
+    proc.stdout.read.side_effect = [b"1234", b"56", b""]
+    assert JournaldAuditSocket().audit_volume() == 6  # noqa: PLR2004
+    assert mock_popen.call_args.args[0][:2] == ["journalctl", "_TRANSPORT=audit"]
+
+
+@patch("utils.os.chown")
+@patch("utils.pwd.getpwnam")
+def test_configure_profile(_, __, tmp_path):
+    (tmp_path / "passwd.rules").write_text("-w /etc/passwd -p wa -k passwd\n")
+    service = AuditdService()
+    service.rule_path = tmp_path
+    assert service.configure_profile("cis") is True
+    assert "-k user_emulation" in (tmp_path / "juju-profile-cis.rules").read_text()
+    assert service.plan.reload_rules is True
+
+    service.plan = ChangePlan()
+    assert service.configure_profile("stig") is True
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "juju-profile-stig.rules",
+        "passwd.rules",
+    ]
+
+    service.plan = ChangePlan()
+    assert service.configure_profile("") is True
+    assert [path.name for path in tmp_path.iterdir()] == ["passwd.rules"]
+    assert service.configure_profile("") is False
+
+
+@patch("workloads._syscall_names", return_value={"open", "openat"})
+def test_lint_rules(_, tmp_path):
+    (tmp_path / "a.rules").write_text("-a always,exit -F arch=b64 -S open,notasyscall -k access\n")
+    (tmp_path / "b.rules").write_text("-w /etc/passwd -p wa -k passwd\n")
+    (tmp_path / "c.rules").write_text("-w /etc/passwd -p aw -k passwd\n")
+    (tmp_path / "c.rules.bak").write_text("-x\n")
+    service = AuditdService()
+    service.rule_path = tmp_path
+    assert service.lint_rules() == [
+        "a.rules:1: unknown syscall notasyscall for arch b64",
+        "c.rules:1: duplicate of b.rules:1",
+    ]
+
+
+@pytest.mark.parametrize(
+    "arch, machine, table",
+    [(None, "x86_64", "x86_64"), ("b64", "aarch64", "aarch64"), ("b32", "x86_64", "i386")],
+)
+@patch("syscalls.subprocess.run")
+def test_syscall_names(mock_run, arch, machine, table):
+    syscall_table.cache_clear()
+    mock_run.return_value.stdout = f"Using {table} syscall table:\n0\tread\n2\topen\n"
+    with patch("workloads.platform.machine", return_value=machine):
+        assert _syscall_names(arch) == {"read", "open"}
+    assert mock_run.call_args.args[0] == ["ausyscall", table, "--dump"]
+
+
+@patch("syscalls.subprocess.run", side_effect=FileNotFoundError("ausyscall"))
+def test_syscall_names_unavailable(_):
+    syscall_table.cache_clear()
+    assert _syscall_names("i386") is None
+    with patch("workloads.platform.machine", return_value="riscv64"):
+        assert _syscall_names("b32") is None
+
+
+def test_proposed_rule_files():
+    service = AuditdService()
+    assert [path.name for path in service.proposed_rule_files("")] == [
+        "passwd.rules",
+        "shadow.rules",
+        "sudoers.rules",
+    ]
+    assert service.proposed_rule_files("stig")[-1] == Path("src/audit_rules/profiles/stig.rules")
+
+
+@patch("workloads._syscall_table", return_value={"257": "openat"})
+def test_simulate_rules_audit_log(_, tmp_path):
+    trace = tmp_path / "audit.log"
+    trace.write_text(
+        "\n"
+        "type=SYSCALL msg=audit(1700000000.000:10): arch=c000003e syscall=257 success=no "
+        'exit=-13 auid=1000 uid=1000 euid=1000 exe="/usr/bin/cat" key="access"\n'
+        'type=PATH msg=audit(1700000000.000:10): item=0 name="/etc/hostname"\n'
+        "type=SYSCALL msg=audit(1700000010.000:11): arch=c000003e syscall=257 success=yes "
+        'exit=3 auid=1000 uid=1000 euid=1000 exe="/usr/bin/cat"\n'
+        'type=PATH msg=audit(1700000010.000:11): item=0 name="/etc/hosts"\n'
+    )
+    config = AuditdConfig(max_log_file=1, num_logs=2).model_dump()
+    simulation = AuditdService().simulate_rules(trace, "cis", config)
+    assert simulation.events_per_second == {"access": 0.1, "system-locale": 0.1}
+    assert simulation.seconds_of_retention == 2 * simulation.seconds_to_rotation
+
+
+def test_simulate_rules_synthetic(tmp_path):
+    trace = tmp_path / "mix.jsonl"
+    trace.write_text('{"syscall": "openat", "rate": 10, "paths": ["/etc/shadow"]}\n')
+    simulation = AuditdService().simulate_rules(trace, "", AuditdConfig().model_dump())
+    assert simulation.events_per_second == {"shadow_changes": 10.0}